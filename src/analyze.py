@@ -1,33 +1,657 @@
 import subprocess
 import os
+import re
+import json
+import queue
+import signal
+import threading
 import traceback
 import time
-from src.report import generate_report
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from src.report import (
+    RESULTS_FILE,
+    LEGACY_REPORT_FILE,
+    generate_report,
+    make_result,
+    make_start,
+    make_estimate,
+    append_results,
+    read_results,
+    write_legacy_report
+)
+from src.worktree import setup_worktrees
+from src.profiling import phase, count
+from src.build import (
+    get_configure_command,
+    get_setup_command,
+    find_compile_entry,
+    find_compile_command,
+    get_link_command,
+    rebuild
+)
+from src.schemata import (
+    MUTANT_ID_ENV,
+    read_schemata,
+    instrument_source,
+    get_mutant_name,
+)
+from src.mutants import (
+    read_index,
+    check_mutants,
+    apply_mutant,
+    get_diff,
+    get_mutant_diff
+)
+from src.cache import (
+    get_mutant_key,
+    get_run_key,
+    hash_sources,
+    get_cached_result,
+    store_result,
+    store_kill,
+    get_kills
+)
+from src.filters import (
+    find_stillborn_mutants,
+    find_equivalent_mutants,
+    write_stillborn,
+    write_equivalent
+)
+from src.journal import (
+    read_journal,
+    reset_journal,
+    append_result,
+    backup_original,
+    restore_original,
+    remove_backup
+)
+from src.functional import is_functional_test, make_functional_runner
+from src.fuzz import (
+    FUZZ_BUILD_DIR,
+    FUZZ_CORPUS_DIR,
+    get_fuzz_binary,
+    get_fuzz_build_command,
+    list_fuzz_targets,
+    get_reaching_targets,
+    list_corpus,
+    replay_corpus,
+    record_fuzz_time,
+    get_average_time,
+    write_fuzz_times
+)
+from src.sampling import (
+    DEFAULT_CONFIDENCE,
+    get_stratum,
+    stratified_order,
+    estimate_score,
+    is_precise
+)
+from src.test_selection import (
+    build_test_index,
+    get_tests_for_line,
+    get_command_for_tests,
+    get_mutated_line,
+    list_unit_tests,
+    list_functional_tests,
+    order_tests
+)
 
-def run(command, timeout=10000):
+def handle_sigterm(signum, frame):
+    # Stop the analysis the same way as Ctrl-C (e.g. preemptible machines)
+    raise KeyboardInterrupt
+
+# Result of a mutant stopped by the timeout: falsy, as it counts as killed, but reported on its own
+TIMEOUT = None
+# Statuses of an analyzed mutant, see get_status
+STATUSES = ("killed", "survived", "timeout")
+# Lower bound of the calibrated timeout, so fast test commands are not killed because of noise
+MIN_TIMEOUT = 10
+# Mutants analyzed before the survival rate is compared to the threshold
+MIN_ANALYZED = 10
+# Process groups of the commands running in any thread. They are in their own session, so Ctrl-C
+# does not reach them: they are killed by kill_running_commands
+RUNNING_GROUPS = set()
+RUNNING_GROUPS_LOCK = threading.Lock()
+INTERRUPTED = threading.Event()
+
+def kill_running_commands():
+    """Kill every command running, the threads running them get a KeyboardInterrupt."""
+    with RUNNING_GROUPS_LOCK:
+        INTERRUPTED.set()
+        groups = list(RUNNING_GROUPS)
+    for group in groups:
+        try:
+            os.killpg(group, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+def run_command(command, timeout=10000, cwd=None, env=None):
+    """Run `command` in its own process group. Returns "passed", "failed" or "timeout".
+
+    The whole group is killed on timeout (or interruption) so nothing started by the
+    command (e.g. bitcoind nodes of functional tests) is left behind. A command killed by
+    kill_running_commands raises KeyboardInterrupt, it did not fail.
+    """
+    if env:
+        env = {**os.environ, **env}
+    with RUNNING_GROUPS_LOCK:
+        if INTERRUPTED.is_set():
+            raise KeyboardInterrupt
+        process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                   shell=True, cwd=cwd, env=env, start_new_session=True)
+        RUNNING_GROUPS.add(process.pid)
     try:
-        subprocess.run(command, check=True, stdout=subprocess.PIPE,
-                      stderr=subprocess.PIPE, text=False, shell=True,
-                      timeout=timeout)
-        return True
-    except (subprocess.CalledProcessError, subprocess.TimeoutExpired):
-        return False
+        return_code = process.wait(timeout=timeout)
+        status = "passed" if return_code == 0 else "failed"
+    except subprocess.TimeoutExpired:
+        status = "timeout"
+    finally:
+        # Also kill what the command left running after it exited
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        process.wait()
+        with RUNNING_GROUPS_LOCK:
+            RUNNING_GROUPS.discard(process.pid)
+    if INTERRUPTED.is_set():
+        raise KeyboardInterrupt
+    return status
 
-def get_command_to_kill(target_file_path, jobs):
-    build_command = "cmake --build build"
-    if jobs != 0:
-        build_command += f' -j{jobs}'
+def run(command, timeout=10000, cwd=None, env=None):
+    return run_command(command, timeout, cwd, env) == "passed"
+
+def run_test(command, timeout=10000, cwd=None, env=None):
+    """Run the test command of a mutant. Returns True if it survived, False or TIMEOUT if it was killed."""
+    status = run_command(command, timeout, cwd, env)
+    if status == "timeout":
+        return TIMEOUT
+    return status == "passed"
+
+def calibrate_timeout(command, timeout, timeout_factor, cwd=None):
+    """Timeout of the mutants: `timeout_factor` times the duration of `command` without mutant (at most `timeout`)."""
+    print(f"Timing the tests without mutant: {command}")
+    start = time.time()
+    with phase("calibration", command=command):
+        status = run_command(command, timeout, cwd=cwd)
+    baseline = time.time() - start
+    calibrated_timeout = min(timeout, max(MIN_TIMEOUT, baseline * timeout_factor))
+    if status != "passed":
+        print(f"Warning: the tests do not pass without mutant ({status})")
+    print(f"Baseline: {baseline:.1f}s, timeout per mutant: {calibrated_timeout:.1f}s")
+    return calibrated_timeout
+
+def get_status(result):
+    if result is TIMEOUT:
+        return "timeout"
+    return "survived" if result else "killed"
+
+def get_test_command(target_file_path):
     if "functional" in target_file_path:
         command = f"./build/{target_file_path}"
     elif "test" in target_file_path:
         filename_with_extension = os.path.basename(target_file_path)
         test_to_run = filename_with_extension.rsplit('.', 1)[0]
-        command = f"{build_command} && ./build/src/test/test_bitcoin --run_test={test_to_run}"
+        command = f"./build/src/test/test_bitcoin --run_test={test_to_run}"
     else:
-        command = f"{build_command} && ./build/src/test/test_bitcoin && CI_FAILFAST_TEST_LEAVE_DANGLING=1 ./build/test/functional/test_runner.py -F"
+        command = "./build/src/test/test_bitcoin && CI_FAILFAST_TEST_LEAVE_DANGLING=1 ./build/test/functional/test_runner.py -F"
     return command
 
-def analyze(folder_path, command="", jobs=0, timeout=10000, survival_threshold=0.3):
+def exceeds_survival_threshold(survived, analyzed, survival_threshold):
+    """Whether the survival rate of the mutants analyzed so far is above `survival_threshold`."""
+    return analyzed >= MIN_ANALYZED and survived / analyzed > survival_threshold
+
+
+def get_command_to_kill(target_file_path, jobs):
+    build_command = "cmake --build build"
+    if jobs != 0:
+        build_command += f' -j{jobs}'
+    command = get_test_command(target_file_path)
+    if "functional" in target_file_path:
+        return command
+    return f"{build_command} && {command}"
+
+def get_mutant_files(folder_path):
+    # In the order they were generated (a.mutant.2.cpp before a.mutant.10.cpp), not in the order of the file system
+    return sorted((f for f in os.listdir(folder_path)
+                   if os.path.isfile(os.path.join(folder_path, f)) and '.mutant.' in f),
+                  key=lambda f: [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', f)])
+
+def analyze_mutants(files, folder_path, target_file_path, run_mutant, checkouts,
+                    setup=None, survival_threshold=0.3, read_mutant=None, on_result=None, should_stop=None):
+    """
+    Analyze mutants, one checkout at a time per thread.
+
+    Args:
+        files: Mutant names
+        folder_path: Path to mutants folder
+        target_file_path: Path of the mutated file (relative to the checkouts)
+        run_mutant: Function testing the applied mutant (checkout, name) -> True if it survived,
+                    False if it was killed, TIMEOUT if it was killed by the timeout
+        checkouts: Root folders to apply mutants into (None = current directory)
+        setup: Function called once per checkout before analyzing mutants, the checkout
+               is skipped if it returns False (optional)
+        survival_threshold: Maximum acceptable survival rate (0.3 = 30%) of the mutants analyzed,
+                            checked once MIN_ANALYZED mutants were analyzed
+        read_mutant: Function returning the content of a mutant (name) -> str, or None when
+                     nothing must be written (default: read the file from folder_path)
+        on_result: Function called with (name, result of run_mutant, seconds spent on the mutant)
+                   after each mutant (optional)
+        should_stop: Function called before each mutant, the analysis stops when it returns True (optional)
+    """
+    if read_mutant is None:
+        def read_mutant(file_name):
+            with open(os.path.join(folder_path, file_name), 'r') as file:
+                return file.read()
+
+    killed = []
+    not_killed = []
+    total_mutants = len(files)
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    pending = queue.Queue()
+    for item in enumerate(files, 1):
+        pending.put(item)
+
+    def work(checkout):
+        name = f" ({os.path.basename(checkout)})" if checkout else ""
+        target = os.path.join(checkout or "", target_file_path)
+        with open(target, 'r') as file:
+            original_content = file.read()
+        try:
+            if setup and setup(checkout) is False:
+                return
+            analyze_pending(checkout, name, target, original_content)
+        finally:
+            with open(target, 'w') as target_file:
+                target_file.write(original_content)
+
+    def analyze_pending(checkout, name, target, original_content):
+        while not stop.is_set():
+            try:
+                i, file_name = pending.get_nowait()
+            except queue.Empty:
+                return
+            with lock:
+                if exceeds_survival_threshold(len(not_killed), len(killed) + len(not_killed), survival_threshold):
+                    if not stop.is_set():
+                        current_survival_rate = len(not_killed) / (len(killed) + len(not_killed))
+                        print(f"\nTerminating early: {current_survival_rate:.2%} mutants surviving after {i} iterations")
+                        print(f"Survival rate exceeds threshold of {survival_threshold:.0%}")
+                    stop.set()
+                    return
+                if should_stop and should_stop():
+                    stop.set()
+                    return
+            print(f"[{i}/{total_mutants}] Analyzing {file_name}{name}")
+            start = time.time()
+
+            with phase("mutant", file=target_file_path, mutant=file_name) as args:
+                # Read and apply mutant
+                content = read_mutant(file_name)
+                if content is None:
+                    result = run_mutant(checkout, file_name)
+                else:
+                    try:
+                        with open(target, 'w') as target_file:
+                            target_file.write(content)
+                        result = run_mutant(checkout, file_name)
+                    finally:
+                        with open(target, 'w') as target_file:
+                            target_file.write(original_content)
+                args["status"] = get_status(result)
+
+            with lock:
+                if result:
+                    print(f"{file_name}: NOT KILLED ❌")
+                    not_killed.append(file_name)
+                elif result is TIMEOUT:
+                    print(f"{file_name}: KILLED (TIMEOUT) ⏰")
+                    killed.append(file_name)
+                else:
+                    print(f"{file_name}: KILLED ✅")
+                    killed.append(file_name)
+                if on_result:
+                    on_result(file_name, result, time.time() - start)
+
+    if len(checkouts) == 1:
+        # In this thread, so Ctrl-C interrupts the command of the mutant directly
+        work(checkouts[0])
+        return killed, not_killed
+
+    try:
+        with ThreadPoolExecutor(max_workers=len(checkouts)) as executor:
+            futures = [executor.submit(work, checkout) for checkout in checkouts]
+            try:
+                for future in futures:
+                    future.result()
+            except BaseException:
+                # e.g. Ctrl-C: kill the commands of the workers, which then restore their file without
+                # recording the mutant
+                stop.set()
+                kill_running_commands()
+                raise
+    finally:
+        INTERRUPTED.clear()
+
+    return killed, not_killed
+
+class Analysis:
+    """
+    Context of the analysis of a mutants folder, passed to each step of the pipeline of a mutant
+    (build, tests, cache, record).
+
+    Holds the mutated file, the options of the analysis and the state shared by the checkouts
+    (build steps, calibrated timeout, build and fuzz times...).
+    """
+
+    def __init__(self, folder_path, target_file_path, original_content, indexed_mutants, command="", jobs=0,
+                 timeout=10000, timeout_factor=0, ccache=False, clean_build=False, cache=False, sources_hash="",
+                 fuzz_corpus=FUZZ_CORPUS_DIR, fuzz_build_dir=FUZZ_BUILD_DIR):
+        self.folder_path = folder_path
+        self.target_file_path = target_file_path
+        self.original_content = original_content
+        # Mutants of the compact index and of the schemata, by name
+        self.indexed_mutants = indexed_mutants
+        # Without a command, build incrementally: only the mutated object is recompiled
+        # and only the binaries needed by the tests are relinked
+        self.incremental = command == ""
+        self.command = get_test_command(target_file_path) if self.incremental else command
+        self.jobs = jobs
+        self.timeout = timeout
+        self.timeout_factor = timeout_factor
+        self.ccache = ccache
+        self.clean_build = clean_build
+        self.cache = cache
+        self.sources_hash = sources_hash
+        self.fuzz_corpus = fuzz_corpus
+        self.fuzz_build_dir = fuzz_build_dir
+        # Set by `analyze` once known
+        self.schemata = None
+        self.schemata_mutants = {}
+        self.test_index = None
+        self.fail_fast = False
+        self.fuzz_index = None
+        self.fuzz_targets = {}
+
+        # {checkout: (compile command, link command)}
+        self.build_steps = {}
+        # Timeout of the tests of a mutant, calibrated once from a run without mutant
+        self.mutant_timeout = timeout
+        self.calibrated = False
+        self.calibration_lock = threading.Lock()
+        # {checkout: tests run one by one with fail_fast}
+        self.test_lists = {}
+        self.build_times = {}
+        # {checkout: (compile command, build command, fuzz binary)}
+        self.fuzz_build_steps = {}
+        self.fuzz_times = {}
+        self.fuzz_commands = {}
+        # {fuzz target: inputs}
+        self.corpora = {}
+        self.no_coverage = []
+        self.timed_out = []
+        # {mutant: whether it was killed}, for the estimate of the score
+        self.sample_results = {}
+        # Checkouts where the schemata file does not build or pass the tests
+        self.schemata_failed = []
+
+def get_mutant_content(analysis, file_name):
+    if file_name in analysis.indexed_mutants:
+        return apply_mutant(analysis.original_content, analysis.indexed_mutants[file_name])
+    with open(os.path.join(analysis.folder_path, file_name), 'r') as file:
+        return file.read()
+
+def get_mutant_line(analysis, file_name):
+    if file_name in analysis.indexed_mutants:
+        return analysis.indexed_mutants[file_name]["line"]
+    return get_mutated_line(analysis.original_content, get_mutant_content(analysis, file_name))
+
+def get_mutant_tests(analysis, file_name):
+    return get_tests_for_line(analysis.test_index, analysis.target_file_path, get_mutant_line(analysis, file_name))
+
+def get_mutant_command(analysis, file_name):
+    """Command testing a mutant, only the tests covering its line with per-test coverage (None if there is none)."""
+    if analysis.test_index is None or file_name == "schemata":
+        return analysis.command
+    tests = get_mutant_tests(analysis, file_name)
+    if not tests:
+        return None
+    return get_command_for_tests(tests)
+
+def get_result_record(analysis, file_name, status, duration=None):
+    mutant = analysis.indexed_mutants.get(file_name)
+    diff = None
+    if status in ("survived", "no_coverage"):
+        diff = get_diff(analysis.target_file_path, analysis.original_content, file_name,
+                        get_mutant_content(analysis, file_name))
+    return make_result(analysis.folder_path, analysis.target_file_path, file_name, status,
+                       operator=mutant["operator"] if mutant else None,
+                       line=get_mutant_line(analysis, file_name), duration=duration,
+                       command=(analysis.fuzz_commands.get(file_name) or get_mutant_command(analysis, file_name)
+                                if status != "no_coverage" else None),
+                       diff=diff)
+
+def record_result(analysis, file_name, result, duration=None):
+    """Append the result of a mutant to the journal of the folder and to the results file."""
+    status = get_status(result)
+    if status == "survived" and file_name in analysis.no_coverage:
+        status = "no_coverage"
+    elif status == "timeout":
+        analysis.timed_out.append(file_name)
+    count("mutants", status=status)
+    append_result(analysis.folder_path, file_name, status)
+    append_results([get_result_record(analysis, file_name, status, duration)])
+    analysis.sample_results[file_name] = status not in ("survived", "no_coverage")
+
+def run_mutant_tests(analysis, checkout, file_name, env=None):
+    """
+    Run the tests of the applied mutant. With fail_fast, the tests run one by one, the ones
+    which killed mutants near this line first, until one fails.
+    """
+    target_file_path = analysis.target_file_path
+    mutant_command = get_mutant_command(analysis, file_name)
+    if not analysis.fail_fast or file_name == "schemata":
+        print(f"Running: {mutant_command}")
+        return run_test(mutant_command, analysis.mutant_timeout, cwd=checkout, env=env)
+    if analysis.test_index is not None:
+        tests = get_mutant_tests(analysis, file_name)
+    else:
+        if checkout not in analysis.test_lists:
+            analysis.test_lists[checkout] = list_unit_tests(checkout) + list_functional_tests(checkout)
+        tests = analysis.test_lists[checkout]
+    if not tests:
+        print(f"Running: {mutant_command}")
+        return run_test(mutant_command, analysis.mutant_timeout, cwd=checkout, env=env)
+
+    line = get_mutant_line(analysis, file_name)
+    deadline = time.time() + analysis.mutant_timeout
+    for test in order_tests(tests, get_kills(target_file_path), line):
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            return TIMEOUT
+        print(f"Running: {test}")
+        result = run_test(get_command_for_tests([test]), remaining, cwd=checkout, env=env)
+        if not result:
+            # A timeout does not say which test detects the mutant, only failures are remembered
+            if result is not TIMEOUT:
+                store_kill(target_file_path, line, test)
+            return result
+    return True
+
+def run_cached(analysis, file_name, mutant_command, execute):
+    """
+    Result of `execute` for a mutant, reused when the original file, the mutant, the command
+    and the test sources are the same as in a previous analysis (with cache).
+    """
+    if not analysis.cache:
+        return execute()
+    content = get_mutant_content(analysis, file_name)
+    mutant_key = get_mutant_key(analysis.original_content, content)
+    run_key = get_run_key(mutant_key, mutant_command, analysis.sources_hash)
+    cached_result = get_cached_result(run_key)
+    if cached_result:
+        print(f"Cached result: {cached_result[0]}")
+        if cached_result[0] == "timeout":
+            return TIMEOUT
+        return cached_result[0] == "survived"
+    start = time.time()
+    result = execute()
+    store_result(run_key, mutant_key, get_status(result), time.time() - start,
+                 file=analysis.target_file_path, line=get_mutated_line(analysis.original_content, content),
+                 command=mutant_command)
+    return result
+
+def setup_checkout(analysis, checkout):
+    """Build a checkout once before its first mutant, and calibrate the timeout of the tests."""
+    if analysis.incremental and checkout not in analysis.build_steps:
+        setup_command = get_setup_command(jobs=analysis.jobs, ccache=analysis.ccache, clean=analysis.clean_build)
+        print(f"\n\nRunning {setup_command}")
+        with phase("setup_build", command=setup_command):
+            run(setup_command, cwd=checkout)
+        analysis.build_steps[checkout] = (find_compile_command(analysis.target_file_path, cwd=checkout),
+                                          get_link_command(analysis.target_file_path, analysis.jobs, cwd=checkout))
+    # A command given by the user may build: without mutant, the build does nothing and a mutant
+    # would time out while compiling
+    with analysis.calibration_lock:
+        if not analysis.timeout_factor or not analysis.incremental or analysis.calibrated:
+            return
+        analysis.mutant_timeout = calibrate_timeout(analysis.command, analysis.timeout, analysis.timeout_factor,
+                                                    cwd=checkout)
+        analysis.calibrated = True
+
+def build_and_run(analysis, checkout, file_name, env=None):
+    """Build the applied mutant (without command) and run its tests."""
+    mutant_command = get_mutant_command(analysis, file_name)
+    if mutant_command is None:
+        print("NO COVERAGE")
+        analysis.no_coverage.append(file_name)
+        return True
+
+    def execute():
+        if analysis.incremental:
+            compile_command, link_command = analysis.build_steps[checkout]
+            with phase("build", mutant=file_name) as args:
+                success, compile_time, link_time = rebuild(compile_command, link_command, run,
+                                                           analysis.timeout, cwd=checkout)
+                args.update(compile=round(compile_time, 3), link=round(link_time, 3), success=success)
+            analysis.build_times[file_name] = {"compile": round(compile_time, 3), "link": round(link_time, 3)}
+            print(f"Build: {compile_time:.1f}s compile, {link_time:.1f}s link")
+            if not success:
+                count("compile_failures")
+                return False
+        with phase("test", mutant=file_name):
+            return run_mutant_tests(analysis, checkout, file_name, env=env)
+
+    if file_name == "schemata":
+        return execute()
+    return run_cached(analysis, file_name, mutant_command, execute)
+
+def setup_schemata(analysis, checkout):
+    """Write the schemata file into a checkout, False if it does not build or pass the tests without mutant."""
+    setup_checkout(analysis, checkout)
+    with open(os.path.join(checkout or "", analysis.target_file_path), 'w') as file:
+        file.write(analysis.schemata[0])
+    # With no active mutant, the instrumented file must build and pass the tests
+    if not build_and_run(analysis, checkout, "schemata", env={MUTANT_ID_ENV: "-1"}):
+        print("The schemata file does not build or pass the tests, analyzing its mutants one by one")
+        analysis.schemata_failed.append(checkout)
+        return False
+
+def run_schemata_mutant(analysis, checkout, name):
+    """Run the tests with a mutant of the schemata file activated, without building."""
+    mutant_command = get_mutant_command(analysis, name)
+    if mutant_command is None:
+        print("NO COVERAGE")
+        analysis.no_coverage.append(name)
+        return True
+
+    def execute():
+        return run_mutant_tests(analysis, checkout, name,
+                                env={MUTANT_ID_ENV: str(analysis.schemata_mutants[name]["id"])})
+
+    return run_cached(analysis, name, mutant_command, execute)
+
+def get_fuzz_targets(analysis, file_name):
+    """Fuzz targets reaching a mutant which have a corpus, the fastest to replay first."""
+    if analysis.fuzz_index is not None:
+        targets = get_tests_for_line(analysis.fuzz_index, analysis.target_file_path,
+                                     get_mutant_line(analysis, file_name))
+    else:
+        targets = get_reaching_targets(analysis.target_file_path, analysis.fuzz_targets)
+    for target in targets:
+        if target not in analysis.corpora:
+            analysis.corpora[target] = list_corpus(analysis.fuzz_corpus, target)
+    return sorted((target for target in targets if analysis.corpora[target]),
+                  key=lambda target: get_average_time(analysis.fuzz_times, target))
+
+def setup_fuzz(analysis, checkout):
+    """Build the fuzz binary of a checkout once before its first mutant."""
+    if checkout in analysis.fuzz_build_steps:
+        return
+    fuzz_build_dir = analysis.fuzz_build_dir
+    build_command = get_fuzz_build_command(fuzz_build_dir, analysis.jobs)
+    print(f"\n\nRunning {build_command}")
+    with phase("setup_build", command=build_command):
+        success = (os.path.isfile(os.path.join(checkout or "", fuzz_build_dir, "CMakeCache.txt"))
+                   and run(build_command, cwd=checkout))
+    if not success:
+        raise Exception(f"Could not build the fuzz binary, configure {fuzz_build_dir} first "
+                        f"(e.g. cmake -B {fuzz_build_dir} -DBUILD_FOR_FUZZING=ON)")
+    analysis.fuzz_build_steps[checkout] = (find_compile_command(analysis.target_file_path, build_dir=fuzz_build_dir,
+                                                                cwd=checkout),
+                                           build_command, get_fuzz_binary(fuzz_build_dir, cwd=checkout))
+
+def fuzz_mutant(analysis, checkout, file_name):
+    """
+    Build the fuzz binary with the applied mutant and replay the corpora of the targets reaching it,
+    until a crash or a sanitizer error.
+    """
+    targets = get_fuzz_targets(analysis, file_name)
+    if not targets:
+        print("NO FUZZ TARGET")
+        analysis.no_coverage.append(file_name)
+        return True
+    analysis.fuzz_commands[file_name] = (f"FUZZ={','.join(targets)} {get_fuzz_binary(analysis.fuzz_build_dir)} "
+                                         f"{analysis.fuzz_corpus}")
+
+    def execute():
+        compile_command, build_command, binary = analysis.fuzz_build_steps[checkout]
+        with phase("build", mutant=file_name) as args:
+            success, compile_time, link_time = rebuild(compile_command, build_command, run, analysis.timeout,
+                                                       cwd=checkout)
+            args.update(compile=round(compile_time, 3), link=round(link_time, 3), success=success)
+        analysis.build_times[file_name] = {"compile": round(compile_time, 3), "link": round(link_time, 3)}
+        print(f"Build: {compile_time:.1f}s compile, {link_time:.1f}s link")
+        if not success:
+            count("compile_failures")
+            return False
+        deadline = time.time() + analysis.timeout
+        for target in targets:
+            inputs = analysis.corpora[target]
+            print(f"Replaying {len(inputs)} inputs of {target}")
+            start = time.time()
+            with phase("fuzz_replay", mutant=file_name, target=target, inputs=len(inputs)) as args:
+                status = replay_corpus(binary, target, inputs, analysis.jobs, deadline - time.time(), cwd=checkout)
+                args["status"] = status
+            if status == "timeout":
+                return TIMEOUT
+            if status == "failed":
+                print(f"Crash in {target}")
+                return False
+            # Only complete replays are timed
+            record_fuzz_time(analysis.fuzz_times, target, len(inputs), time.time() - start)
+        return True
+
+    return run_cached(analysis, file_name, analysis.fuzz_commands[file_name], execute)
+
+def analyze(folder_path, command="", jobs=0, timeout=10000, survival_threshold=0.3, workers=1,
+            ccache=False, clean_build=False, test_coverage=None, cache=False, cache_test_sources=None,
+            resume=False, syntax_check=False, tce=False, timeout_factor=0, fail_fast=False,
+            sample_width=0, confidence=DEFAULT_CONFIDENCE, seed=None, functional_jobs=0,
+            fuzz=False, fuzz_corpus=FUZZ_CORPUS_DIR, fuzz_build_dir=FUZZ_BUILD_DIR, fuzz_coverage=None):
     """
     Analyze mutants with early termination if too many survive.
 
@@ -37,6 +661,38 @@ def analyze(folder_path, command="", jobs=0, timeout=10000, survival_threshold=0
         jobs: Number of parallel jobs
         timeout: Maximum execution time per mutant
         survival_threshold: Maximum acceptable survival rate (0.3 = 30%)
+        workers: Number of isolated git worktrees used to analyze mutants in parallel
+        ccache: Configure the build to use ccache (only without command)
+        clean_build: Remove the build folder before building (only without command)
+        test_coverage: Folder with one lcov file per test, used to run only the tests
+                       covering the mutated line (only without command)
+        cache: Reuse (and store) results from .mutation-core/results.db
+        cache_test_sources: Files or folders whose content is part of the cache key
+        resume: Skip the mutants already analyzed according to the folder's progress journal
+        syntax_check: Discard the mutants which do not compile (checked with -fsyntax-only)
+                      before analyzing them
+        tce: Discard the mutants compiling to the same object file as the original file or
+             as an earlier mutant (trivial compiler equivalence), and the ones which do not compile
+        timeout_factor: Time the test command without mutant first and stop each mutant after
+                        this multiple of that time (at most `timeout`, 0 = always use `timeout`).
+                        Only without command: the build of the mutant is timed on its own then,
+                        while a command could also rebuild what the unmutated tree skips
+        fail_fast: Run the tests one at a time, the ones which killed mutants near the mutated
+                   line first, and stop at the first failure (only without command)
+        sample_width: Analyze a stratified random sample of the mutants (by operator and region
+                      of the file) until the confidence interval of the score is at most this
+                      wide (0.1 = 10 points), and report the estimated score (0 = every mutant)
+        confidence: Confidence level of the interval (0.95 = 95%)
+        seed: Seed of the random order of the sample (None for a different one on every run)
+        functional_jobs: Run up to this many mutants of a functional test at once, each from a copy
+                         of the test with its own ports and data directory (only without command)
+        fuzz: Kill the mutants by replaying the fuzz corpora of the targets reaching the mutated
+              file with the fuzz binary, instead of running the tests (only with one worker)
+        fuzz_corpus: Folder with one folder of inputs per fuzz target (as in qa-assets/fuzz_corpora)
+        fuzz_build_dir: Build folder configured for fuzzing
+        fuzz_coverage: Folder with one lcov file per fuzz target (`<target>.info`), used to replay
+                       only the targets covering the mutated line (default: the targets defined
+                       in the mutated file or including its header)
     """
     killed = []
     not_killed = []
@@ -46,56 +702,242 @@ def analyze(folder_path, command="", jobs=0, timeout=10000, survival_threshold=0
         with open(os.path.join(folder_path, 'original_file.txt'), 'r') as file:
             target_file_path = file.readline()
 
-        # Setup command if not provided
-        if command == "":
-            build_command = "rm -rf build && cmake -B build && cmake --build build"
-            print(f"\n\nRunning {build_command}")
-            run(build_command)
-            command = get_command_to_kill(target_file_path, jobs)
+        # A previous analysis might have been killed with a mutant applied
+        if restore_original(folder_path, target_file_path):
+            print(f"Restored {target_file_path} left mutated by an interrupted analysis")
 
-        # Get list of mutant files
-        files = [f for f in os.listdir(folder_path)
-                if os.path.isfile(os.path.join(folder_path, f)) and not f.endswith('.txt')]
+        # Get list of mutants: full files, the compact index and the schemata
+        index = read_index(folder_path)
+        files = get_mutant_files(folder_path) + list(index)
+        schemata = read_schemata(folder_path)
+        schemata_mutants = {get_mutant_name(mutant): mutant for mutant in schemata[1]} if schemata else {}
+        indexed_mutants = {**index, **schemata_mutants}
 
-        total_mutants = len(files)
-        print(f"* {total_mutants} MUTANTS *")
+        total_mutants = len(files) + len(schemata_mutants)
+        if workers > 1:
+            print(f"* {total_mutants} MUTANTS ({workers} WORKERS) *")
+        else:
+            print(f"* {total_mutants} MUTANTS *")
 
         if total_mutants == 0: raise Exception(f'No mutants on the provided folder path ({folder_path})')
-        else:
-            for i, file_name in enumerate(files, 1):
-                current_survival_rate = len(not_killed) / (total_mutants)
-                if current_survival_rate > survival_threshold:
-                    print(f"\nTerminating early: {current_survival_rate:.2%} mutants surviving after {i} iterations")
-                    print(f"Survival rate exceeds threshold of {survival_threshold:.0%}")
-                    break
-                print(f"[{i}/{total_mutants}] Analyzing {file_name}")
-                file_path = os.path.join(folder_path, file_name)
 
-                # Read and apply mutant
-                with open(file_path, 'r') as file:
-                    content = file.read()
-                with open(target_file_path, 'w') as target_file:
-                    target_file.write(content)
+        with open(target_file_path, 'r') as file:
+            original_content = file.read()
+        if not check_mutants(original_content, indexed_mutants.values()):
+            raise Exception(f'{target_file_path} was modified after the mutants were generated')
 
-                print(f"Running: {command}")
-                result = run(command, timeout)
-                if result:
-                    print("NOT KILLED ❌")
-                    not_killed.append(file_name)
+        # Context of the pipeline of each mutant. With cache, results are reused when the original file,
+        # the mutant, the command and the test sources are the same
+        analysis = Analysis(folder_path, target_file_path, original_content, indexed_mutants, command=command,
+                            jobs=jobs, timeout=timeout, timeout_factor=timeout_factor, ccache=ccache,
+                            clean_build=clean_build, cache=cache,
+                            sources_hash=hash_sources(cache_test_sources) if cache else "",
+                            fuzz_corpus=fuzz_corpus, fuzz_build_dir=fuzz_build_dir)
+        incremental = analysis.incremental
+
+        # Results are appended to a journal as soon as each mutant finishes
+        done = read_journal(folder_path) if resume else {}
+        if not resume:
+            reset_journal(folder_path)
+            # Results of previous analyses of the folder no longer count
+            append_results([make_start(folder_path, target_file_path)])
+        elif done:
+            print(f"Resuming: {len(done)} mutants already analyzed")
+        for name, status in done.items():
+            (not_killed if status in ("survived", "no_coverage") else killed).append(name)
+        analysis.no_coverage += [name for name, status in done.items() if status == "no_coverage"]
+        analysis.timed_out += [name for name, status in done.items() if status == "timeout"]
+        files = [name for name in files if name not in done]
+
+        if fuzz and workers > 1:
+            # The worktrees have no fuzz build folder configured
+            raise Exception("--fuzz cannot be used with several workers, the fuzz binary is only built in the checkout")
+        checkouts = [None]
+        if workers > 1:
+            with phase("worktrees", workers=workers):
+                checkouts = setup_worktrees(workers)
+
+        # Functional test mutants need no build: many of them can run at once
+        concurrent_functional = functional_jobs > 0 and incremental and is_functional_test(target_file_path)
+        fuzz = fuzz and not target_file_path.endswith(".py")
+        if fuzz and schemata_mutants:
+            # The schemata file is not built into the fuzz binary: its mutants are applied one by one
+            files += [name for name in schemata_mutants if name not in done]
+            schemata_mutants = {}
+
+        def read_mutant(file_name):
+            return get_mutant_content(analysis, file_name)
+
+        # Mutants which do not compile, or compile to the same code as the original file
+        # or an earlier mutant, are neither built nor counted in the score
+        if syntax_check or tce:
+            entry = find_compile_entry(target_file_path)
+            if entry is None and incremental and target_file_path.endswith(".cpp"):
+                run(get_configure_command(ccache=ccache))
+                entry = find_compile_entry(target_file_path)
+            pending = files + [name for name in schemata_mutants if name not in done]
+            if tce and entry is not None:
+                print("Compiling the mutants to find equivalent ones")
+                with phase("equivalence", file=target_file_path, mutants=len(pending)):
+                    stillborn, equivalent = find_equivalent_mutants(pending, read_mutant, target_file_path,
+                                                                    original_content, entry, jobs)
+                write_equivalent(folder_path, equivalent)
+                print(f"{len(equivalent)} equivalent mutants discarded")
+            else:
+                print("Checking the syntax of the mutants")
+                with phase("syntax_check", file=target_file_path, mutants=len(pending)):
+                    stillborn = find_stillborn_mutants(pending, read_mutant, target_file_path, entry, jobs)
+                equivalent = {}
+            count("mutants", len(stillborn), status="stillborn")
+            count("mutants", len(equivalent), status="equivalent")
+            write_stillborn(folder_path, stillborn)
+            print(f"{len(stillborn)} stillborn mutants discarded")
+            discarded = set(stillborn) | set(equivalent)
+            files = [name for name in files if name not in discarded]
+            if any(name in schemata_mutants for name in discarded):
+                for name in discarded:
+                    schemata_mutants.pop(name, None)
+                schemata = (instrument_source(original_content.splitlines(keepends=True),
+                                              schemata_mutants.values()), schemata[1])
+            total_mutants -= len(discarded)
+            append_results([make_result(folder_path, target_file_path, name,
+                                        "equivalent" if name in equivalent else "stillborn",
+                                        operator=indexed_mutants[name]["operator"] if name in indexed_mutants else None,
+                                        line=indexed_mutants[name]["line"] if name in indexed_mutants else None)
+                            for name in pending if name in discarded])
+
+        # With per-test coverage, each mutant only runs the tests covering its mutated line
+        if test_coverage and incremental and "test" not in target_file_path:
+            print(f"Loading per-test coverage from {test_coverage}")
+            with phase("test_coverage", folder=test_coverage):
+                analysis.test_index = build_test_index(test_coverage)
+
+        # Sampling: every mutant, including the schemata ones, is applied one by one in a random
+        # order where each prefix is a stratified sample, until the estimate is precise enough
+        sample_results = analysis.sample_results
+        sample_results.update({name: status not in ("survived", "no_coverage") for name, status in done.items()})
+        strata = {}
+        should_stop = None
+        if sample_width:
+            pending_schemata = [name for name in schemata_mutants if name not in done]
+            strata = {name: get_stratum(indexed_mutants[name]["operator"] if name in indexed_mutants else None,
+                                        get_mutant_line(analysis, name))
+                      for name in files + pending_schemata + [name for name in done if name in indexed_mutants
+                                                              or os.path.isfile(os.path.join(folder_path, name))]}
+            files = stratified_order({name: strata[name] for name in files + pending_schemata}, seed)
+            schemata_mutants = {}
+            survival_threshold = 1
+            print(f"Sampling until the {confidence:.0%} confidence interval of the score is at most "
+                  f"{sample_width:.0%} wide")
+
+            def should_stop():
+                return is_precise(estimate_score(strata, sample_results, confidence),
+                                  len(strata.keys() & sample_results.keys()), sample_width)
+
+        # Fail fast: run the tests one by one, the ones which killed mutants near this line first
+        analysis.fail_fast = fail_fast and incremental and "test" not in target_file_path
+        analysis.schemata = schemata
+        analysis.schemata_mutants = schemata_mutants
+        if timeout_factor and not incremental:
+            print(f"The test command may build the mutants, using the fixed timeout of {timeout}s")
+
+        # Fuzzing: the mutated fuzz binary replays the corpora of the targets reaching the file,
+        # the fastest corpora first, and stops at the first crash or sanitizer error
+        analysis.fuzz_index = build_test_index(fuzz_coverage) if fuzz and fuzz_coverage else None
+        analysis.fuzz_targets = list_fuzz_targets() if fuzz and analysis.fuzz_index is None else {}
+
+        def on_result(name, result, duration=None):
+            record_result(analysis, name, result, duration)
+
+        # Keep a copy of the original file on disk in case the analysis is killed,
+        # and always restore it when it is interrupted
+        backup_original(folder_path, original_content)
+        previous_handler = None
+        if threading.current_thread() is threading.main_thread():
+            previous_handler = signal.signal(signal.SIGTERM, handle_sigterm)
+        try:
+            if schemata_mutants:
+                pending_schemata = [name for name in schemata_mutants if name not in done]
+                schemata_killed, schemata_not_killed = analyze_mutants(pending_schemata, folder_path, target_file_path,
+                                                                       partial(run_schemata_mutant, analysis), checkouts,
+                                                                       setup=partial(setup_schemata, analysis),
+                                                                       survival_threshold=survival_threshold,
+                                                                       read_mutant=lambda name: None, on_result=on_result)
+                killed += schemata_killed
+                not_killed += schemata_not_killed
+                # Mutants left when the schemata could not be used are applied one by one
+                if analysis.schemata_failed:
+                    files += [name for name in pending_schemata if name not in schemata_killed + schemata_not_killed]
+
+            if files and not exceeds_survival_threshold(len(not_killed), len(killed) + len(not_killed),
+                                                        survival_threshold):
+                if concurrent_functional:
+                    setup_checkout(analysis, checkouts[0])
+                    print(f"Running up to {functional_jobs} mutants at once")
+                    run_functional = make_functional_runner(target_file_path, read_mutant, run_test, functional_jobs,
+                                                            lambda: analysis.mutant_timeout)
+                    files_killed, files_not_killed = analyze_mutants(files, folder_path, target_file_path, run_functional,
+                                                                     [checkouts[0]] * functional_jobs,
+                                                                     survival_threshold=survival_threshold,
+                                                                     read_mutant=lambda name: None,
+                                                                     on_result=on_result, should_stop=should_stop)
+                elif fuzz:
+                    files_killed, files_not_killed = analyze_mutants(files, folder_path, target_file_path,
+                                                                     partial(fuzz_mutant, analysis), checkouts,
+                                                                     setup=partial(setup_fuzz, analysis),
+                                                                     survival_threshold=survival_threshold,
+                                                                     read_mutant=read_mutant, on_result=on_result,
+                                                                     should_stop=should_stop)
                 else:
-                    print("KILLED ✅")
-                    killed.append(file_name)
+                    files_killed, files_not_killed = analyze_mutants(files, folder_path, target_file_path,
+                                                                     partial(build_and_run, analysis), checkouts,
+                                                                     setup=partial(setup_checkout, analysis),
+                                                                     survival_threshold=survival_threshold,
+                                                                     read_mutant=read_mutant, on_result=on_result,
+                                                                     should_stop=should_stop)
+                killed += files_killed
+                not_killed += files_not_killed
+        finally:
+            if previous_handler is not None:
+                signal.signal(signal.SIGTERM, previous_handler)
+            if checkouts == [None]:
+                with open(target_file_path, 'w') as file:
+                    file.write(original_content)
+            remove_backup(folder_path)
 
-            # Always generate report with current results
-            score = len(killed) / total_mutants
+        if analysis.build_times:
+            with open(os.path.join(folder_path, 'build_times.json'), 'w') as file:
+                json.dump(analysis.build_times, file, indent=4)
+        if analysis.fuzz_times:
+            write_fuzz_times(folder_path, analysis.fuzz_times)
+
+        # Always generate report with current results
+        score = len(killed) / total_mutants if total_mutants else 0
+        if analysis.no_coverage:
+            print(f"\n{len(analysis.no_coverage)} mutants are not covered by any test")
+        if analysis.timed_out:
+            print(f"\n{len(analysis.timed_out)} mutants were killed by the timeout")
+        estimate = estimate_score(strata, sample_results, confidence) if sample_width else None
+        if estimate:
+            analyzed = len(strata.keys() & sample_results.keys())
+            score = estimate[0]
+            print(f"\nESTIMATED MUTATION SCORE: {round(estimate[0] * 100, 2)}% ({confidence:.0%} confidence "
+                  f"interval: {round(estimate[1] * 100, 2)}%-{round(estimate[2] * 100, 2)}%, "
+                  f"{analyzed} of {len(strata)} mutants analyzed)")
+            append_results([make_estimate(folder_path, target_file_path, estimate, confidence, analyzed, len(strata))])
+        else:
             print(f"\nMUTATION SCORE: {round(score * 100, 2)}%")
-            generate_report(not_killed, folder_path, target_file_path, score)
+        with phase("report", file=target_file_path, survivors=len(not_killed)):
+            diffs = [get_mutant_diff(target_file_path, original_content, name, indexed_mutants[name])
+                     for name in not_killed if name in indexed_mutants]
+            generate_report(not_killed, folder_path, target_file_path, score, diffs=diffs)
+        # diff_not_killed.json is still written after each analysis, from every result so far
+        write_legacy_report(read_results(RESULTS_FILE))
+        print(f"Results appended to {RESULTS_FILE} and surviving mutants written to {LEGACY_REPORT_FILE}, "
+              f"run `mutation-core report` to aggregate them")
     except Exception as e:
         traceback.print_exc()
         print(f"An error occurred: {e}")
         raise
 
-    # Restore the file
-    run(f"git restore {target_file_path}")
-
     return killed, not_killed
@@ -0,0 +1,171 @@
+"""
+Python API to generate and analyze mutants without the command line.
+
+Mutants are generated lazily and applied one at a time, so a pipeline can stream any number
+of them into its own runner without writing them to disk:
+
+    from src.api import iter_mutants, run_mutants, command_runner
+
+    mutants = iter_mutants("src/wallet/coinselection.cpp", coverage="total_coverage.info")
+    results = run_mutants(mutants, command_runner("cmake --build build && ./build/bin/test_bitcoin"))
+    print(results["score"], [result.mutant for result in results["survivors"]])
+"""
+import os
+import time
+from typing import NamedTuple
+from src.gen_mutations import get_mutations, is_skipped_file, is_unit_test_file
+from src.get_changes import get_touched_lines
+from src.cov import load_coverage
+from src.analyze import run_test, get_status, STATUSES
+
+
+class Mutant(NamedTuple):
+    """A mutant: the line (1-based) of `file` replaced by `mutated` (with the line ending)."""
+    file: str
+    line: int
+    operator: str
+    original: str
+    mutated: str
+
+    def apply(self, content):
+        """Content of the file with this mutant applied."""
+        lines = content.splitlines(keepends=True)
+        lines[self.line - 1] = self.mutated
+        return "".join(lines)
+
+
+class MutantResult(NamedTuple):
+    mutant: Mutant
+    # "killed", "survived" or "timeout"
+    status: str
+    # Seconds spent running the mutant
+    duration: float
+
+
+def iter_mutants(files, root=None, lines=None, base=None, coverage=None, one_mutant=False,
+                 only_security_mutations=False, range_lines=None, skip_lines=None,
+                 branch_coverage=False, function_coverage=False):
+    """
+    Yield the mutants of `files` one at a time, with the same filters as `mutation-core mutate`.
+
+    Only one file is read at a time and no mutant is written to disk.
+
+    Args:
+        files: Path of a file or iterable of paths, relative to `root` (None with `base`: every
+               file touched since `base`, except the ones `mutation-core mutate` skips, e.g. docs)
+        root: Root of the repository (default: current directory)
+        lines: Lines (1-based) to mutate, for a single file (default: every line)
+        base: Only mutate the lines touched since this ref or in this range (e.g. upstream/master)
+        coverage: Path to an lcov file or coverage index from `load_coverage`, to only mutate
+                  covered lines
+        one_mutant: Create only one mutant per line
+        only_security_mutations: Only use the security operators
+        range_lines: (first, last) 0-based range of lines to mutate
+        skip_lines: {file: lines} to skip
+        branch_coverage: Skip condition mutants on lines with a branch never taken (with `coverage`)
+        function_coverage: Skip mutants in functions never called (with `coverage`)
+    """
+    if files is None and base is None:
+        raise ValueError("iter_mutants needs the files to mutate, or a base to mutate the files touched since")
+    if isinstance(coverage, str):
+        coverage = load_coverage(coverage, os.path.abspath(root or "."))
+    touched = None
+    if base is not None:
+        touched = get_touched_lines(base, cwd=root)
+        if files is None:
+            files = sorted(file_path for file_path in touched if not is_skipped_file(file_path))
+    if isinstance(files, str):
+        files = [files]
+
+    for file_path in files:
+        file_lines = lines
+        if touched is not None:
+            file_lines = touched.get(file_path)
+            if not file_lines:
+                continue
+        with open(os.path.join(root or "", file_path), 'r', encoding="utf8") as file:
+            source_code = file.readlines()
+        for line_num, mutated, operator_id in get_mutations(source_code, file_path, file_lines, one_mutant,
+                                                            only_security_mutations, range_lines, coverage,
+                                                            is_unit_test_file(file_path), skip_lines,
+                                                            branch_coverage, function_coverage):
+            yield Mutant(file_path, line_num + 1, operator_id, source_code[line_num], mutated)
+
+
+def command_runner(command, timeout=10000, root=None):
+    """Runner executing a shell command: the mutant survives if it passes."""
+    def runner(mutant):
+        return run_test(command, timeout, cwd=root)
+    return runner
+
+
+def iter_results(mutants, runner, root=None, write=True):
+    """
+    Run each mutant of an iterable and yield its MutantResult as soon as it is known.
+
+    Args:
+        mutants: Iterable of Mutant (e.g. from `iter_mutants`)
+        runner: Function (mutant) -> True if it survived, False if it was killed, src.analyze.TIMEOUT
+                if it was killed by the timeout (or "killed", "survived" or "timeout")
+        root: Root of the repository the files are relative to (default: current directory)
+        write: Write each mutant into its file before calling `runner`, the original file is
+               always restored afterwards (False: the runner applies the mutant itself)
+    """
+    current_path = None
+    original_content = None
+    try:
+        for mutant in mutants:
+            path = os.path.join(root or "", mutant.file)
+            if write and path != current_path:
+                if current_path is not None:
+                    with open(current_path, 'w', encoding="utf8") as file:
+                        file.write(original_content)
+                with open(path, 'r', encoding="utf8") as file:
+                    original_content = file.read()
+                current_path = path
+            start = time.time()
+            try:
+                if write:
+                    with open(path, 'w', encoding="utf8") as file:
+                        file.write(mutant.apply(original_content))
+                result = runner(mutant)
+            finally:
+                if write:
+                    with open(path, 'w', encoding="utf8") as file:
+                        file.write(original_content)
+            status = result if isinstance(result, str) else get_status(result)
+            if status not in STATUSES:
+                raise ValueError(f"Unknown status {status!r} for {mutant.file}:{mutant.line}, "
+                                 f"the runner must return one of {', '.join(STATUSES)}")
+            yield MutantResult(mutant, status, time.time() - start)
+    finally:
+        if current_path is not None:
+            with open(current_path, 'w', encoding="utf8") as file:
+                file.write(original_content)
+
+
+def run_mutants(mutants, runner, root=None, write=True, on_result=None):
+    """
+    Run every mutant of an iterable and summarize the results.
+
+    Only the surviving mutants are kept in memory.
+
+    Args:
+        mutants, runner, root, write: See `iter_results`
+        on_result: Function called with each MutantResult (optional)
+
+    Returns:
+        {"killed", "survived", "timeout" (counts), "total", "score" (timeouts count as killed),
+         "survivors" (MutantResult of the surviving mutants)}
+    """
+    summary = {"killed": 0, "survived": 0, "timeout": 0, "total": 0, "score": 0, "survivors": []}
+    for result in iter_results(mutants, runner, root, write):
+        summary[result.status] += 1
+        summary["total"] += 1
+        if result.status == "survived":
+            summary["survivors"].append(result)
+        if on_result:
+            on_result(result)
+    if summary["total"]:
+        summary["score"] = (summary["killed"] + summary["timeout"]) / summary["total"]
+    return summary
@@ -0,0 +1,258 @@
+import io
+import os
+import json
+import time
+import random
+import shutil
+import tempfile
+import tracemalloc
+import contextlib
+import src.gen_mutations as gen_mutations
+from src.analyze import analyze, run_command
+from src.cov import parse_coverage_index, load_coverage
+
+# Lines of the synthetic source files of each size
+SIZES = {"small": 200, "medium": 2000, "large": 20000}
+# Mutants analyzed to measure the overhead of `analyze` per mutant
+ANALYZED_MUTANTS = {"small": 20, "medium": 100, "large": 300}
+# Fails the comparison with a baseline when a benchmark is this much slower or bigger
+REGRESSION_THRESHOLD = 0.2
+# Differences below these are noise, not regressions
+MIN_DIFFERENCES = {"seconds": 0.005, "peak_memory": 1 << 20}
+# Killing every mutant immediately: only the overhead of `analyze` is measured
+FAKE_TEST_COMMAND = "false"
+
+CPP_LINES = [
+    "    if (a > b) {\n",
+    "        return a + b;\n",
+    "    }\n",
+    "    int total = count * 2;\n",
+    "    for (int i = 0; i < n; ++i) {\n",
+    "        total += values[i];\n",
+    "    if (x == y && y != z) return false;\n",
+    "    std::vector<int> values{1, 2, 3};\n",
+    "    // Comments are not mutated\n",
+    "    return total - offset;\n",
+    "    assert(value >= 0);\n",
+    "    data.resize(size / 2);\n",
+    "    LogPrintf(\"%s\\n\", message);\n",
+    "    while (remaining > 0) --remaining;\n",
+    "    return std::max(a, b);\n",
+]
+
+PY_LINES = [
+    "        self.log.info(\"Check the balance\")\n",
+    "        assert_equal(node.getbalance(), 50)\n",
+    "        self.generate(node, 101)\n",
+    "        if len(txs) > 1:\n",
+    "            node.sendrawtransaction(tx)\n",
+    "        assert_raises_rpc_error(-8, \"Invalid\", node.getblock, \"0\")\n",
+    "        for i in range(10):\n",
+    "            self.sync_all()\n",
+    "        self.wait_until(lambda: node.getblockcount() == 200)\n",
+    "        return True\n",
+]
+
+
+def generate_source(size, extension=".cpp", seed=0):
+    """Deterministic source file of `size` lines, looking like Bitcoin Core code (.cpp) or a functional test (.py)."""
+    rng = random.Random(seed)
+    if extension == ".py":
+        header = ["#!/usr/bin/env python3\n", "class BenchTest(BitcoinTestFramework):\n", "    def run_test(self):\n"]
+        templates = PY_LINES
+    else:
+        header = ["#include <vector>\n", "\n", "int f(int a, int b)\n", "{\n"]
+        templates = CPP_LINES
+    lines = header + [rng.choice(templates) for _ in range(size - len(header) - 1)]
+    lines.append("}\n" if extension != ".py" else "        pass\n")
+    return "".join(lines)
+
+
+def generate_lcov(file_paths, size, seed=0):
+    """Deterministic lcov data covering 70% of the lines of `file_paths`, with branch and function records."""
+    rng = random.Random(seed)
+    records = []
+    for file_path in file_paths:
+        records.append(f"SF:{file_path}\n")
+        for start in range(1, size, 50):
+            records.append(f"FN:{start},{min(start + 49, size)},function_{start}\n")
+            records.append(f"FNDA:{rng.randint(0, 3)},function_{start}\n")
+        for line in range(1, size + 1):
+            records.append(f"DA:{line},{rng.randint(1, 100) if rng.random() < 0.7 else 0}\n")
+            if line % 10 == 0:
+                records.append(f"BRDA:{line},0,0,{rng.randint(0, 5)}\n")
+                records.append(f"BRDA:{line},0,1,{rng.choice(['-', '0', '3'])}\n")
+        records.append("end_of_record\n")
+    return "".join(records)
+
+
+def measure(function, repeat=1):
+    """Run `function` `repeat` times. Returns (result, best time in seconds, peak traced memory in bytes).
+
+    The memory is traced in an extra run, so tracing does not slow down the timed ones.
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, best, peak
+
+
+@contextlib.contextmanager
+def scratch_folder():
+    """Temporary folder, used as the current directory and as the base path of the generated mutants."""
+    cwd = os.getcwd()
+    base_path = gen_mutations.BASE_PATH
+    root = tempfile.mkdtemp(prefix="mutation-core-bench-")
+    os.chdir(root)
+    gen_mutations.BASE_PATH = root
+    try:
+        yield root
+    finally:
+        gen_mutations.BASE_PATH = base_path
+        os.chdir(cwd)
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def write_file(path, content):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, 'w') as file:
+        file.write(content)
+
+
+def bench_generation(size, extension=".cpp", repeat=3):
+    """Generate the mutants of a synthetic file (compact index written to disk)."""
+    with scratch_folder() as root:
+        file_path = f"src/bench{extension}" if extension != ".py" else "test/functional/bench.py"
+        write_file(os.path.join(root, file_path), generate_source(SIZES[size], extension))
+
+        def generate():
+            shutil.rmtree(os.path.join(root, "muts-bench-" + extension[1:]), ignore_errors=True)
+            with contextlib.redirect_stdout(io.StringIO()):
+                return gen_mutations.mutate(file_path)
+
+        result, seconds, peak = measure(generate, repeat)
+    mutants = len(result["mutants"])
+    return {"benchmark": f"generate{extension}-{size}", "seconds": seconds, "peak_memory": peak,
+            "mutants": mutants, "mutants_per_second": mutants / seconds if seconds else 0}
+
+
+def bench_coverage(size, files=20, repeat=3):
+    """Parse a synthetic lcov file, then load it again from the coverage cache."""
+    with scratch_folder() as root:
+        coverage_path = os.path.join(root, "total_coverage.info")
+        write_file(coverage_path, generate_lcov([os.path.join(root, f"src/file_{i}.cpp") for i in range(files)],
+                                                SIZES[size]))
+        _, parse_seconds, peak = measure(lambda: parse_coverage_index(coverage_path, root), repeat)
+        cache_folder = os.path.join(root, "cache")
+        with contextlib.redirect_stdout(io.StringIO()):
+            load_coverage(coverage_path, root, cache_folder)
+            _, cached_seconds, _ = measure(lambda: load_coverage(coverage_path, root, cache_folder), repeat)
+        coverage_size = os.path.getsize(coverage_path)
+    return {"benchmark": f"coverage-{size}", "seconds": parse_seconds, "peak_memory": peak,
+            "cached_seconds": cached_seconds, "megabytes_per_second": coverage_size / 1e6 / parse_seconds}
+
+
+def bench_analysis(size, repeat=1):
+    """Analyze mutants with a test command doing nothing: the time left is the overhead of `analyze`."""
+    mutants = ANALYZED_MUTANTS[size]
+    with scratch_folder() as root:
+        write_file(os.path.join(root, "src/bench.cpp"), generate_source(SIZES[size]))
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = gen_mutations.mutate("src/bench.cpp", range_lines=[0, mutants])
+        folder = result["folder"]
+        index_path = os.path.join(folder, "mutants.json")
+        with open(index_path, 'r') as file:
+            index = json.load(file)
+        # Analyze exactly `mutants` mutants
+        index["mutants"] = index["mutants"][:mutants]
+        with open(index_path, 'w') as file:
+            json.dump(index, file)
+        mutants = len(index["mutants"])
+
+        def run_analysis():
+            with contextlib.redirect_stdout(io.StringIO()):
+                return analyze(folder, command=FAKE_TEST_COMMAND, survival_threshold=1)
+
+        _, seconds, peak = measure(run_analysis, repeat)
+        # Time spent running the test command itself
+        start = time.perf_counter()
+        for _ in range(10):
+            run_command(FAKE_TEST_COMMAND)
+        command_seconds = (time.perf_counter() - start) / 10
+    per_mutant = seconds / mutants if mutants else 0
+    return {"benchmark": f"analyze-{size}", "seconds": seconds, "peak_memory": peak, "mutants": mutants,
+            "per_mutant_overhead": max(0, per_mutant - command_seconds)}
+
+
+def compare_results(results, baseline, threshold=REGRESSION_THRESHOLD):
+    """Benchmarks of `results` slower or using more memory than in `baseline` by more than `threshold`."""
+    baseline = {result["benchmark"]: result for result in baseline}
+    regressions = []
+    for result in results:
+        previous = baseline.get(result["benchmark"])
+        if previous is None:
+            continue
+        for metric, min_difference in MIN_DIFFERENCES.items():
+            if (result[metric] > previous[metric] * (1 + threshold)
+                    and result[metric] - previous[metric] > min_difference):
+                regressions.append(f"{result['benchmark']}: {metric} {previous[metric]:.4g} -> {result[metric]:.4g}")
+    return regressions
+
+
+def print_results(results):
+    for result in results:
+        details = [f"{result['seconds']:.3f}s", f"{result['peak_memory'] / 1e6:.1f} MB peak"]
+        if "mutants_per_second" in result:
+            details.append(f"{result['mutants']} mutants, {result['mutants_per_second']:.0f} mutants/s")
+        if "cached_seconds" in result:
+            details.append(f"{result['megabytes_per_second']:.1f} MB/s, {result['cached_seconds']:.3f}s cached")
+        if "per_mutant_overhead" in result:
+            details.append(f"{result['mutants']} mutants, {result['per_mutant_overhead'] * 1000:.1f} ms overhead per mutant")
+        print(f"{result['benchmark']}: {', '.join(details)}")
+
+
+def run_benchmarks(sizes=("small", "medium"), repeat=3, output=None, baseline=None, threshold=REGRESSION_THRESHOLD):
+    """
+    Benchmark mutant generation, coverage parsing and the overhead of `analyze` on synthetic data.
+
+    Nothing outside a temporary folder is read or written (no network or Bitcoin Core checkout needed).
+
+    Args:
+        sizes: Sizes of the synthetic files (see SIZES)
+        repeat: Number of runs of each benchmark, the fastest is kept
+        output: Path to write the results to, as JSON (optional)
+        baseline: Path to the results of a previous run to compare with (optional)
+        threshold: Relative slowdown or memory growth reported as a regression (0.2 = 20%)
+
+    Returns:
+        (results, regressions)
+    """
+    results = []
+    for size in sizes:
+        results.append(bench_generation(size, ".cpp", repeat))
+        results.append(bench_generation(size, ".py", repeat))
+        results.append(bench_coverage(size, repeat=repeat))
+        results.append(bench_analysis(size))
+    print_results(results)
+
+    if output:
+        with open(output, 'w') as file:
+            json.dump(results, file, indent=4)
+    regressions = []
+    if baseline:
+        with open(baseline, 'r') as file:
+            regressions = compare_results(results, json.load(file), threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if not regressions:
+            print(f"No regression compared to {baseline}")
+    return results, regressions
@@ -0,0 +1,141 @@
+import os
+import json
+import time
+import shlex
+
+BUILD_DIR = "build"
+
+# Binaries needed by the default commands from `get_test_command`
+UNIT_TEST_TARGETS = ["test_bitcoin"]
+FUNCTIONAL_TEST_TARGETS = ["bitcoind", "bitcoin-cli", "bitcoin-tx", "bitcoin-util", "bitcoin-wallet"]
+
+
+def get_configure_command(build_dir=BUILD_DIR, ccache=False):
+    """CMake configure command, exporting compile_commands.json."""
+    configure_command = f"cmake -B {build_dir} -DCMAKE_EXPORT_COMPILE_COMMANDS=ON"
+    if ccache:
+        configure_command += " -DCMAKE_C_COMPILER_LAUNCHER=ccache -DCMAKE_CXX_COMPILER_LAUNCHER=ccache"
+    return configure_command
+
+
+def get_setup_command(build_dir=BUILD_DIR, jobs=0, ccache=False, clean=False):
+    """Command used before analyzing the mutants.
+
+    An existing configured build tree is reused (CMake only reconfigures what changed and
+    the build is incremental) unless `clean` is set. compile_commands.json is always exported
+    so `rebuild` can compile the mutated object alone.
+    """
+    build_command = f"cmake --build {build_dir}"
+    if jobs != 0:
+        build_command += f' -j{jobs}'
+    command = f"{get_configure_command(build_dir, ccache)} && {build_command}"
+    if clean:
+        command = f"rm -rf {build_dir} && {command}"
+    return command
+
+
+def find_compile_entry(target_file_path, build_dir=BUILD_DIR, cwd=None):
+    """Get the compile_commands.json entry of `target_file_path` (None if it is not a translation unit)."""
+    compile_commands = os.path.join(cwd or "", build_dir, "compile_commands.json")
+    if not os.path.isfile(compile_commands):
+        return None
+    with open(compile_commands, 'r') as file:
+        entries = json.load(file)
+    target = os.path.normpath(os.path.join(os.path.abspath(cwd or "."), target_file_path))
+    for entry in entries:
+        if os.path.normpath(os.path.join(entry["directory"], entry["file"])) == target:
+            return entry
+    return None
+
+
+def get_compile_arguments(entry):
+    return entry["arguments"] if "arguments" in entry else shlex.split(entry["command"])
+
+
+def get_object_file(entry, build_dir=BUILD_DIR, cwd=None):
+    """Object file of a compile_commands.json entry, relative to the build folder (None if unknown)."""
+    output = entry.get("output")
+    if output is None:
+        arguments = get_compile_arguments(entry)
+        if "-o" not in arguments[:-1]:
+            return None
+        output = arguments[arguments.index("-o") + 1]
+    build_path = os.path.abspath(os.path.join(cwd or "", build_dir))
+    return os.path.relpath(os.path.join(entry["directory"], output), build_path)
+
+
+def find_compile_command(target_file_path, build_dir=BUILD_DIR, cwd=None):
+    """Get the (command, directory) used to compile `target_file_path`.
+
+    With Makefiles, the command from compile_commands.json: the object is newer than the source
+    afterwards, so make does not compile it again. Ninja compares the source with the time it
+    built the object itself and would compile it again: the object is built through Ninja instead.
+
+    Returns None when the file is not a translation unit (e.g. a header).
+    """
+    entry = find_compile_entry(target_file_path, build_dir, cwd)
+    if entry is None:
+        return None
+    build_path = os.path.abspath(os.path.join(cwd or "", build_dir))
+    if os.path.isfile(os.path.join(build_path, "build.ninja")):
+        object_file = get_object_file(entry, build_dir, cwd)
+        if object_file is not None:
+            return f"cmake --build . --target {shlex.quote(object_file)}", build_path
+    command = entry.get("command") or shlex.join(entry["arguments"])
+    return command, entry["directory"]
+
+
+def get_link_targets(target_file_path, build_dir=BUILD_DIR, cwd=None):
+    """Binaries that must be relinked to run the default test command of `target_file_path`."""
+    if "functional" in target_file_path:
+        return []
+    targets = list(UNIT_TEST_TARGETS)
+    if "test" not in target_file_path:
+        targets += FUNCTIONAL_TEST_TARGETS
+    # Only keep the targets that exist in this build tree (e.g. wallet might be disabled)
+    built = set()
+    for _, _, files in os.walk(os.path.join(cwd or "", build_dir)):
+        built.update(f for f in files if f in targets)
+    return [target for target in targets if target in built]
+
+
+def get_link_command(target_file_path, jobs=0, build_dir=BUILD_DIR, cwd=None):
+    """Command relinking the binaries needed to test `target_file_path` (None if nothing must be built)."""
+    if "functional" in target_file_path:
+        return None
+    link_command = f"cmake --build {build_dir}"
+    targets = get_link_targets(target_file_path, build_dir, cwd)
+    if targets:
+        link_command += f" --target {' '.join(targets)}"
+    if jobs != 0:
+        link_command += f' -j{jobs}'
+    return link_command
+
+
+def rebuild(compile_command, link_command, run, timeout=10000, cwd=None):
+    """
+    Incrementally rebuild a mutated file: compile only its object and relink only the needed binaries.
+
+    Args:
+        compile_command: (command, directory) from `find_compile_command`, None for headers
+        link_command: Command from `get_link_command`
+        run: Function used to execute a command (command, timeout, cwd) -> bool
+        timeout: Maximum time for each step
+        cwd: Root of the checkout
+
+    Returns:
+        (success, compile_time, link_time)
+    """
+    compile_time = 0
+    if compile_command:
+        start = time.time()
+        success = run(compile_command[0], timeout, cwd=compile_command[1])
+        compile_time = time.time() - start
+        if not success:
+            return False, compile_time, 0
+
+    if link_command is None:
+        return True, compile_time, 0
+    start = time.time()
+    success = run(link_command, timeout, cwd=cwd)
+    return success, compile_time, time.time() - start
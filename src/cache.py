@@ -0,0 +1,123 @@
+import os
+import sqlite3
+import hashlib
+import pathlib
+from contextlib import closing
+from datetime import datetime
+
+BASE_PATH = str(pathlib.Path().resolve())
+CACHE_PATH = os.path.join(BASE_PATH, '.mutation-core', 'results.db')
+
+
+def connect(cache_path=CACHE_PATH):
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    connection = sqlite3.connect(cache_path, timeout=60)
+    connection.execute("""CREATE TABLE IF NOT EXISTS results (
+                              run_key TEXT PRIMARY KEY,
+                              mutant_key TEXT NOT NULL,
+                              file TEXT,
+                              line INTEGER,
+                              command TEXT,
+                              status TEXT NOT NULL,
+                              duration REAL,
+                              date TEXT)""")
+    connection.execute("CREATE INDEX IF NOT EXISTS results_mutant_key ON results (mutant_key)")
+    # Tests which killed mutants, used to run the most likely to fail first
+    connection.execute("""CREATE TABLE IF NOT EXISTS kills (
+                              file TEXT NOT NULL,
+                              line INTEGER,
+                              test TEXT NOT NULL,
+                              date TEXT)""")
+    connection.execute("CREATE INDEX IF NOT EXISTS kills_file ON kills (file)")
+    return connection
+
+
+def get_changed_lines(original_lines, mutant_lines):
+    """(first changed line index, removed lines, added lines) between two versions of a file."""
+    start = 0
+    while (start < len(original_lines) and start < len(mutant_lines)
+           and original_lines[start] == mutant_lines[start]):
+        start += 1
+    end = 0
+    while (end < len(original_lines) - start and end < len(mutant_lines) - start
+           and original_lines[-1 - end] == mutant_lines[-1 - end]):
+        end += 1
+    return start, original_lines[start:len(original_lines) - end], mutant_lines[start:len(mutant_lines) - end]
+
+
+def get_mutant_key(original_content, mutant_content):
+    """Hash of the original file content and of the mutant diff."""
+    start, removed, added = get_changed_lines(original_content.splitlines(keepends=True),
+                                              mutant_content.splitlines(keepends=True))
+    digest = hashlib.sha256(original_content.encode())
+    digest.update(f"\0{start}\0".encode())
+    digest.update("".join(removed).encode())
+    digest.update(b"\0")
+    digest.update("".join(added).encode())
+    return digest.hexdigest()
+
+
+def hash_sources(paths):
+    """Hash of the content of files (and folders, recursively), used to invalidate results when tests change."""
+    digest = hashlib.sha256()
+    files = []
+    for path in paths or []:
+        if os.path.isdir(path):
+            for root, _, filenames in os.walk(path):
+                files += [os.path.join(root, filename) for filename in filenames]
+        else:
+            files.append(path)
+    for file_path in sorted(files):
+        digest.update(file_path.encode())
+        with open(file_path, 'rb') as file:
+            digest.update(hashlib.sha256(file.read()).digest())
+    return digest.hexdigest()
+
+
+def get_run_key(mutant_key, command, sources_hash=""):
+    return hashlib.sha256(f"{mutant_key}\0{command}\0{sources_hash}".encode()).hexdigest()
+
+
+def get_cached_result(run_key, cache_path=CACHE_PATH):
+    """Get (status, duration) of a previous analysis, None if it was never analyzed."""
+    with closing(connect(cache_path)) as connection:
+        row = connection.execute("SELECT status, duration FROM results WHERE run_key = ?",
+                                 (run_key,)).fetchone()
+    return row
+
+
+def get_cached_mutant_keys(statuses=None, cache_path=CACHE_PATH):
+    """Keys of every mutant already analyzed, with any command (only with one of `statuses` if given)."""
+    if not os.path.isfile(cache_path):
+        return set()
+    with closing(connect(cache_path)) as connection:
+        if statuses is None:
+            rows = connection.execute("SELECT DISTINCT mutant_key FROM results")
+        else:
+            rows = connection.execute(f"SELECT DISTINCT mutant_key FROM results "
+                                      f"WHERE status IN ({', '.join('?' * len(statuses))})", tuple(statuses))
+        return {row[0] for row in rows}
+
+
+def store_result(run_key, mutant_key, status, duration, file=None, line=None, command=None,
+                 cache_path=CACHE_PATH):
+    with closing(connect(cache_path)) as connection:
+        with connection:
+            connection.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                               (run_key, mutant_key, file, line, command, status, duration,
+                                datetime.now().strftime("%d/%m/%Y %H:%M:%S")))
+
+
+def store_kill(file, line, test, cache_path=CACHE_PATH):
+    with closing(connect(cache_path)) as connection:
+        with connection:
+            connection.execute("INSERT INTO kills VALUES (?, ?, ?, ?)",
+                               (file, line, test, datetime.now().strftime("%d/%m/%Y %H:%M:%S")))
+
+
+def get_kills(file, cache_path=CACHE_PATH):
+    """(line, test) of every mutant of `file` killed by a single test."""
+    if not os.path.isfile(cache_path):
+        return []
+    with closing(connect(cache_path)) as connection:
+        return connection.execute("SELECT line, test FROM kills WHERE file = ?", (file,)).fetchall()
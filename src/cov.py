@@ -1,30 +1,223 @@
-import re
+import os
+import pickle
+import hashlib
+import pathlib
+from array import array
 
-def parse_coverage_file(coverage_file_path):
-    coverage_data = {}
-    current_file = None
+BASE_PATH = str(pathlib.Path().resolve())
+COVERAGE_CACHE_PATH = os.path.join(BASE_PATH, '.mutation-core', 'coverage')
+# Bump when the format of the cached coverage changes
+COVERAGE_CACHE_VERSION = 2
+
+
+def normalize_path(source_file, root=BASE_PATH):
+    """Path of `source_file` relative to `root` when it is inside it, so it can be looked up directly."""
+    source_file = os.path.normpath(source_file)
+    if os.path.isabs(source_file) and source_file.startswith(root + os.sep):
+        return os.path.relpath(source_file, root)
+    return source_file
 
-    # Regular expressions for parsing lines
-    file_pattern = re.compile(r"^SF:(.+)$") # Source file
-    line_pattern = re.compile(r"^DA:(\d+),(\d+)$") # Line coverage
 
+def iter_coverage_records(coverage_file_path):
+    """
+    Stream the records of an lcov file as (source file, record).
+
+    The record has the covered lines ("lines": set), the number of times each branch was
+    taken by line ("branches": {line: [taken]}), the first line and last line (None if unknown)
+    of each function ("functions": {name: [start, end]}) and the number of calls of each
+    function ("function_hits": {name: hits}).
+    """
+    current_file = None
+    record = None
     with open(coverage_file_path, 'r') as file:
         for line in file:
-            line = line.strip()
-
-            # Check for source file
-            file_match = file_pattern.match(line)
-            if file_match:
-                current_file = file_match.group(1)
-                coverage_data[current_file] = []
+            if line.startswith("SF:"):
+                current_file = line[3:].strip()
+                record = {"lines": set(), "branches": {}, "functions": {}, "function_hits": {}}
+                continue
+            if current_file is None:
+                continue
+            try:
+                if line.startswith("DA:"):
+                    # DA:<line>,<hits>[,<checksum>]
+                    fields = line[3:].split(",")
+                    if int(fields[1]) > 0:
+                        record["lines"].add(int(fields[0]))
+                elif line.startswith("BRDA:"):
+                    # BRDA:<line>,[<exception>]<block>,<branch>,<taken or - if the line was not executed>
+                    fields = line[5:].strip().split(",")
+                    taken = 0 if fields[3] == "-" else int(fields[3])
+                    record["branches"].setdefault(int(fields[0]), []).append(taken)
+                elif line.startswith("FNDA:"):
+                    # FNDA:<hits>,<name>
+                    hits, name = line[5:].strip().split(",", 1)
+                    record["function_hits"][name] = record["function_hits"].get(name, 0) + int(hits)
+                elif line.startswith("FN:"):
+                    # FN:<start>,<name> or FN:<start>,<end>,<name>
+                    fields = line[3:].strip().split(",")
+                    if len(fields) > 2 and fields[1].isdigit():
+                        record["functions"][",".join(fields[2:])] = [int(fields[0]), int(fields[1])]
+                    else:
+                        record["functions"][",".join(fields[1:])] = [int(fields[0]), None]
+                elif line.startswith("end_of_record"):
+                    yield current_file, record
+                    current_file = None
+            except (IndexError, ValueError):
                 continue
+    if current_file is not None:
+        yield current_file, record
 
-            # Check for line coverage (DA:line_number,hits)
-            line_match = line_pattern.match(line)
-            if line_match and current_file:
-                line_number = int(line_match.group(1))
-                hits = int(line_match.group(2))
-                if hits > 0 and line_number not in coverage_data[current_file]:
-                    coverage_data[current_file].append(line_number)
 
+def parse_coverage_file(coverage_file_path):
+    """Get {source file: sorted list of covered lines} from an lcov file."""
+    coverage_data = {}
+    for source_file, record in iter_coverage_records(coverage_file_path):
+        coverage_data[source_file] = sorted(record["lines"].union(coverage_data.get(source_file, ())))
     return coverage_data
+
+
+def get_function_ranges(record):
+    """Sorted (first line, last line, hits) of the functions of a record.
+
+    Without an end line, a function ends before the next one starts.
+    """
+    starts = sorted((start, end, record["function_hits"].get(name, 0))
+                    for name, (start, end) in record["functions"].items())
+    ranges = []
+    for i, (start, end, hits) in enumerate(starts):
+        if end is None:
+            end = starts[i + 1][0] - 1 if i + 1 < len(starts) else None
+        ranges.append((start, end, hits))
+    return ranges
+
+
+def parse_coverage_index(coverage_file_path, root=BASE_PATH):
+    """
+    Get the coverage index of an lcov file: {normalized source file: file coverage}.
+
+    The file coverage has the sorted covered lines ("lines"), the lines with a branch that
+    was never taken ("partial_branches") and the (first line, last line, hits) of its functions
+    ("functions").
+    """
+    records = {}
+    for source_file, record in iter_coverage_records(coverage_file_path):
+        source_file = normalize_path(source_file, root)
+        if source_file in records:
+            # Merge records of the same file (e.g. from several test binaries)
+            previous = records[source_file]
+            record["lines"].update(previous["lines"])
+            for line, taken in previous["branches"].items():
+                current = record["branches"].setdefault(line, [0] * len(taken))
+                if len(current) == len(taken):
+                    record["branches"][line] = [a + b for a, b in zip(current, taken)]
+            for name, function_range in previous["functions"].items():
+                record["functions"].setdefault(name, function_range)
+            for name, hits in previous["function_hits"].items():
+                record["function_hits"][name] = record["function_hits"].get(name, 0) + hits
+        records[source_file] = record
+
+    return {source_file: {"lines": array('I', sorted(record["lines"])),
+                          "partial_branches": array('I', sorted(line for line, taken in record["branches"].items()
+                                                                if not all(taken))),
+                          "functions": get_function_ranges(record)}
+            for source_file, record in records.items()}
+
+
+def hash_file(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_coverage(coverage_file_path, root=BASE_PATH, cache_folder=COVERAGE_CACHE_PATH):
+    """
+    Get the coverage index of an lcov file, reusing the one parsed by a previous run.
+
+    The cached index is used when the file has the same modification time and size,
+    or the same content.
+
+    Args:
+        coverage_file_path: Path to the lcov file
+        root: Folder the source files are relative to
+        cache_folder: Folder of the cached indexes (None to always parse the file)
+    """
+    if cache_folder is None:
+        return parse_coverage_index(coverage_file_path, root)
+
+    coverage_file_path = os.path.abspath(coverage_file_path)
+    stat = os.stat(coverage_file_path)
+    cache_name = hashlib.sha256(f"{coverage_file_path}\0{root}".encode()).hexdigest()
+    cache_path = os.path.join(cache_folder, f"{cache_name}.pickle")
+
+    cached = None
+    if os.path.isfile(cache_path):
+        try:
+            with open(cache_path, 'rb') as file:
+                cached = pickle.load(file)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            cached = None
+    if cached and cached["version"] == COVERAGE_CACHE_VERSION:
+        if (cached["mtime"], cached["size"]) == (stat.st_mtime_ns, stat.st_size):
+            return cached["coverage"]
+    file_hash = hash_file(coverage_file_path)
+    if cached and cached["version"] == COVERAGE_CACHE_VERSION and cached["sha256"] == file_hash:
+        coverage = cached["coverage"]
+    else:
+        print(f"Parsing {coverage_file_path}...")
+        coverage = parse_coverage_index(coverage_file_path, root)
+
+    os.makedirs(cache_folder, exist_ok=True)
+    with open(cache_path + ".tmp", 'wb') as file:
+        pickle.dump({"version": COVERAGE_CACHE_VERSION, "mtime": stat.st_mtime_ns, "size": stat.st_size,
+                     "sha256": file_hash, "coverage": coverage}, file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(cache_path + ".tmp", cache_path)
+    return coverage
+
+
+def get_file_coverage(coverage, file_path):
+    """Coverage of `file_path` from a coverage index, None if it has no data for it."""
+    file_path = os.path.normpath(file_path)
+    file_coverage = coverage.get(file_path)
+    if file_coverage is None:
+        # The coverage was generated from another folder (e.g. on another machine)
+        suffix = os.sep + file_path
+        for source_file, source_coverage in coverage.items():
+            if source_file.endswith(suffix):
+                return source_coverage
+    return file_coverage
+
+
+def get_covered_lines(coverage, file_path):
+    """Covered lines (1-based) of `file_path` as a set, empty if the coverage has no data for it."""
+    file_coverage = get_file_coverage(coverage, file_path)
+    return set(file_coverage["lines"]) if file_coverage else set()
+
+
+def get_partial_branch_lines(coverage, file_path):
+    """Lines (1-based) of `file_path` with at least one branch that was never taken."""
+    file_coverage = get_file_coverage(coverage, file_path)
+    return set(file_coverage["partial_branches"]) if file_coverage else set()
+
+
+def get_unexecuted_function_lines(coverage, file_path):
+    """
+    Lines (1-based) of `file_path` belonging only to functions that were never called.
+
+    A line is executed when any function covering it was called (e.g. another instantiation of
+    a template with the same range) or when it was hit itself: without end lines (lcov 1.x), the
+    range of an uncalled lambda runs over the rest of the function around it.
+    """
+    file_coverage = get_file_coverage(coverage, file_path)
+    if not file_coverage:
+        return set()
+    lines = set()
+    executed = set(file_coverage["lines"])
+    for start, end, hits in file_coverage["functions"]:
+        function_lines = range(start, (end if end is not None else start) + 1)
+        if hits == 0:
+            lines.update(function_lines)
+        else:
+            executed.update(function_lines)
+    return lines - executed
@@ -0,0 +1,403 @@
+import os
+import json
+import time
+import socket
+import hashlib
+import threading
+import urllib.error
+import urllib.request
+from collections import deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from src.report import (
+    generate_report,
+    make_result,
+    make_start,
+    append_results,
+    read_results,
+    write_legacy_report,
+    LEGACY_REPORT_FILE
+)
+from src.analyze import (
+    run,
+    run_test,
+    get_status,
+    get_test_command,
+    calibrate_timeout,
+    STATUSES,
+    get_mutant_files
+)
+from src.build import (
+    get_setup_command,
+    find_compile_command,
+    get_link_command,
+    rebuild
+)
+from src.schemata import read_schemata, get_mutant_name
+from src.mutants import read_index, apply_mutant, get_diff, get_mutant_diff
+from src.journal import read_journal, reset_journal, append_result, backup_original, restore_original, remove_backup
+from src.test_selection import get_mutated_line
+from src.profiling import phase, count
+
+DEFAULT_PORT = 8765
+# Time given to a worker to report the result of a mutant before it is given to another worker
+LEASE_TIMEOUT = 3600
+# Time a worker waits before asking again when every remaining mutant is leased
+POLL_INTERVAL = 5
+# Folder of a checkout where a worker keeps the original of the file it mutates, and its path
+WORK_FOLDER = os.path.join(".mutation-core", "work")
+
+
+def hash_content(content):
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+class Coordinator:
+    """
+    Mutants of one or more folders, leased to workers one at a time.
+
+    A lease expires after `lease_timeout` seconds without result, and the mutant
+    goes back to the queue so a lost worker does not block the analysis.
+    """
+
+    def __init__(self, folder_paths, lease_timeout=LEASE_TIMEOUT, resume=False):
+        self.lease_timeout = lease_timeout
+        self.lock = threading.Lock()
+        self.folders = []
+        self.items = []
+        self.pending = deque()
+        self.leases = {}
+        self.results = {}
+        for folder_path in folder_paths:
+            self.add_folder(folder_path, resume)
+        self.finished = threading.Event()
+        if len(self.results) == len(self.items):
+            self.finished.set()
+
+    def add_folder(self, folder_path, resume):
+        with open(os.path.join(folder_path, 'original_file.txt'), 'r') as file:
+            target_file_path = file.readline()
+        with open(target_file_path, 'r') as file:
+            original_content = file.read()
+        # Schemata mutants are applied one by one, like the ones of the compact index
+        schemata = read_schemata(folder_path)
+        indexed_mutants = {**read_index(folder_path),
+                           **({get_mutant_name(mutant): mutant for mutant in schemata[1]} if schemata else {})}
+        names = get_mutant_files(folder_path) + list(indexed_mutants)
+
+        done = read_journal(folder_path) if resume else {}
+        if not resume:
+            reset_journal(folder_path)
+            append_results([make_start(folder_path, target_file_path)])
+        folder = {"path": folder_path, "file": target_file_path, "original": original_content,
+                  "original_hash": hash_content(original_content), "indexed": indexed_mutants, "names": names}
+        self.folders.append(folder)
+        for name in names:
+            item_id = len(self.items)
+            self.items.append((folder, name))
+            if name in done:
+                self.results[item_id] = done[name]
+            else:
+                self.pending.append(item_id)
+        print(f"{folder_path}: {len(names)} mutants ({len(done)} already analyzed)")
+
+    def read_mutant(self, folder, name):
+        if name in folder["indexed"]:
+            return apply_mutant(folder["original"], folder["indexed"][name])
+        with open(os.path.join(folder["path"], name), 'r') as file:
+            return file.read()
+
+    def expire_leases(self):
+        now = time.time()
+        for item_id, (worker, deadline) in list(self.leases.items()):
+            if deadline < now:
+                print(f"Lease of {self.items[item_id][1]} by {worker} expired")
+                del self.leases[item_id]
+                self.pending.appendleft(item_id)
+
+    def lease(self, worker):
+        """Next work item for `worker`, None if every remaining mutant is leased."""
+        with self.lock:
+            self.expire_leases()
+            if not self.pending:
+                return None
+            item_id = self.pending.popleft()
+            self.leases[item_id] = (worker, time.time() + self.lease_timeout)
+        folder, name = self.items[item_id]
+        print(f"[{len(self.results) + 1}/{len(self.items)}] {name} leased by {worker}")
+        return {"id": item_id, "name": name, "file": folder["file"], "original_hash": folder["original_hash"],
+                "content": self.read_mutant(folder, name)}
+
+    def complete(self, item_id, worker, status, duration=None, command=None):
+        with self.lock:
+            # A late result from an expired lease is still valid
+            self.leases.pop(item_id, None)
+            if item_id in self.results:
+                return
+            if item_id in self.pending:
+                self.pending.remove(item_id)
+            folder, name = self.items[item_id]
+            self.results[item_id] = status
+            append_result(folder["path"], name, status, worker=worker)
+            mutant = folder["indexed"].get(name)
+            content = self.read_mutant(folder, name)
+            diff = get_diff(folder["file"], folder["original"], name, content) if status == "survived" else None
+            append_results([make_result(folder["path"], folder["file"], name, status,
+                                        operator=mutant["operator"] if mutant else None,
+                                        line=mutant["line"] if mutant else get_mutated_line(folder["original"], content),
+                                        duration=duration, command=command, diff=diff, worker=worker)])
+            print(f"{name}: {status} ({worker})")
+            if len(self.results) == len(self.items):
+                self.finished.set()
+
+    def get_status(self):
+        with self.lock:
+            return {"total": len(self.items), "done": len(self.results),
+                    "leased": len(self.leases), "pending": len(self.pending)}
+
+    def report(self):
+        """Generate the report of every folder, as `analyze` does."""
+        for folder in self.folders:
+            statuses = {name: self.results[item_id]
+                        for item_id, (item_folder, name) in enumerate(self.items)
+                        if item_folder is folder and item_id in self.results}
+            not_killed = [name for name, status in statuses.items() if status in ("survived", "no_coverage")]
+            killed = [name for name, status in statuses.items() if status not in ("survived", "no_coverage")]
+            score = len(killed) / len(folder["names"]) if folder["names"] else 0
+            print(f"\n{folder['path']}")
+            print(f"MUTATION SCORE: {round(score * 100, 2)}%")
+            diffs = [get_mutant_diff(folder["file"], folder["original"], name, folder["indexed"][name])
+                     for name in not_killed if name in folder["indexed"]]
+            generate_report(not_killed, folder["path"], folder["file"], score, diffs=diffs)
+        write_legacy_report(read_results())
+        print(f"Surviving mutants written to {LEGACY_REPORT_FILE}")
+
+
+def make_server(coordinator, host="127.0.0.1", port=DEFAULT_PORT):
+    """HTTP server exchanging JSON with the workers: POST /lease, POST /result and GET /status."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def send_json(self, code, data=None):
+            body = json.dumps(data).encode() if data is not None else b""
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def read_json(self):
+            length = int(self.headers.get("Content-Length", 0))
+            return json.loads(self.rfile.read(length) or b"{}")
+
+        def do_GET(self):
+            if self.path == "/status":
+                self.send_json(200, coordinator.get_status())
+            else:
+                self.send_json(404)
+
+        def do_POST(self):
+            request = self.read_json()
+            if self.path == "/lease":
+                if coordinator.finished.is_set():
+                    # Nothing left: the worker can stop
+                    self.send_json(410)
+                    return
+                item = coordinator.lease(request.get("worker", self.client_address[0]))
+                if item is None:
+                    # Every remaining mutant is leased, ask again later
+                    self.send_json(204)
+                else:
+                    self.send_json(200, item)
+            elif self.path == "/result":
+                if (request.get("status") not in STATUSES or not 0 <= request.get("id", -1) < len(coordinator.items)
+                        or not isinstance(request.get("duration", 0), (int, float, type(None)))):
+                    self.send_json(400)
+                    return
+                coordinator.complete(request["id"], request.get("worker", self.client_address[0]),
+                                     request["status"], request.get("duration"), request.get("command"))
+                self.send_json(200, {})
+            else:
+                self.send_json(404)
+
+        def log_message(self, format, *args):
+            pass
+
+    return ThreadingHTTPServer((host, port), Handler)
+
+
+def serve(folder_paths, host="127.0.0.1", port=DEFAULT_PORT, lease_timeout=LEASE_TIMEOUT, resume=False):
+    """
+    Publish the mutants of `folder_paths` to workers and generate the reports once all are analyzed.
+
+    Args:
+        folder_paths: Paths to mutants folders
+        host: Address to listen on (e.g. 0.0.0.0 to accept workers from other machines)
+        port: Port to listen on
+        lease_timeout: Seconds a worker has to report the result of a mutant
+        resume: Skip the mutants already analyzed according to the folders' progress journals
+    """
+    coordinator = Coordinator(folder_paths, lease_timeout, resume)
+    server = make_server(coordinator, host, port)
+    print(f"* {len(coordinator.items)} MUTANTS, serving on {host}:{server.server_address[1]} *")
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        while not coordinator.finished.wait(1):
+            pass
+        # Let the workers see there is nothing left before stopping
+        time.sleep(POLL_INTERVAL)
+    finally:
+        server.shutdown()
+        server.server_close()
+    coordinator.report()
+    return coordinator
+
+
+def post(server, path, data):
+    """POST `data` to the coordinator, returns (HTTP status, response)."""
+    request = urllib.request.Request(f"http://{server}{path}", data=json.dumps(data).encode(),
+                                     headers={"Content-Type": "application/json"}, method="POST")
+    try:
+        with urllib.request.urlopen(request, timeout=60) as response:
+            body = response.read()
+            return response.status, json.loads(body) if body else None
+    except urllib.error.HTTPError as e:
+        return e.code, None
+
+
+def restore_builds(file_paths, build_steps, run, timeout=10000, cwd=None):
+    """
+    Rebuild the objects and binaries built with mutants of `file_paths`, once the original files are back.
+
+    Headers have no object of their own: their link command rebuilds the objects including them.
+
+    Args:
+        file_paths: Files whose original content was restored
+        build_steps: {file: (compile command, link command)}
+        run: Function used to execute a command (command, timeout, cwd) -> bool
+        timeout: Maximum time for each step
+        cwd: Root of the checkout
+    """
+    for file_path in sorted(file_paths):
+        compile_command, link_command = build_steps[file_path]
+        rebuild(compile_command, link_command, run, timeout, cwd=cwd)
+
+
+def restore_work_file(root=None):
+    """Restore the file left mutated by a worker which was killed. Returns its path, None if there was none."""
+    folder_path = os.path.join(root or "", WORK_FOLDER)
+    path_file = os.path.join(folder_path, "original_file.txt")
+    if not os.path.isfile(path_file):
+        return None
+    with open(path_file, 'r') as file:
+        file_path = file.read()
+    if not restore_original(folder_path, os.path.join(root or "", file_path)):
+        return None
+    remove_backup(folder_path)
+    return file_path
+
+
+def work(server, command="", jobs=0, timeout=10000, ccache=False, clean_build=False, root=None, worker=None,
+         timeout_factor=0):
+    """
+    Analyze mutants leased from a coordinator until none are left.
+
+    The original of the mutated file is kept in WORK_FOLDER while a mutant is applied, so a worker
+    started again after being killed restores it first.
+
+    Args:
+        server: host:port of the coordinator
+        command: Test command to run (default: build incrementally and run the tests of the file)
+        jobs: Number of parallel jobs
+        timeout: Maximum execution time per mutant
+        ccache: Configure the build to use ccache (only without command)
+        clean_build: Remove the build folder before building (only without command)
+        root: Checkout to apply the mutants into, at the same commit as the coordinator (default: current directory)
+        worker: Name reported to the coordinator (default: host name and process id)
+        timeout_factor: Time the tests of each file without mutant first and stop each mutant after
+                        this multiple of that time (at most `timeout`, 0 = always use `timeout`, only
+                        without command)
+    """
+    worker = worker or f"{socket.gethostname()}-{os.getpid()}"
+    work_folder = os.path.join(root or "", WORK_FOLDER)
+    restored = restore_work_file(root)
+    if restored:
+        print(f"Restored {restored} left mutated by a killed worker")
+    build_steps = {}
+    # Calibrated timeout of each test command
+    timeouts = {}
+    # Files whose object was last built with a mutant
+    mutated_objects = set()
+    connected = False
+    analyzed = 0
+    while True:
+        try:
+            code, item = post(server, "/lease", {"worker": worker})
+        except urllib.error.URLError:
+            if connected:
+                # The coordinator stops once every result is in
+                break
+            raise
+        connected = True
+        if code == 410:
+            break
+        if code == 204:
+            time.sleep(POLL_INTERVAL)
+            continue
+
+        target = os.path.join(root or "", item["file"])
+        with open(target, 'r') as file:
+            original_content = file.read()
+        if hash_content(original_content) != item["original_hash"]:
+            raise Exception(f"{item['file']} differs from the coordinator's, checkout the same commit")
+
+        if not command:
+            if not build_steps:
+                setup_command = get_setup_command(jobs=jobs, ccache=ccache, clean=clean_build)
+                with phase("setup_build", command=setup_command):
+                    run(setup_command, cwd=root)
+            if item["file"] not in build_steps:
+                build_steps[item["file"]] = (find_compile_command(item["file"], cwd=root),
+                                             get_link_command(item["file"], jobs, cwd=root))
+            # Binaries must not keep the mutants of previous items (e.g. when testing a functional test next)
+            restore_builds(mutated_objects - {item["file"]}, build_steps, run, timeout, cwd=root)
+            mutated_objects = {item["file"]}
+
+        mutant_command = command or get_test_command(item["file"])
+        if not command and timeout_factor and mutant_command not in timeouts:
+            # The build has no mutant at this point
+            timeouts[mutant_command] = calibrate_timeout(mutant_command, timeout, timeout_factor, cwd=root)
+        print(f"Analyzing {item['name']}")
+        start = time.time()
+        with phase("mutant", file=item["file"], mutant=item["name"]) as args:
+            os.makedirs(work_folder, exist_ok=True)
+            with open(os.path.join(work_folder, "original_file.txt"), 'w') as file:
+                file.write(item["file"])
+            backup_original(work_folder, original_content)
+            try:
+                with open(target, 'w') as file:
+                    file.write(item["content"])
+                success = True
+                if not command:
+                    compile_command, link_command = build_steps[item["file"]]
+                    with phase("build", mutant=item["name"]):
+                        success, _, _ = rebuild(compile_command, link_command, run, timeout, cwd=root)
+                if success:
+                    with phase("test", mutant=item["name"]):
+                        result = run_test(mutant_command, timeouts.get(mutant_command, timeout), cwd=root)
+                else:
+                    count("compile_failures")
+                    result = False
+            finally:
+                with open(target, 'w') as file:
+                    file.write(original_content)
+                remove_backup(work_folder)
+            args["status"] = get_status(result)
+
+        status = get_status(result)
+        count("mutants", status=status)
+        print(f"{item['name']}: {status}")
+        post(server, "/result", {"id": item["id"], "worker": worker, "status": status,
+                                 "duration": time.time() - start, "command": mutant_command})
+        analyzed += 1
+    print(f"{worker}: {analyzed} mutants analyzed")
+    return analyzed
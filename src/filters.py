@@ -0,0 +1,159 @@
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from src.build import get_compile_arguments
+
+STILLBORN_FILE = "stillborn.json"
+EQUIVALENT_FILE = "equivalent.json"
+
+# Arguments producing outputs (object and dependency files) that a syntax check does not need
+SKIPPED_ARGUMENTS = ("-c", "-MD", "-MMD")
+SKIPPED_ARGUMENTS_WITH_VALUE = ("-o", "-MF", "-MT", "-MQ")
+
+
+def get_check_arguments(entry, mutant_path, object_path=None):
+    """
+    Compiler arguments checking `mutant_path` with the flags used to compile `entry`.
+
+    Args:
+        entry: compile_commands.json entry of the original file
+        mutant_path: Copy of the original file with the mutant applied
+        object_path: Object file to write, only the syntax is checked when None
+    """
+    source = os.path.normpath(os.path.join(entry["directory"], entry["file"]))
+    source_dir = os.path.dirname(source)
+    arguments = []
+    skip_value = False
+    for argument in get_compile_arguments(entry):
+        if skip_value:
+            skip_value = False
+        elif argument in SKIPPED_ARGUMENTS_WITH_VALUE:
+            skip_value = True
+        elif argument in SKIPPED_ARGUMENTS or argument.startswith("-o"):
+            continue
+        elif os.path.normpath(os.path.join(entry["directory"], argument)) == source:
+            continue
+        else:
+            arguments.append(argument)
+    # The mutant is compiled from another folder, quoted includes must still be found next to the original
+    arguments += ["-iquote", source_dir]
+    if object_path is None:
+        return arguments + ["-fsyntax-only", mutant_path]
+    # Without debug info and with the original path in __FILE__, equivalent code gives identical objects
+    return arguments + ["-g0", f"-ffile-prefix-map={os.path.dirname(mutant_path)}={source_dir}",
+                        "-c", mutant_path, "-o", object_path]
+
+
+def compile_mutant(content, target_file_path, entry, hash_object=False, timeout=600):
+    """
+    Compile `content` in place of `target_file_path` with the flags of its compile_commands.json `entry`.
+
+    Returns False if it does not compile. Otherwise returns True, or the hash of the object file
+    with `hash_object` (None if it took longer than `timeout`).
+    """
+    temp_dir = tempfile.mkdtemp(prefix="mutation-core-")
+    try:
+        mutant_path = os.path.join(temp_dir, os.path.basename(target_file_path))
+        object_path = os.path.join(temp_dir, "mutant.o") if hash_object else None
+        with open(mutant_path, 'w', encoding="utf8") as file:
+            file.write(content)
+        result = subprocess.run(get_check_arguments(entry, mutant_path, object_path), cwd=entry["directory"],
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=timeout)
+        if result.returncode != 0:
+            return False
+        if not hash_object:
+            return True
+        with open(object_path, 'rb') as file:
+            return hashlib.sha256(file.read()).hexdigest()
+    except subprocess.TimeoutExpired:
+        # Too slow to tell, let the analysis decide
+        return None if hash_object else True
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def check_syntax(content, target_file_path, entry=None):
+    """Whether a mutant of `target_file_path` is valid code.
+
+    Python files are compiled in process, C++ files need their compile_commands.json `entry`
+    (without it, the mutant is considered valid).
+    """
+    if target_file_path.endswith(".py"):
+        try:
+            compile(content, target_file_path, "exec")
+            return True
+        except (SyntaxError, ValueError):
+            return False
+    if entry is None:
+        return True
+    return compile_mutant(content, target_file_path, entry)
+
+
+def find_stillborn_mutants(names, read_mutant, target_file_path, entry=None, jobs=0):
+    """
+    Get the mutants which do not compile, checking them in parallel.
+
+    Args:
+        names: Mutant names
+        read_mutant: Function returning the content of a mutant (name) -> str
+        target_file_path: Path of the mutated file
+        entry: compile_commands.json entry of the mutated file (needed for C++ files)
+        jobs: Number of parallel checks (0 = number of CPUs)
+    """
+    def is_stillborn(name):
+        return not check_syntax(read_mutant(name), target_file_path, entry)
+
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count()) as executor:
+        results = list(executor.map(is_stillborn, names))
+    return [name for name, stillborn in zip(names, results) if stillborn]
+
+
+def find_equivalent_mutants(names, read_mutant, target_file_path, original_content, entry, jobs=0):
+    """
+    Trivial compiler equivalence: compile the original file and every mutant in parallel and
+    compare the hashes of the object files.
+
+    Args:
+        names: Mutant names, a mutant is a duplicate if it is equivalent to an earlier one
+        read_mutant: Function returning the content of a mutant (name) -> str
+        target_file_path: Path of the mutated file
+        original_content: Content of the original file
+        entry: compile_commands.json entry of the mutated file
+        jobs: Number of parallel compilations (0 = number of CPUs)
+
+    Returns:
+        (mutants which do not compile, {equivalent mutant: "original" or the earlier mutant})
+    """
+    original_hash = compile_mutant(original_content, target_file_path, entry, hash_object=True)
+    if not original_hash:
+        print(f"Could not compile {target_file_path}, skipping the equivalence check")
+        return [], {}
+
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count()) as executor:
+        hashes = list(executor.map(lambda name: compile_mutant(read_mutant(name), target_file_path, entry,
+                                                                hash_object=True), names))
+    stillborn = []
+    equivalent = {}
+    seen = {original_hash: "original"}
+    for name, object_hash in zip(names, hashes):
+        if object_hash is False:
+            stillborn.append(name)
+        elif object_hash in seen:
+            equivalent[name] = seen[object_hash]
+        elif object_hash is not None:
+            seen[object_hash] = name
+    return stillborn, equivalent
+
+
+def write_stillborn(folder_path, mutants):
+    with open(os.path.join(folder_path, STILLBORN_FILE), 'w') as file:
+        json.dump({"mutants": mutants}, file, indent=4)
+
+
+def write_equivalent(folder_path, equivalent):
+    with open(os.path.join(folder_path, EQUIVALENT_FILE), 'w') as file:
+        json.dump({"mutants": equivalent}, file, indent=4)
@@ -0,0 +1,120 @@
+import os
+import sys
+import queue
+import shutil
+import tempfile
+import threading
+from src.build import BUILD_DIR
+
+FUNCTIONAL_TEST_DIR = os.path.join("test", "functional")
+# Memory left for each running functional test (a few bitcoind nodes)
+MEMORY_PER_TEST = 512 * 1024 * 1024
+# Time to wait before checking the load again when no other test can start
+LOAD_POLL_INTERVAL = 1
+
+
+def is_functional_test(target_file_path):
+    """Whether `target_file_path` is a functional test script (not a module of the test framework)."""
+    return (target_file_path.endswith(".py")
+            and os.path.dirname(os.path.normpath(target_file_path)) == FUNCTIONAL_TEST_DIR)
+
+
+def get_available_memory():
+    """Memory available to new processes, in bytes (None if unknown)."""
+    try:
+        with open("/proc/meminfo", 'r') as file:
+            for line in file:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def has_capacity(running):
+    """Whether another functional test can start: the CPUs are not all busy and there is memory left."""
+    if running == 0:
+        return True
+    try:
+        load = os.getloadavg()[0]
+    except (AttributeError, OSError):
+        load = 0
+    # The load average lags behind: the mutants just started are not in it yet
+    if max(load, running) + 1 > (os.cpu_count() or 1):
+        return False
+    memory = get_available_memory()
+    return memory is None or memory > MEMORY_PER_TEST
+
+
+def get_functional_command(script_path, port_seed, tmpdir, build_dir=BUILD_DIR, cwd=None):
+    """Command running a copy of a functional test, with its own ports and data directory."""
+    command = f"{sys.executable} {script_path} --portseed={port_seed} --tmpdir={tmpdir}"
+    config_path = os.path.abspath(os.path.join(cwd or "", build_dir, "test", "config.ini"))
+    if os.path.isfile(config_path):
+        command += f" --configfile={config_path}"
+    return command
+
+
+def make_functional_runner(target_file_path, read_mutant, run_test, jobs, get_timeout, build_dir=BUILD_DIR):
+    """
+    Function running a functional test mutant without replacing the test in the checkout, to run many at once.
+
+    Each mutant is written next to the test under its own name (e.g. feature_x_mutant_3.py), so the
+    test framework and the files the test finds relative to `__file__` (e.g. data/, mocks/) are the
+    same as for the original test, and is removed afterwards. It runs with its own --portseed and
+    --tmpdir, so the bitcoind nodes of different mutants do not collide. A mutant only starts when
+    the CPUs and memory allow it (or when no other mutant is running).
+
+    Args:
+        target_file_path: Path of the mutated functional test
+        read_mutant: Function returning the content of a mutant (name) -> str
+        run_test: Function running a test command (command, timeout, cwd, env) -> result of the mutant
+        jobs: Maximum number of mutants running at once
+        get_timeout: Function returning the timeout of a mutant
+        build_dir: Build folder with config.ini
+
+    Returns:
+        Function (checkout, name) -> result of the mutant, as expected by `analyze_mutants`
+    """
+    # One port seed per running mutant
+    port_seeds = queue.Queue()
+    for port_seed in range(jobs):
+        port_seeds.put(port_seed)
+    state = {"running": 0}
+    finished = threading.Condition()
+
+    def acquire():
+        with finished:
+            # Checked again when a mutant finishes, or after a while as the load changes
+            while not has_capacity(state["running"]):
+                finished.wait(LOAD_POLL_INTERVAL)
+            state["running"] += 1
+
+    def release():
+        with finished:
+            state["running"] -= 1
+            finished.notify()
+
+    def run_mutant(checkout, name):
+        acquire()
+        port_seed = port_seeds.get()
+        # The port seed is unique among the running mutants, so is the name of the script
+        stem, extension = os.path.splitext(os.path.basename(target_file_path))
+        script_path = os.path.abspath(os.path.join(checkout or "", os.path.dirname(target_file_path),
+                                                   f"{stem}_mutant_{port_seed}{extension}"))
+        folder = tempfile.mkdtemp(prefix="mutation-core-functional-")
+        try:
+            with open(script_path, 'w') as file:
+                file.write(read_mutant(name))
+            command = get_functional_command(script_path, port_seed, os.path.join(folder, "tmp"), build_dir,
+                                             cwd=checkout)
+            print(f"Running: {command}")
+            return run_test(command, get_timeout(), cwd=checkout)
+        finally:
+            if os.path.exists(script_path):
+                os.remove(script_path)
+            shutil.rmtree(folder, ignore_errors=True)
+            port_seeds.put(port_seed)
+            release()
+
+    return run_mutant
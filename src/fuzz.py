@@ -0,0 +1,139 @@
+import os
+import re
+import json
+import time
+import signal
+import subprocess
+
+FUZZ_BUILD_DIR = "build_fuzz"
+# Corpora in the layout of https://github.com/bitcoin-core/qa-assets: one folder of inputs per target
+FUZZ_CORPUS_DIR = os.path.join("qa-assets", "fuzz_corpora")
+FUZZ_TARGET_DIR = os.path.join("src", "test", "fuzz")
+FUZZ_TIMES_FILE = "fuzz_times.json"
+# Inputs given to each fuzz process, so the command line stays short
+INPUTS_PER_PROCESS = 200
+# Make the undefined behavior sanitizer fail the process like the other sanitizers
+SANITIZER_OPTIONS = {"UBSAN_OPTIONS": "halt_on_error=1:print_stacktrace=1"}
+
+FUZZ_TARGET_REGEX = re.compile(r'^\s*FUZZ_TARGET\(\s*(\w+)', re.M)
+INCLUDE_REGEX = re.compile(r'^\s*#\s*include\s*[<"]([^>"]+)[>"]', re.M)
+
+
+def get_fuzz_binary(build_dir=FUZZ_BUILD_DIR, cwd=None):
+    """Path of the fuzz binary of `build_dir`, None if it was not built."""
+    for path in (os.path.join("bin", "fuzz"), os.path.join("src", "test", "fuzz", "fuzz")):
+        binary = os.path.join(cwd or "", build_dir, path)
+        if os.path.isfile(binary):
+            return os.path.abspath(binary)
+    return None
+
+
+def get_fuzz_build_command(build_dir=FUZZ_BUILD_DIR, jobs=0):
+    command = f"cmake --build {build_dir} --target fuzz"
+    if jobs != 0:
+        command += f" -j{jobs}"
+    return command
+
+
+def list_fuzz_targets(root=None):
+    """Get {fuzz target: (source file, included headers)} from the sources of src/test/fuzz."""
+    targets = {}
+    fuzz_dir = os.path.join(root or "", FUZZ_TARGET_DIR)
+    for folder, _, filenames in os.walk(fuzz_dir):
+        for filename in sorted(filenames):
+            if not filename.endswith(".cpp"):
+                continue
+            path = os.path.join(folder, filename)
+            with open(path, 'r', errors='replace') as file:
+                content = file.read()
+            source_file = os.path.relpath(path, root or ".")
+            includes = set(INCLUDE_REGEX.findall(content))
+            for target in FUZZ_TARGET_REGEX.findall(content):
+                targets[target] = (source_file, includes)
+    return targets
+
+
+def get_reaching_targets(target_file_path, fuzz_targets):
+    """
+    Fuzz targets reaching `target_file_path`, without coverage: the targets defined in it,
+    or including its header.
+    """
+    target_file_path = os.path.normpath(target_file_path)
+    # Includes are relative to src/ (e.g. <wallet/coinselection.h>)
+    header = os.path.splitext(target_file_path)[0] + ".h"
+    if header.startswith("src" + os.sep):
+        header = header[len("src" + os.sep):]
+    return sorted(target for target, (source_file, includes) in fuzz_targets.items()
+                  if os.path.normpath(source_file) == target_file_path or header in includes)
+
+
+def list_corpus(corpus_dir, target):
+    """Absolute paths of the inputs of the corpus of `target` (the fuzz binary may run in a worktree), empty if there is none."""
+    target_dir = os.path.abspath(os.path.join(corpus_dir, target))
+    if not os.path.isdir(target_dir):
+        return []
+    return sorted(os.path.join(folder, filename)
+                  for folder, _, filenames in os.walk(target_dir) for filename in filenames)
+
+
+def kill_processes(processes):
+    for process in processes:
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        process.wait()
+
+
+def replay_corpus(binary, target, inputs, jobs=0, timeout=10000, cwd=None):
+    """
+    Run every input of a corpus once, spread across `jobs` processes.
+
+    Stops at the first input crashing or tripping a sanitizer (any process failing).
+
+    Returns:
+        "passed", "failed" or "timeout"
+    """
+    env = {**SANITIZER_OPTIONS, **os.environ, "FUZZ": target}
+    batches = [inputs[i:i + INPUTS_PER_PROCESS] for i in range(0, len(inputs), INPUTS_PER_PROCESS)]
+    jobs = jobs or os.cpu_count() or 1
+    deadline = time.time() + timeout
+    running = []
+    try:
+        while batches or running:
+            while batches and len(running) < jobs:
+                running.append(subprocess.Popen([binary] + batches.pop(0), stdout=subprocess.DEVNULL,
+                                                stderr=subprocess.DEVNULL, cwd=cwd, env=env,
+                                                start_new_session=True))
+            for process in [process for process in running if process.poll() is not None]:
+                running.remove(process)
+                kill_processes([process])
+                if process.returncode != 0:
+                    return "failed"
+            if time.time() > deadline:
+                return "timeout"
+            time.sleep(0.01)
+        return "passed"
+    finally:
+        kill_processes(running)
+
+
+def record_fuzz_time(fuzz_times, target, inputs, seconds):
+    """Add a replay of `target` to {target: {"inputs", "runs", "seconds", "max_seconds"}}."""
+    times = fuzz_times.setdefault(target, {"inputs": inputs, "runs": 0, "seconds": 0, "max_seconds": 0})
+    times["inputs"] = inputs
+    times["runs"] += 1
+    times["seconds"] = round(times["seconds"] + seconds, 3)
+    times["max_seconds"] = round(max(times["max_seconds"], seconds), 3)
+
+
+def get_average_time(fuzz_times, target):
+    times = fuzz_times.get(target)
+    return times["seconds"] / times["runs"] if times and times["runs"] else 0
+
+
+def write_fuzz_times(folder_path, fuzz_times):
+    """Save the replay times of each target in the mutants folder, slowest first."""
+    ordered = dict(sorted(fuzz_times.items(), key=lambda item: -get_average_time(fuzz_times, item[0])))
+    with open(os.path.join(folder_path, FUZZ_TIMES_FILE), 'w') as file:
+        json.dump(ordered, file, indent=4)
@@ -5,14 +5,31 @@ import re
 import os
 
 from random import shuffle
+from collections import Counter
 from src.operators import (
-    REGEX_OPERATORS,
-    SECURITY_OPERATORS,
-    TEST_OPERATORS
+    COMPILED_OPERATORS,
+    compile_words,
+    match_operators
+)
+from src.schemata import can_guard, write_schemata, get_mutant_name
+from src.cache import get_cached_mutant_keys, get_mutant_key
+from src.mutants import write_index
+from src.cov import (
+    get_covered_lines,
+    get_partial_branch_lines,
+    get_unexecuted_function_lines
 )
 
 BASE_PATH = str(pathlib.Path().resolve())
 BASE_MUT = f'{BASE_PATH}/muts'
+
+# Operators changing the outcome of a condition, they can only be killed
+# when every branch of the condition was taken by the tests
+CONDITION_PATTERNS = [" > ", " < ", " >= ", "&&", r"'\|\|'", " == ", " != ", "==",
+                      r"\b(if|else\s+if|while|for)\s*\(([^()]*)\)",
+                      r"if\s*\(\s*(.*?)\s*\|\|\s*(.*?)\s*\)"]
+BRANCH_OPERATORS = {operator.id for operators in COMPILED_OPERATORS.values()
+                    for operator in operators if operator.pattern in CONDITION_PATTERNS}
 DO_NOT_MUTATE = ["//",
                  "#",
                  "*",
@@ -84,16 +101,36 @@ SKIP_IF_CONTAIN = [
     "RPCArg::Type::"
 ]
 
+# Compiled once: checked for every line
+SKIP_IF_CONTAIN_REGEX = compile_words(SKIP_IF_CONTAIN)
+DO_NOT_MUTATE_PY_REGEX = compile_words(DO_NOT_MUTATE_PY)
+DO_NOT_MUTATE_UNIT_REGEX = compile_words(DO_NOT_MUTATE_UNIT)
+PY_ASSIGNMENT_REGEX = re.compile(r"^\s*([a-zA-Z_]\w*)\s*=\s*(.+)$")
+UNIT_DECLARATION_REGEX = re.compile(r"\b(?:[a-zA-Z_][a-zA-Z0-9_:<>*&\s]+)\s+[a-zA-Z_][a-zA-Z0-9_]*(?:\[[^\]]*\])?(?:\.(?:[a-zA-Z_][a-zA-Z0-9_]*)|\->(?:[a-zA-Z_][a-zA-Z0-9_]*))*(?:\s*=\s*[^;]+|\s*\{[^;]+\})\s*")
+
+def is_skipped_file(file_path):
+    # Skips mutating test/bench files
+    return any(f in file_path for f in ['doc', 'fuzz', 'bench', 'util']) or '.txt' in file_path
+
+
+def is_unit_test_file(file_path):
+    """Whether `file_path` is a unit test, mutated with the unit test operators."""
+    return 'test' in file_path and ('py' not in file_path and 'util' not in file_path)
+
+
 def mkdir_mutation_folder(name, file_to_mutate):
     path = os.path.join(BASE_PATH, name)
-    if not os.path.isdir(f'{BASE_PATH}/{name}'):
+    try:
+        # Atomic, several processes might generate mutants at the same time
         os.mkdir(path)
-        file_path = "original_file.txt"
-        with open(f'{path}/{file_path}', 'w') as file:
-            file.write(file_to_mutate)
+    except FileExistsError:
+        return
+    file_path = "original_file.txt"
+    with open(f'{path}/{file_path}', 'w') as file:
+        file.write(file_to_mutate)
 
 
-def write_mutation(file_to_mutate, lines, i, pr_number=None):
+def get_mutation_folder(file_to_mutate, pr_number=None, unique=False):
     file_extension = ".cpp"
     if ".h" in file_to_mutate:
         file_extension = ".h"
@@ -104,10 +141,19 @@ def write_mutation(file_to_mutate, lines, i, pr_number=None):
 
     folder = "muts"
     ext = file_extension.replace('.', '')
-    if pr_number:
+    if unique:
+        # Named after the whole path, so files with the same name in different folders do not collide
+        path = os.path.normpath(file_to_mutate).rsplit('.', 1)[0].replace(os.sep, '-')
+        folder = f'muts-{path}-{ext}'
+    elif pr_number:
         folder = f'muts-pr-{pr_number}-{file_name}-{ext}'
     else:
         folder = folder + f'-{file_name}-{ext}'
+    return folder, file_name, file_extension
+
+
+def write_mutation(file_to_mutate, lines, i, pr_number=None, unique_folder=False):
+    folder, file_name, file_extension = get_mutation_folder(file_to_mutate, pr_number, unique_folder)
     mkdir_mutation_folder(folder, file_to_mutate)
     mutator_file = f'{BASE_PATH}/{folder}/{file_name}.mutant.{i}{file_extension}'
     with open(mutator_file, 'w', encoding="utf8") as file:
@@ -115,77 +161,149 @@ def write_mutation(file_to_mutate, lines, i, pr_number=None):
         return i + 1
 
 
-def mutate(file_to_mutate="", touched_lines=None, pr_number=None,
-           one_mutant=False, only_security_mutations=False,
-           range_lines=None, cov=None, is_unit_test=False,
-           skip_lines=None):
-    print(f"Generating mutants for {file_to_mutate}...")
-    input_file = f'{BASE_PATH}/{file_to_mutate}'
-
-    with open(input_file, 'r', encoding="utf8") as source_code:
-        source_code = source_code.readlines()
+def get_mutations(source_code, file_to_mutate="", touched_lines=None,
+                  one_mutant=False, only_security_mutations=False,
+                  range_lines=None, cov=None, is_unit_test=False,
+                  skip_lines=None, branch_coverage=False, function_coverage=False, skipped=None):
+    """Yield (line index, mutated line, operator id) for every mutant of `source_code`.
 
-    ALL_OPS = REGEX_OPERATORS
+    With `cov`, `branch_coverage` skips the mutants of BRANCH_OPERATORS on lines with a branch
+    that was never taken, and `function_coverage` skips the mutants of functions never called.
+    `skipped` (a Counter) gets the lines skipped by each filter, and the mutants for branch_coverage.
+    """
+    if skipped is None:
+        skipped = Counter()
+    ALL_OPS = COMPILED_OPERATORS["regex"]
     if only_security_mutations:
-        ALL_OPS = SECURITY_OPERATORS
+        ALL_OPS = COMPILED_OPERATORS["security"]
     if (".py" in file_to_mutate) or is_unit_test:
-        ALL_OPS = TEST_OPERATORS
+        ALL_OPS = COMPILED_OPERATORS["test"]
 
     if skip_lines:
         skip_lines = skip_lines[file_to_mutate] if file_to_mutate in skip_lines else None
 
     touched_lines = touched_lines if touched_lines else list(range(1, len(source_code)))
     if one_mutant:
+        ALL_OPS = ALL_OPS.copy()
         shuffle(ALL_OPS)
         shuffle(touched_lines)
 
-    lines_with_test_coverage = []
-    if cov:
-        for item in cov:
-            if file_to_mutate in item:
-                lines_with_test_coverage = cov[item]
-                break
+    lines_with_test_coverage = get_covered_lines(cov, file_to_mutate) if cov else set()
+    partial_branch_lines = get_partial_branch_lines(cov, file_to_mutate) if cov and branch_coverage else set()
+    unexecuted_function_lines = (get_unexecuted_function_lines(cov, file_to_mutate)
+                                 if cov and function_coverage else set())
 
-    i = 0
     for line_num in touched_lines:
         line_num = line_num - 1
-        if cov and line_num not in lines_with_test_coverage:
+        # Coverage lines are 1-based
+        if cov and line_num + 1 not in lines_with_test_coverage:
+            skipped["coverage"] += 1
+            continue
+        if line_num + 1 in unexecuted_function_lines:
+            skipped["function_coverage"] += 1
             continue
         if range_lines and (line_num < range_lines[0] or line_num > range_lines[1]):
+            skipped["range"] += 1
             continue
         if skip_lines and line_num in skip_lines:
+            skipped["skip_lines"] += 1
             continue
-        lines = source_code.copy()
-        line_before_mutation = lines[line_num]
+        line_before_mutation = source_code[line_num]
 
         if line_before_mutation.lstrip().startswith(tuple(DO_NOT_MUTATE)):
+            skipped["do_not_mutate"] += 1
             continue
-        if any(word in line_before_mutation for word in SKIP_IF_CONTAIN):
+        if SKIP_IF_CONTAIN_REGEX.search(line_before_mutation):
+            skipped["do_not_mutate"] += 1
             continue
         if ".py" in file_to_mutate or is_unit_test:
-            do_not_mutate = any(word in line_before_mutation for word in DO_NOT_MUTATE_PY)
-            regex_to_search = re.search(r"^\s*([a-zA-Z_]\w*)\s*=\s*(.+)$", line_before_mutation)
             if is_unit_test:
-                do_not_mutate = any(word in line_before_mutation for word in DO_NOT_MUTATE_UNIT)
-                regex_to_search = re.search(r"\b(?:[a-zA-Z_][a-zA-Z0-9_:<>*&\s]+)\s+[a-zA-Z_][a-zA-Z0-9_]*(?:\[[^\]]*\])?(?:\.(?:[a-zA-Z_][a-zA-Z0-9_]*)|\->(?:[a-zA-Z_][a-zA-Z0-9_]*))*(?:\s*=\s*[^;]+|\s*\{[^;]+\})\s*", line_before_mutation)
-            if do_not_mutate:
-                continue
-            if regex_to_search:
+                do_not_mutate = DO_NOT_MUTATE_UNIT_REGEX.search(line_before_mutation)
+                regex_to_search = UNIT_DECLARATION_REGEX.search(line_before_mutation)
+            else:
+                do_not_mutate = DO_NOT_MUTATE_PY_REGEX.search(line_before_mutation)
+                regex_to_search = PY_ASSIGNMENT_REGEX.search(line_before_mutation)
+            if do_not_mutate or regex_to_search:
+                skipped["do_not_mutate"] += 1
                 continue
 
-        mutation_done = False
-        for operator in ALL_OPS:
-            if re.search(operator[0], line_before_mutation):
-                operators_sub = [operator[1]]
-                for op_sub in operators_sub:
-                    line_mutated = re.sub(operator[0], op_sub, line_before_mutation.lstrip())
-                    lines[line_num] = line_before_mutation[:-len(line_before_mutation.lstrip())] + line_mutated
-                    i = write_mutation(file_to_mutate, lines, i, pr_number)
-                    if one_mutant:
-                        mutation_done = True
-                        break
-            else:
+        line_stripped = line_before_mutation.lstrip()
+        indentation = line_before_mutation[:-len(line_stripped)]
+        for operator in match_operators(ALL_OPS, line_before_mutation):
+            if line_num + 1 in partial_branch_lines and operator.id in BRANCH_OPERATORS:
+                skipped["branch_coverage"] += 1
                 continue
-            if mutation_done:
+            line_mutated = operator.regex.sub(operator.replacement, line_stripped)
+            yield line_num, indentation + line_mutated, operator.id
+            if one_mutant:
                 break
+
+
+def mutate(file_to_mutate="", touched_lines=None, pr_number=None,
+           one_mutant=False, only_security_mutations=False,
+           range_lines=None, cov=None, is_unit_test=False,
+           skip_lines=None, schemata=False, skip_cached=False, full_files=False,
+           unique_folder=False, branch_coverage=False, function_coverage=False):
+    """
+    Create the mutants of a file.
+
+    Returns {"file", "folder", "mutants": [{"name", "line", "operator"}], "skipped": {filter: count}}.
+    """
+    print(f"Generating mutants for {file_to_mutate}...")
+    input_file = f'{BASE_PATH}/{file_to_mutate}'
+
+    with open(input_file, 'r', encoding="utf8") as source_code:
+        source_code = source_code.readlines()
+
+    skipped = Counter()
+    mutations = get_mutations(source_code, file_to_mutate, touched_lines, one_mutant,
+                              only_security_mutations, range_lines, cov, is_unit_test,
+                              skip_lines, branch_coverage, function_coverage, skipped)
+
+    # Mutants already analyzed (see `analyze --cache`) are not generated again
+    # Only kills are skipped: surviving mutants must still be analyzed (and reported), or the score goes up
+    cached_mutant_keys = get_cached_mutant_keys(statuses=("killed", "timeout")) if skip_cached else set()
+    original_content = "".join(source_code)
+
+    folder, file_name, file_extension = get_mutation_folder(file_to_mutate, pr_number, unique_folder)
+    i = 0
+    schemata_mutations = []
+    index = []
+    created = []
+    for line_num, line_mutated, operator_id in mutations:
+        if cached_mutant_keys:
+            lines = source_code.copy()
+            lines[line_num] = line_mutated
+            if get_mutant_key(original_content, "".join(lines)) in cached_mutant_keys:
+                skipped["cached"] += 1
+                continue
+        # Mutants that can be guarded by a runtime id are compiled all at once
+        if schemata and can_guard(file_to_mutate, source_code, line_num):
+            schemata_mutations.append((line_num, line_mutated, operator_id))
+            continue
+        created.append({"name": f"{file_name}.mutant.{i}{file_extension}", "line": line_num + 1,
+                        "operator": operator_id})
+        if full_files:
+            lines = source_code.copy()
+            lines[line_num] = line_mutated
+            i = write_mutation(file_to_mutate, lines, i, pr_number, unique_folder)
+        else:
+            # Only the mutated line is kept, mutants are applied in memory by `analyze`
+            index.append({"name": f"{file_name}.mutant.{i}{file_extension}", "line": line_num + 1,
+                          "operator": operator_id, "original": source_code[line_num],
+                          "mutated": line_mutated})
+            i += 1
+    if index or schemata_mutations:
+        mkdir_mutation_folder(folder, file_to_mutate)
+    if index:
+        write_index(f'{BASE_PATH}/{folder}', file_to_mutate, index)
+    if schemata_mutations:
+        write_schemata(f'{BASE_PATH}/{folder}', f'{file_name}.schemata{file_extension}',
+                       source_code, schemata_mutations)
+        print(f"Generated {len(schemata_mutations)} mutants in a schemata file...")
+        created += [{"name": get_mutant_name({"id": mutant_id}), "line": line_num + 1, "operator": operator_id}
+                    for mutant_id, (line_num, _, operator_id) in enumerate(schemata_mutations)]
+    if skipped["cached"]:
+        print(f"Skipped {skipped['cached']} mutants already killed...")
     print(f"Generated {i} mutants...")
+    return {"file": file_to_mutate, "folder": folder, "mutants": created, "skipped": dict(skipped)}
@@ -1,4 +1,6 @@
+import tempfile
 import subprocess
+from src.profiling import phase
 
 
 def run_git_command(cmd):
@@ -10,40 +12,102 @@ def run_git_command(cmd):
         return False
 
 
-def get_changed_files(pr_number=None):
+DEFAULT_BASE = "upstream/master"
+
+
+def get_diff_range(base=DEFAULT_BASE):
+    """Commit range to diff: a range as is (e.g. HEAD~3..HEAD), otherwise the changes since `base`."""
+    if ".." in base:
+        return base
+    return f"{base}...HEAD"
+
+
+def checkout_pr(pr_number):
+    """Fetch the pull request and check it out (or rebase onto it if it was already fetched)."""
+    cmd = ['git', 'fetch', 'upstream', f'pull/{pr_number}/head:pr/{pr_number}']
+    git_run = run_git_command(cmd)
+    if git_run == False:
+        print("Fetching and updating branch...")
+        cmd = ['git', 'rebase', f'pr/{pr_number}']
+    else:
+        print("Checking out...")
+        cmd = ['git', 'checkout', f'pr/{pr_number}']
+        run_git_command(cmd)
+
+
+def get_changed_files(pr_number=None, base=DEFAULT_BASE):
+    """Get the list of files changed in the pull request."""
     if pr_number:
-        """Get the list of files changed in the pull request."""
-        cmd = ['git', 'fetch', 'upstream', f'pull/{pr_number}/head:pr/{pr_number}']
-        git_run = run_git_command(cmd)
-        if git_run == False:
-            print("Fetching and updating branch...")
-            cmd = ['git', 'rebase', f'pr/{pr_number}']
-        else:
-            print("Checking out...")
-            cmd = ['git', 'checkout', f'pr/{pr_number}']
-            run_git_command(cmd)
-
-    cmd = ['git', 'diff', '--name-only', 'upstream/master...HEAD']
+        checkout_pr(pr_number)
+
+    cmd = ['git', 'diff', '--name-only', get_diff_range(base)]
     files = run_git_command(cmd)
     return files
 
 
-def get_lines_touched(file_path):
+def parse_hunk_header(line):
+    """Lines of the new file touched by a hunk (`@@ -a,b +c,d @@`).
+
+    A hunk only deleting lines touches the lines around the deletion.
+    """
+    line_info = line.split(' ')[2][1:].split(',')
+    start_line = int(line_info[0])
+    num_lines = int(line_info[1]) if len(line_info) == 2 else 1
+    if num_lines == 0:
+        # The lines were deleted after `start_line`
+        return [line for line in (start_line, start_line + 1) if line > 0]
+    return list(range(start_line, start_line + num_lines))
+
+
+def parse_diff(diff_lines):
+    """
+    Get {file: touched lines} from the lines of a `git diff --unified=0`.
+
+    Renamed files are reported with their new path, deleted files are skipped.
+    """
+    touched = {}
+    current_file = None
+    in_header = False
+    for line in diff_lines:
+        if line.startswith('diff --git'):
+            current_file = None
+            in_header = True
+        elif in_header and line.startswith('+++ '):
+            path = line[4:].rstrip('\n')
+            if path.startswith('"') and path.endswith('"'):
+                path = path[1:-1]
+            current_file = path[2:] if path.startswith('b/') else None
+        elif line.startswith('@@'):
+            in_header = False
+            if current_file:
+                touched.setdefault(current_file, []).extend(parse_hunk_header(line))
+    return {file: sorted(set(lines)) for file, lines in touched.items() if lines}
+
+
+def get_touched_lines(base=DEFAULT_BASE, cwd=None):
+    """
+    Get {file: touched lines} of every file changed since `base`, with a single `git diff`
+    (in the repository at `cwd`, default: current directory).
+
+    Raises an exception when the diff fails (e.g. `base` does not exist), instead of finding no lines.
+    """
+    cmd = ['git', 'diff', '--unified=0', '--find-renames', '--src-prefix=a/', '--dst-prefix=b/',
+           get_diff_range(base)]
+    with phase("git_diff", base=base) as args, tempfile.TemporaryFile('w+') as stderr:
+        # stderr goes to a file: a pipe could fill up while the diff is read
+        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr, text=True,
+                                   errors='replace', cwd=cwd)
+        touched = parse_diff(process.stdout)
+        if process.wait() != 0:
+            stderr.seek(0)
+            raise Exception(f"git diff {get_diff_range(base)} failed: {stderr.read().strip()}")
+        args["files"] = len(touched)
+    return touched
+
+
+def get_lines_touched(file_path, base=DEFAULT_BASE):
     """Get the lines touched in a specific file of the pull request."""
-    cmd = ['git', 'diff', '--unified=0', 'upstream/master...HEAD', '--', file_path]
+    cmd = ['git', 'diff', '--unified=0', '--find-renames', '--src-prefix=a/', '--dst-prefix=b/',
+           get_diff_range(base), '--', file_path]
     diff_output = run_git_command(cmd)
-
-    lines = []
-    for line in diff_output:
-        if line.startswith('@@'):
-            parts = line.split(' ')
-            for part in parts:
-                if part.startswith('+'):
-                    line_info = part.split(',')
-                    if len(line_info) == 2:
-                        start_line = int(line_info[0][1:])
-                        num_lines = int(line_info[1])
-                        lines.extend(range(start_line, start_line + num_lines))
-                    else:
-                        lines.append(int(line_info[0][1:]))
-    return lines
+    return parse_diff(diff_output or []).get(file_path, [])
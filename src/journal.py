@@ -0,0 +1,74 @@
+import os
+import json
+from datetime import datetime
+
+JOURNAL_FILE = "progress.jsonl"
+BACKUP_FILE = "original_file.backup"
+
+
+def read_journal(folder_path):
+    """Get {mutant: status} of the mutants already analyzed in `folder_path`."""
+    journal_path = os.path.join(folder_path, JOURNAL_FILE)
+    results = {}
+    if not os.path.isfile(journal_path):
+        return results
+    with open(journal_path, 'r') as file:
+        for line in file:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # The last line might be incomplete if the process was killed while writing it
+                continue
+            results[entry["mutant"]] = entry["status"]
+    return results
+
+
+def reset_journal(folder_path):
+    journal_path = os.path.join(folder_path, JOURNAL_FILE)
+    if os.path.isfile(journal_path):
+        os.remove(journal_path)
+
+
+def append_result(folder_path, mutant, status, **extra):
+    """Append the result of a mutant to the journal, making sure it reaches the disk."""
+    entry = {"mutant": mutant, "status": status, **extra,
+             "date": datetime.now().strftime("%d/%m/%Y %H:%M:%S")}
+    data = (json.dumps(entry) + "\n").encode()
+    with open(os.path.join(folder_path, JOURNAL_FILE), 'a+b') as file:
+        # After a crash while writing, the last line is incomplete: start a new line so the
+        # entry is not glued to it
+        if file.seek(0, os.SEEK_END):
+            file.seek(-1, os.SEEK_END)
+            if file.read(1) != b"\n":
+                data = b"\n" + data
+        file.write(data)
+        file.flush()
+        os.fsync(file.fileno())
+
+
+def backup_original(folder_path, content):
+    """Keep a copy of the original file until the analysis finishes."""
+    backup_path = os.path.join(folder_path, BACKUP_FILE)
+    with open(backup_path + ".tmp", 'w') as file:
+        file.write(content)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(backup_path + ".tmp", backup_path)
+
+
+def restore_original(folder_path, target_file_path):
+    """Restore the original file left mutated by an interrupted analysis. Returns True if it was restored."""
+    backup_path = os.path.join(folder_path, BACKUP_FILE)
+    if not os.path.isfile(backup_path):
+        return False
+    with open(backup_path, 'r') as file:
+        content = file.read()
+    with open(target_file_path, 'w') as file:
+        file.write(content)
+    return True
+
+
+def remove_backup(folder_path):
+    backup_path = os.path.join(folder_path, BACKUP_FILE)
+    if os.path.isfile(backup_path):
+        os.remove(backup_path)
@@ -0,0 +1,57 @@
+import os
+import json
+import difflib
+
+INDEX_FILE = "mutants.json"
+
+
+def write_index(folder_path, file_to_mutate, mutants):
+    """
+    Write the compact index of the mutants of a file.
+
+    Args:
+        folder_path: Path to mutants folder
+        file_to_mutate: Path of the mutated file
+        mutants: List of {"name", "line" (1-based), "operator", "original", "mutated"}
+    """
+    index_path = os.path.join(folder_path, INDEX_FILE)
+    with open(index_path + ".tmp", 'w', encoding="utf8") as file:
+        json.dump({"file": file_to_mutate, "mutants": mutants}, file, indent=1)
+    os.replace(index_path + ".tmp", index_path)
+
+
+def read_index(folder_path):
+    """Get {name: mutant} from the compact index of a mutants folder ({} if it has no index)."""
+    index_path = os.path.join(folder_path, INDEX_FILE)
+    if not os.path.isfile(index_path):
+        return {}
+    with open(index_path, 'r', encoding="utf8") as file:
+        index = json.load(file)
+    return {mutant["name"]: mutant for mutant in index["mutants"]}
+
+
+def check_mutants(original_content, mutants):
+    """Whether the original lines of `mutants` still match the file they were generated from."""
+    lines = original_content.splitlines(keepends=True)
+    return all(mutant["line"] <= len(lines) and lines[mutant["line"] - 1] == mutant["original"]
+               for mutant in mutants)
+
+
+def apply_mutant(original_content, mutant):
+    """Get the full content of the file with `mutant` applied."""
+    lines = original_content.splitlines(keepends=True)
+    lines[mutant["line"] - 1] = mutant["mutated"]
+    return "".join(lines)
+
+
+def get_diff(original_file, original_content, name, mutant_content):
+    """Unified diff (same format as `git diff`) between the original file and a mutant."""
+    diff = difflib.unified_diff(original_content.splitlines(keepends=True),
+                                mutant_content.splitlines(keepends=True),
+                                fromfile=f"a/{original_file}", tofile=f"b/{name}")
+    return "".join(diff)
+
+
+def get_mutant_diff(original_file, original_content, name, mutant):
+    """Unified diff (same format as `git diff`) between the original file and `mutant`."""
+    return get_diff(original_file, original_content, name, apply_mutant(original_content, mutant))
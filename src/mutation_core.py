@@ -1,20 +1,33 @@
 #!/usr/bin/env python3
 
 from src.get_changes import (
-    get_changed_files,
-    get_lines_touched
+    DEFAULT_BASE,
+    checkout_pr,
+    get_touched_lines
 )
-from src.gen_mutations import mutate
+from src.gen_mutations import mutate, is_skipped_file, is_unit_test_file
 from src.analyze import analyze
-from src.cov import parse_coverage_file
+from src.distributed import serve, work, DEFAULT_PORT, LEASE_TIMEOUT
+from src.cov import load_coverage
+from src.sampling import DEFAULT_CONFIDENCE
+from src.fuzz import FUZZ_CORPUS_DIR, FUZZ_BUILD_DIR
+from src.report import report_results, RESULTS_FILE, LEGACY_REPORT_FILE
+from src.benchmark import run_benchmarks, SIZES, REGRESSION_THRESHOLD
+from src.profiling import phase, count, start_profiling, stop_profiling, write_profile
 
 import argparse
+import atexit
+import glob
 import os
 import json
 import sys
 import pathlib
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
 
 BASE_PATH = str(pathlib.Path().resolve())
+SOURCE_EXTENSIONS = ('.cpp', '.h', '.py')
+MANIFEST_FILE = 'mutants_manifest.json'
 
 
 def mkdir_mutation_folder(name):
@@ -38,25 +51,109 @@ def read_json_dict(filename):
         return {}
 
 
+def get_files_to_mutate(dirs):
+    """Source files inside `dirs` (folders or glob patterns), relative to BASE_PATH."""
+    files = set()
+    for pattern in dirs:
+        for path in glob.glob(pattern, recursive=True):
+            if os.path.isdir(path):
+                for root, _, filenames in os.walk(path):
+                    files.update(os.path.join(root, filename) for filename in filenames)
+            else:
+                files.add(path)
+    files = {os.path.relpath(os.path.abspath(f), BASE_PATH) for f in files}
+    return sorted(f for f in files if f.endswith(SOURCE_EXTENSIONS) and not is_skipped_file(f))
+
+
+# Coverage data of each process of the pool, sent once instead of once per file
+WORKER_COV = None
+
+
+def set_worker_cov(cov):
+    global WORKER_COV
+    WORKER_COV = cov
+
+
+def mutate_in_worker(kwargs):
+    return mutate(cov=WORKER_COV, **kwargs)
+
+
+def count_generation(result):
+    """Count the mutants generated and skipped for a file (result of `mutate`)."""
+    count("mutants_generated", len(result["mutants"]))
+    for mutant_filter, skipped in result["skipped"].items():
+        count("mutants_skipped", skipped, filter=mutant_filter)
+
+
+def mutate_dirs(dirs, jobs=0, cov=None, test_only=False, **kwargs):
+    """Create mutants for every file inside `dirs` using a process pool and write a manifest of all of them."""
+    files = get_files_to_mutate(dirs)
+    tasks = []
+    for file_to_mutate in files:
+        is_unit_test = is_unit_test_file(file_to_mutate)
+        if test_only and not (is_unit_test or '.py' in file_to_mutate):
+            continue
+        tasks.append(dict(file_to_mutate=file_to_mutate, is_unit_test=is_unit_test,
+                          unique_folder=True, **kwargs))
+    # Biggest files first so no process is left alone with a huge file at the end
+    tasks.sort(key=lambda task: os.path.getsize(task['file_to_mutate']), reverse=True)
+
+    print(f"Generating mutants for {len(tasks)} files...")
+    with phase("generation", files=len(tasks)), \
+            ProcessPoolExecutor(max_workers=jobs or None, initializer=set_worker_cov,
+                                initargs=(cov,)) as executor:
+        results = []
+        for result in executor.map(mutate_in_worker, tasks):
+            # Counted from the results, the worker processes do not profile
+            count_generation(result)
+            if result["mutants"]:
+                results.append(result)
+    results.sort(key=lambda result: result["file"])
+
+    manifest = {
+        "date": datetime.now().strftime("%d/%m/%Y %H:%M:%S"),
+        "total_mutants": sum(len(result["mutants"]) for result in results),
+        "files": results
+    }
+    with open(os.path.join(BASE_PATH, MANIFEST_FILE), 'w') as file:
+        json.dump(manifest, file, indent=4)
+    print(f"Generated {manifest['total_mutants']} mutants for {len(results)} files (see {MANIFEST_FILE})")
+    return manifest
+
+
 def mutation_core(pr_number=None, file=None, one_mutant=False,
                   only_security_mutations=False, range_lines=None,
-                  cov=None, test_only=False, skip_lines=None):
+                  cov=None, test_only=False, skip_lines=None, schemata=False, skip_cached=False,
+                  full_files=False, dirs=None, jobs=0, branch_coverage=False, function_coverage=False,
+                  base=DEFAULT_BASE):
     if cov:
-        cov = parse_coverage_file(cov)
+        with phase("coverage", file=cov):
+            cov = load_coverage(cov)
+    if dirs:
+        mutate_dirs(dirs, jobs=jobs, cov=cov, test_only=test_only, one_mutant=one_mutant,
+                    only_security_mutations=only_security_mutations, skip_lines=skip_lines,
+                    schemata=schemata, skip_cached=skip_cached, full_files=full_files,
+                    branch_coverage=branch_coverage, function_coverage=function_coverage)
+        return
     if file:
-        is_unit_test = 'test' in file and 'py' not in file
-        mutate(file, touched_lines=None, pr_number=None,
-               one_mutant=one_mutant, only_security_mutations=only_security_mutations,
-               range_lines=range_lines, cov=cov, is_unit_test=is_unit_test, skip_lines=skip_lines)
+        is_unit_test = is_unit_test_file(file)
+        with phase("generation", file=file):
+            count_generation(mutate(file, touched_lines=None, pr_number=None,
+                                    one_mutant=one_mutant, only_security_mutations=only_security_mutations,
+                                    range_lines=range_lines, cov=cov, is_unit_test=is_unit_test,
+                                    skip_lines=skip_lines, schemata=schemata, skip_cached=skip_cached,
+                                    full_files=full_files, branch_coverage=branch_coverage,
+                                    function_coverage=function_coverage))
         return
-    files_changed = get_changed_files(pr_number)
+    if pr_number:
+        with phase("checkout", pr=pr_number):
+            checkout_pr(pr_number)
+    # A single diff gives the lines touched in every file
     result = []
-    for file_changed in files_changed:
-        # Skips mutating test/bench files
-        if any(f in file_changed for f in ['doc', 'fuzz', 'bench', 'util']) or '.txt' in file_changed:
+    for file_changed, lines_touched in get_touched_lines(base).items():
+        if is_skipped_file(file_changed):
             continue
-        lines_touched = get_lines_touched(file_changed)
-        is_unit_test = 'test' in file_changed and ('py' not in file_changed and 'util' not in file_changed)
+        is_unit_test = is_unit_test_file(file_changed)
         if test_only and not (is_unit_test or '.py' in file_changed):
             continue
         result.append({
@@ -65,10 +162,24 @@ def mutation_core(pr_number=None, file=None, one_mutant=False,
             "is_unit_test": is_unit_test
         })
     for item in result:
-        mutate(file_to_mutate=item['file_path'], touched_lines=item['lines_touched'],
-               pr_number=pr_number, one_mutant=one_mutant,
-               only_security_mutations=only_security_mutations,
-               cov=cov, is_unit_test=item["is_unit_test"], skip_lines=skip_lines)
+        with phase("generation", file=item['file_path']):
+            count_generation(mutate(file_to_mutate=item['file_path'], touched_lines=item['lines_touched'],
+                                    pr_number=pr_number, one_mutant=one_mutant,
+                                    only_security_mutations=only_security_mutations,
+                                    cov=cov, is_unit_test=item["is_unit_test"], skip_lines=skip_lines,
+                                    schemata=schemata, skip_cached=skip_cached, full_files=full_files,
+                                    branch_coverage=branch_coverage, function_coverage=function_coverage))
+
+
+def find_mutant_folders():
+    folders_starting_with_muts = []
+    for root, dirs, _ in os.walk('.'):
+        # Skip the worktrees used by parallel analysis
+        dirs[:] = [d for d in dirs if d != '.mutation-core']
+        for folder in dirs:
+            if folder.startswith("muts"):
+                folders_starting_with_muts.append(os.path.join(root, folder))
+    return folders_starting_with_muts
 
 
 def main():
@@ -82,8 +193,14 @@ def main():
                                help="Only create mutants for unit and functional tests")
     parser_mutate.add_argument('-c', '--cov', dest="cov", default="", type=str,
                                help="Path for the coverage file (*.info generated with cmake -P build/Coverage.cmake)")
+    parser_mutate.add_argument('--branch-coverage', dest="branch_coverage", action="store_true",
+                               help="With --cov, skip mutants changing a condition whose branches were not all taken by the tests")
+    parser_mutate.add_argument('--function-coverage', dest="function_coverage", action="store_true",
+                               help="With --cov, skip mutants inside functions never called by the tests")
     parser_mutate.add_argument('-sl', '--skip_lines', dest="skip", default="", type=str,
                                help="Path for the file with lines to skip when creating mutants")
+    parser_mutate.add_argument('--base', dest="base", default=DEFAULT_BASE, type=str,
+                               help=f"Base ref to diff the current branch against, or a commit range (e.g. HEAD~3..HEAD), to find the touched lines (default={DEFAULT_BASE})")
     parser_mutate.add_argument('-f', '--file', dest="file", default="", type=str,
                                help="File path")
     parser_mutate.add_argument('-r', '--range', dest="range_lines", type=int, default=None, nargs=2,
@@ -92,19 +209,130 @@ def main():
                                help="Create only one mutant per line (default=0)")
     parser_mutate.add_argument('-s', '--only_security_mutations', dest="only_security_mutations", default=False, type=bool,
                                help="Apply only security-based mutations (usually to test fuzzing, default=0)")
+    parser_mutate.add_argument('--schemata', dest="schemata", action="store_true",
+                               help="Write the mutants of a .cpp file into a single file, selecting the mutant at runtime, so it is compiled only once")
+    parser_mutate.add_argument('--skip-cached', dest="skip_cached", action="store_true",
+                               help="Do not create mutants already killed in an analysis with --cache (survivors are created again)")
+    parser_mutate.add_argument('-d', '--dir', dest="dirs", default=None, nargs='+',
+                               help="Create mutants for every file in these folders or glob patterns (e.g. src/wallet 'src/*.cpp')")
+    parser_mutate.add_argument('--all', dest="all", action="store_true",
+                               help="Create mutants for every file in src/ (same as --dir src)")
+    parser_mutate.add_argument('-j', '--jobs', dest="jobs", default=0, type=int,
+                               help="Number of processes used with --dir/--all (default=number of CPUs)")
+    parser_mutate.add_argument('--full-files', dest="full_files", action="store_true",
+                               help="Write every mutant as a full copy of the file instead of the compact mutants.json index")
     parser_analyze = subparsers.add_parser("analyze", help="Analyze mutants")
     parser_analyze.add_argument('-f', '--folder', dest="folder", default="", type=str,
                                help="Folder with the mutants")
     parser_analyze.add_argument('-t', '--timeout', dest="timeout", default=1000, type=int,
                                help="Timeout value per mutant")
+    parser_analyze.add_argument('--timeout-factor', dest="timeout_factor", default=3, type=float,
+                               help="Time the tests without mutant first and stop each mutant after this multiple of that time, at most --timeout (0 to always use --timeout). Only without -c, which may include a build")
     parser_analyze.add_argument('-j', '--jobs', dest="jobs", default=0, type=int,
                                help="Number of jobs to be used to compile Bitcoin Core")
     parser_analyze.add_argument('-c', '--command', dest="command", default="", type=str,
                                help="Command to test the mutants (e.g. cmake --build build && ./build/test/functional/test.py)")
     parser_analyze.add_argument('-st', '--survival-threshold', dest="survival_threshold", default=0.75, type=float,
                                help="Maximum acceptable survival rate (0.3 = 30%)")
+    parser_analyze.add_argument('-w', '--workers', dest="workers", default=1, type=int,
+                               help="Number of mutants analyzed in parallel, each one in its own git worktree and build folder (default=1)")
+    parser_analyze.add_argument('--ccache', dest="ccache", action="store_true",
+                               help="Configure the build to use ccache (only when no command is provided)")
+    parser_analyze.add_argument('--clean-build', dest="clean_build", action="store_true",
+                               help="Remove the build folder before building instead of reusing it (only when no command is provided)")
+    parser_analyze.add_argument('-tc', '--test-coverage', dest="test_coverage", default="", type=str,
+                               help="Folder with one coverage file per test (e.g. coinselector_tests.info, feature_addrman.py.info) to run only the tests covering each mutant (only when no command is provided)")
+    parser_analyze.add_argument('--cache', dest="cache", action="store_true",
+                               help="Reuse results of mutants already analyzed (stored in .mutation-core/results.db)")
+    parser_analyze.add_argument('--cache-test-sources', dest="cache_test_sources", default=None, nargs='*',
+                               help="Files or folders (e.g. src/test test/functional) whose changes invalidate cached results")
+    parser_analyze.add_argument('--resume', dest="resume", action="store_true",
+                               help="Continue an interrupted analysis, skipping the mutants in the folder's progress journal")
+    parser_analyze.add_argument('--syntax-check', dest="syntax_check", action="store_true",
+                               help="Discard mutants which do not compile (checked in parallel with -fsyntax-only and the flags from compile_commands.json)")
+    parser_analyze.add_argument('--fail-fast', dest="fail_fast", action="store_true",
+                               help="Run the tests one at a time, the ones which killed mutants near the mutated line first, and stop at the first failure (only when no command is provided)")
+    parser_analyze.add_argument('--tce', dest="tce", action="store_true",
+                               help="Discard mutants compiling to the same object file as the original file or an earlier mutant (trivial compiler equivalence)")
+
+    parser_analyze.add_argument('--sample-width', dest="sample_width", default=0, type=float,
+                               help="Analyze a stratified random sample of the mutants until the confidence interval of the score is at most this wide (e.g. 0.1 = 10 points), and report the estimated score")
+    parser_analyze.add_argument('--confidence', dest="confidence", default=DEFAULT_CONFIDENCE, type=float,
+                               help=f"Confidence level of the interval with --sample-width (default={DEFAULT_CONFIDENCE})")
+    parser_analyze.add_argument('--seed', dest="seed", default=None, type=int,
+                               help="Seed of the random sample, to analyze the same mutants again")
+
+    parser_analyze.add_argument('--functional-jobs', dest="functional_jobs", default=0, type=int,
+                               help="Run up to N mutants of a functional test at once, each with its own --portseed and --tmpdir, as long as the CPUs and memory allow it (only when no command is provided)")
+
+    parser_analyze.add_argument('--fuzz', dest="fuzz", action="store_true",
+                               help="Kill the mutants by replaying the fuzz corpora of the targets reaching the mutated file, instead of running the tests (e.g. for security mutants, not with --workers)")
+    parser_analyze.add_argument('--fuzz-corpus', dest="fuzz_corpus", default=FUZZ_CORPUS_DIR, type=str,
+                               help=f"Folder with one folder of inputs per fuzz target (default={FUZZ_CORPUS_DIR})")
+    parser_analyze.add_argument('--fuzz-build-dir', dest="fuzz_build_dir", default=FUZZ_BUILD_DIR, type=str,
+                               help=f"Build folder configured with -DBUILD_FOR_FUZZING=ON (default={FUZZ_BUILD_DIR})")
+    parser_analyze.add_argument('--fuzz-coverage', dest="fuzz_coverage", default=None, type=str,
+                               help="Folder with one lcov file per fuzz target (<target>.info), to replay only the targets covering the mutated line")
+
+    parser_serve = subparsers.add_parser("serve", help="Publish mutants to workers running on other machines")
+    parser_serve.add_argument('-f', '--folder', dest="folders", default=None, nargs='+',
+                              help="Folders with the mutants (default=every muts* folder)")
+    parser_serve.add_argument('--host', dest="host", default="127.0.0.1", type=str,
+                              help="Address to listen on (use 0.0.0.0 to accept workers from other machines)")
+    parser_serve.add_argument('--port', dest="port", default=DEFAULT_PORT, type=int,
+                              help=f"Port to listen on (default={DEFAULT_PORT})")
+    parser_serve.add_argument('--lease-timeout', dest="lease_timeout", default=LEASE_TIMEOUT, type=int,
+                              help="Seconds a worker has to report a result before its mutant is given to another worker")
+    parser_serve.add_argument('--resume', dest="resume", action="store_true",
+                              help="Skip the mutants in the folders' progress journals")
+
+    parser_work = subparsers.add_parser("work", help="Analyze mutants published by `mutation-core serve`")
+    parser_work.add_argument('--server', dest="server", required=True, type=str,
+                             help="host:port of the coordinator")
+    parser_work.add_argument('-c', '--command', dest="command", default="", type=str,
+                             help="Command to test the mutants (default: build incrementally and run the tests)")
+    parser_work.add_argument('-t', '--timeout', dest="timeout", default=1000, type=int,
+                             help="Timeout value per mutant")
+    parser_work.add_argument('--timeout-factor', dest="timeout_factor", default=3, type=float,
+                             help="Time the tests of each file without mutant first and stop each mutant after this multiple of that time, at most --timeout (0 to always use --timeout). Only without -c, which may include a build")
+    parser_work.add_argument('-j', '--jobs', dest="jobs", default=0, type=int,
+                             help="Number of jobs to be used to compile Bitcoin Core")
+    parser_work.add_argument('--ccache', dest="ccache", action="store_true",
+                             help="Configure the build to use ccache (only when no command is provided)")
+    parser_work.add_argument('--clean-build', dest="clean_build", action="store_true",
+                             help="Remove the build folder before building instead of reusing it (only when no command is provided)")
+
+    parser_report = subparsers.add_parser("report", help="Aggregate the results of the analyses")
+    parser_report.add_argument('-r', '--results', dest="results", default=RESULTS_FILE, type=str,
+                               help=f"Results file written by `analyze` and `serve` (default={RESULTS_FILE})")
+    parser_report.add_argument('-o', '--output', dest="output", default=LEGACY_REPORT_FILE, type=str,
+                               help=f"File to write the surviving mutants to (default={LEGACY_REPORT_FILE})")
+    parser_report.add_argument('--no-output', dest="no_output", action="store_true",
+                               help="Only print the scores")
+
+    parser_benchmark = subparsers.add_parser("benchmark", help="Measure the speed and memory of mutation-core itself on synthetic data")
+    parser_benchmark.add_argument('--size', dest="sizes", default=["small", "medium"], nargs='+', choices=list(SIZES),
+                                  help="Sizes of the synthetic files (default=small medium)")
+    parser_benchmark.add_argument('--repeat', dest="repeat", default=3, type=int,
+                                  help="Number of runs of each benchmark, the fastest is kept")
+    parser_benchmark.add_argument('-o', '--output', dest="output", default=None, type=str,
+                                  help="File to write the results to (JSON)")
+    parser_benchmark.add_argument('--compare', dest="compare", default=None, type=str,
+                                  help="Results of a previous run: exit with an error if a benchmark regressed")
+    parser_benchmark.add_argument('--threshold', dest="threshold", default=REGRESSION_THRESHOLD, type=float,
+                                  help=f"Slowdown or memory growth considered a regression (default={REGRESSION_THRESHOLD})")
+
+    for subparser in (parser_mutate, parser_analyze, parser_work):
+        subparser.add_argument('--trace', dest="trace", default=None, type=str,
+                               help="Write the time spent in every phase and on every mutant to this file, as a Chrome trace (chrome://tracing, Perfetto)")
+        subparser.add_argument('--metrics', dest="metrics", default=None, type=str,
+                               help="Write the totals of every phase, the mutant counts and the peak memory to this file, in the Prometheus text format (e.g. for the node_exporter textfile collector)")
 
     args = parser.parse_args()
+    if getattr(args, "trace", None) or getattr(args, "metrics", None):
+        start_profiling()
+        # Also written when the run fails or is interrupted
+        atexit.register(lambda: write_profile(stop_profiling(), args.trace, args.metrics, args.subcommand))
     if args.subcommand is None:
         parser.print_help()
     elif args.subcommand == "mutate":
@@ -112,36 +340,75 @@ def main():
             args.skip = read_json_dict(args.skip)
             if args.skip == {}:
                 sys.exit()
+        if (args.branch_coverage or args.function_coverage) and args.cov == "":
+            sys.exit("You should provide a coverage file to filter mutants by branch or function coverage")
         if args.cov != "" and args.range_lines is not None:
             sys.exit("You should only provide coverage file or the range of lines to mutate")
         if args.pr != 0 and args.file != "":
             sys.exit("You should only provide PR number or file")
-        if args.pr != 0:
+        if args.all:
+            args.dirs = (args.dirs or []) + ['src']
+        if args.dirs and (args.pr != 0 or args.file != "" or args.range_lines is not None):
+            sys.exit("You should not provide PR number, file or range of lines with --dir/--all")
+        if args.dirs:
+            mutation_core(dirs=args.dirs, jobs=args.jobs, one_mutant=args.one_mutant,
+                          only_security_mutations=args.only_security_mutations,
+                          cov=args.cov, test_only=args.test_only, skip_lines=args.skip,
+                          schemata=args.schemata, skip_cached=args.skip_cached,
+                          full_files=args.full_files, branch_coverage=args.branch_coverage,
+                          function_coverage=args.function_coverage)
+        elif args.pr != 0:
             mutation_core(pr_number=args.pr, one_mutant=args.one_mutant,
                           only_security_mutations=args.only_security_mutations,
-                          cov=args.cov, test_only=args.test_only, skip_lines=args.skip)
+                          cov=args.cov, test_only=args.test_only, skip_lines=args.skip,
+                          schemata=args.schemata, skip_cached=args.skip_cached,
+                          full_files=args.full_files, branch_coverage=args.branch_coverage,
+                          function_coverage=args.function_coverage, base=args.base)
         elif args.file != "":
             range_lines = args.range_lines
             if range_lines:
                 if range_lines[0] > range_lines[1]:
                     sys.exit("Invalid range")
             mutation_core(file=args.file, one_mutant=args.one_mutant, only_security_mutations=args.only_security_mutations,
-                          range_lines=range_lines, cov=args.cov, skip_lines=args.skip)
+                          range_lines=range_lines, cov=args.cov, skip_lines=args.skip,
+                          schemata=args.schemata, skip_cached=args.skip_cached,
+                          full_files=args.full_files, branch_coverage=args.branch_coverage,
+                          function_coverage=args.function_coverage)
         else:
             mutation_core(pr_number=args.pr, one_mutant=args.one_mutant, only_security_mutations=args.only_security_mutations,
-                          cov=args.cov, test_only=args.test_only, skip_lines=args.skip)
+                          cov=args.cov, test_only=args.test_only, skip_lines=args.skip,
+                          schemata=args.schemata, skip_cached=args.skip_cached,
+                          full_files=args.full_files, branch_coverage=args.branch_coverage,
+                          function_coverage=args.function_coverage, base=args.base)
     elif args.subcommand == "analyze":
         # When the folder is not specified, try to find all muts* folder
-        if args.folder == "":
-            folders_starting_with_muts = []
-            for root, dirs, _ in os.walk('.'):
-                for folder in dirs:
-                    if folder.startswith("muts"):
-                        folders_starting_with_muts.append(os.path.join(root, folder))
-            for folder in folders_starting_with_muts:
-                analyze(folder_path=folder, command=args.command, jobs=args.jobs, timeout=args.timeout, survival_threshold=args.survival_threshold)
-        else:
-            analyze(folder_path=args.folder, command=args.command, jobs=args.jobs, timeout=args.timeout, survival_threshold=args.survival_threshold)
+        if args.fuzz and args.workers > 1:
+            sys.exit("You should not provide --workers with --fuzz, the fuzz binary is only built in the checkout")
+        folders = find_mutant_folders() if args.folder == "" else [args.folder]
+        for folder in folders:
+            with phase("analysis", folder=folder):
+                analyze(folder_path=folder, command=args.command, jobs=args.jobs, timeout=args.timeout, survival_threshold=args.survival_threshold,
+                        workers=args.workers, ccache=args.ccache, clean_build=args.clean_build,
+                        test_coverage=args.test_coverage, cache=args.cache,
+                        cache_test_sources=args.cache_test_sources, resume=args.resume,
+                        syntax_check=args.syntax_check, tce=args.tce,
+                        timeout_factor=args.timeout_factor, fail_fast=args.fail_fast,
+                        sample_width=args.sample_width, confidence=args.confidence, seed=args.seed,
+                        functional_jobs=args.functional_jobs, fuzz=args.fuzz, fuzz_corpus=args.fuzz_corpus,
+                        fuzz_build_dir=args.fuzz_build_dir, fuzz_coverage=args.fuzz_coverage)
+    elif args.subcommand == "serve":
+        serve(args.folders or find_mutant_folders(), host=args.host, port=args.port,
+              lease_timeout=args.lease_timeout, resume=args.resume)
+    elif args.subcommand == "work":
+        work(args.server, command=args.command, jobs=args.jobs, timeout=args.timeout,
+             ccache=args.ccache, clean_build=args.clean_build, timeout_factor=args.timeout_factor)
+    elif args.subcommand == "report":
+        report_results(args.results, None if args.no_output else args.output)
+    elif args.subcommand == "benchmark":
+        _, regressions = run_benchmarks(args.sizes, repeat=args.repeat, output=args.output,
+                                        baseline=args.compare, threshold=args.threshold)
+        if regressions:
+            sys.exit(1)
     else:
         parser.print_help()
         sys.exit("No command provided.")
@@ -1,3 +1,5 @@
+import re
+
 REGEX_OPERATORS = [[r"--(\b\w+\b)", r"++\1"],
                    [r"(\b\w+\b)--", r"\1++"],
                    [r"CAmount\s+(\w+)\s*=\s*([0-9]+)", r"CAmount \1 = \2 + 1"],
@@ -70,3 +72,106 @@ SECURITY_OPERATORS = [
 TEST_OPERATORS = [
     [r"^.*\b(?!assert\w*)\w+\s*\(.*\).*$", r""]
 ]
+
+OPERATOR_CATEGORIES = {
+    "regex": (REGEX_OPERATORS, "cpp"),
+    "security": (SECURITY_OPERATORS, "cpp"),
+    "test": (TEST_OPERATORS, "test"),
+}
+
+REGEX_METACHARACTERS = ".^$*+?{}[]()|"
+QUANTIFIERS = "*+?{"
+
+
+class Operator:
+    """A compiled mutation operator.
+
+    `literal` is a substring every line matched by the operator must contain
+    (None when it could not be extracted), used to skip the regex search.
+    """
+    __slots__ = ("id", "category", "language", "pattern", "replacement", "regex", "literal")
+
+    def __init__(self, operator_id, category, language, pattern, replacement):
+        self.id = operator_id
+        self.category = category
+        self.language = language
+        self.pattern = pattern
+        self.replacement = replacement
+        self.regex = re.compile(pattern)
+        self.literal = get_required_literal(pattern)
+
+    def __repr__(self):
+        return f"Operator({self.id!r}, {self.pattern!r} -> {self.replacement!r})"
+
+
+def get_required_literal(pattern):
+    """Longest literal substring that any match of `pattern` must contain.
+
+    Only literals outside of groups, character classes and quantified atoms are
+    considered. Returns None if there is none (or on top-level alternations).
+    """
+    runs = []
+    current = ""
+    depth = 0
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        atom = None
+        if char == "\\" and i + 1 < len(pattern):
+            escaped = pattern[i + 1]
+            i += 2
+            if depth == 0 and not escaped.isalnum():
+                atom = escaped
+        elif char == "[":
+            # Skip the character class
+            i += 1
+            if i < len(pattern) and pattern[i] == "]":
+                i += 1
+            while i < len(pattern) and pattern[i] != "]":
+                i += 2 if pattern[i] == "\\" else 1
+            i += 1
+        elif char == "(":
+            depth += 1
+            i += 1
+        elif char == ")":
+            depth -= 1
+            i += 1
+        elif char == "|" and depth == 0:
+            return None
+        else:
+            i += 1
+            if depth == 0 and char not in REGEX_METACHARACTERS:
+                atom = char
+
+        quantifier = pattern[i] if i < len(pattern) and pattern[i] in QUANTIFIERS else None
+        if atom is not None and quantifier in (None, "+"):
+            current += atom
+        if atom is None or quantifier is not None:
+            runs.append(current)
+            current = ""
+    runs.append(current)
+    literal = max(runs, key=len)
+    return literal if literal else None
+
+
+def compile_operators(category):
+    operators, language = OPERATOR_CATEGORIES[category]
+    return [Operator(f"{category}.{index}", category, language, pattern, replacement)
+            for index, (pattern, replacement) in enumerate(operators)]
+
+
+def compile_words(words):
+    """Single regex matching any of `words`, faster than `any(word in line ...)`."""
+    return re.compile("|".join(re.escape(word) for word in words))
+
+
+def match_operators(operators, line):
+    """Yield the operators matching `line`, checking the literal of each operator before its regex."""
+    for operator in operators:
+        if operator.literal is not None and operator.literal not in line:
+            continue
+        if operator.regex.search(line):
+            yield operator
+
+
+COMPILED_OPERATORS = {category: compile_operators(category) for category in OPERATOR_CATEGORIES}
@@ -0,0 +1,176 @@
+import os
+import sys
+import json
+import time
+import resource
+import threading
+from contextlib import contextmanager
+
+# Prefix of the names of the exported metrics
+METRICS_PREFIX = "mutation_core"
+COUNT_HELP = {
+    "mutants_generated": "Mutants generated",
+    "mutants_skipped": "Lines (or mutants for branch_coverage and cached) skipped by each filter of the generation",
+    "mutants": "Mutants analyzed by status",
+    "compile_failures": "Mutants which did not build (also counted as killed)",
+}
+
+# Recorder of the current run, None when profiling is disabled so the instrumentation costs nothing
+PROFILE = None
+
+
+def start_profiling():
+    """Record the phases and counts of this process from now on (and forget the previous ones)."""
+    global PROFILE
+    PROFILE = {"start": time.perf_counter(), "timestamp": time.time(), "phases": [], "counts": {},
+               "threads": {}, "lock": threading.Lock()}
+
+
+def stop_profiling():
+    """Stop recording. Returns the recorded profile (None if profiling was not started)."""
+    global PROFILE
+    profile, PROFILE = PROFILE, None
+    return profile
+
+
+def get_peak_memory():
+    """(peak resident memory of this process, of the largest command it ran) in bytes."""
+    # ru_maxrss is in kilobytes on Linux, in bytes on macOS
+    scale = 1024 if sys.platform.startswith("linux") else 1
+    return (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale,
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale)
+
+
+@contextmanager
+def phase(name, **args):
+    """
+    Time the code of the `with` block as a phase of the run.
+
+    The block gets the `args` of the phase (e.g. file, mutant), and can add to them (e.g. its status).
+    Phases can be nested and run in several threads.
+    """
+    profile = PROFILE
+    if profile is None:
+        yield args
+        return
+    start = time.perf_counter()
+    try:
+        yield args
+    finally:
+        end = time.perf_counter()
+        memory, child_memory = get_peak_memory()
+        thread = threading.current_thread()
+        with profile["lock"]:
+            profile["threads"][thread.ident] = thread.name
+            profile["phases"].append({"name": name, "start": start - profile["start"], "duration": end - start,
+                                      "thread": thread.ident, "memory": memory, "child_memory": child_memory,
+                                      "args": args})
+
+
+def count(name, value=1, **labels):
+    """Add `value` to the count `name` (e.g. count("mutants", status="killed"))."""
+    profile = PROFILE
+    if profile is None:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with profile["lock"]:
+        profile["counts"][key] = profile["counts"].get(key, 0) + value
+
+
+def summarize_phases(profile):
+    """{phase: {"count", "seconds", "max_seconds", "peak_memory", "child_peak_memory"}}"""
+    summary = {}
+    for recorded in profile["phases"]:
+        phase_summary = summary.setdefault(recorded["name"], {"count": 0, "seconds": 0, "max_seconds": 0,
+                                                              "peak_memory": 0, "child_peak_memory": 0})
+        phase_summary["count"] += 1
+        phase_summary["seconds"] += recorded["duration"]
+        phase_summary["max_seconds"] = max(phase_summary["max_seconds"], recorded["duration"])
+        phase_summary["peak_memory"] = max(phase_summary["peak_memory"], recorded["memory"])
+        phase_summary["child_peak_memory"] = max(phase_summary["child_peak_memory"], recorded["child_memory"])
+    return summary
+
+
+def get_trace(profile):
+    """Chrome trace (chrome://tracing, Perfetto) of a profile: one event per phase, and the memory over time."""
+    pid = os.getpid()
+    events = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": thread, "args": {"name": name}}
+              for thread, name in profile["threads"].items()]
+    for recorded in sorted(profile["phases"], key=lambda recorded: recorded["start"]):
+        events.append({"name": recorded["name"], "cat": "mutation-core", "ph": "X", "pid": pid,
+                       "tid": recorded["thread"], "ts": round(recorded["start"] * 1e6),
+                       "dur": round(recorded["duration"] * 1e6),
+                       "args": {key: value for key, value in recorded["args"].items() if value is not None}})
+        events.append({"name": "peak memory", "ph": "C", "pid": pid,
+                       "ts": round((recorded["start"] + recorded["duration"]) * 1e6),
+                       "args": {"mutation-core": recorded["memory"], "commands": recorded["child_memory"]}})
+    counts = {}
+    for (name, labels), value in sorted(profile["counts"].items()):
+        counts[",".join([name] + [f"{label}={label_value}" for label, label_value in labels])] = value
+    return {"traceEvents": events, "displayTimeUnit": "ms",
+            "otherData": {"timestamp": profile["timestamp"], "counts": counts}}
+
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_metric(name, value, labels=()):
+    if isinstance(value, float):
+        value = round(value, 6)
+    labels = ",".join(f'{label}="{escape_label(label_value)}"' for label, label_value in labels)
+    return f"{METRICS_PREFIX}_{name}{{{labels}}} {value}" if labels else f"{METRICS_PREFIX}_{name} {value}"
+
+
+def get_metrics(profile, subcommand=""):
+    """Prometheus text format of a profile: totals of each phase and each count, as gauges of the last run."""
+    run_labels = (("subcommand", subcommand),) if subcommand else ()
+    memory, child_memory = get_peak_memory()
+    lines = [f"# HELP {METRICS_PREFIX}_run_timestamp_seconds Start of the run",
+             f"# TYPE {METRICS_PREFIX}_run_timestamp_seconds gauge",
+             format_metric("run_timestamp_seconds", profile["timestamp"], run_labels),
+             f"# HELP {METRICS_PREFIX}_run_seconds Duration of the run",
+             f"# TYPE {METRICS_PREFIX}_run_seconds gauge",
+             format_metric("run_seconds", time.perf_counter() - profile["start"], run_labels),
+             f"# HELP {METRICS_PREFIX}_peak_memory_bytes Peak resident memory of mutation-core (process) "
+             f"and of the largest command it ran (commands)",
+             f"# TYPE {METRICS_PREFIX}_peak_memory_bytes gauge",
+             format_metric("peak_memory_bytes", memory, run_labels + (("process", "mutation-core"),)),
+             format_metric("peak_memory_bytes", child_memory, run_labels + (("process", "commands"),))]
+
+    phases = summarize_phases(profile)
+    for metric, key, help_text in (("phase_seconds", "seconds", "Time spent in each phase"),
+                                   ("phase_max_seconds", "max_seconds", "Longest run of each phase"),
+                                   ("phase_runs", "count", "Runs of each phase"),
+                                   ("phase_peak_memory_bytes", "peak_memory",
+                                    "Peak resident memory of mutation-core at the end of each phase")):
+        lines += [f"# HELP {METRICS_PREFIX}_{metric} {help_text}", f"# TYPE {METRICS_PREFIX}_{metric} gauge"]
+        lines += [format_metric(metric, summary[key], run_labels + (("phase", name),))
+                  for name, summary in sorted(phases.items())]
+
+    names = sorted({name for name, _ in profile["counts"]})
+    for name in names:
+        lines += [f"# HELP {METRICS_PREFIX}_{name} {COUNT_HELP.get(name, name)}",
+                  f"# TYPE {METRICS_PREFIX}_{name} gauge"]
+        lines += [format_metric(name, value, run_labels + labels)
+                  for (count_name, labels), value in sorted(profile["counts"].items()) if count_name == name]
+    return "\n".join(lines) + "\n"
+
+
+def write_profile(profile, trace_path=None, metrics_path=None, subcommand=""):
+    """
+    Export a profile as a Chrome trace and/or a Prometheus textfile.
+
+    Both files are replaced atomically, so the textfile collector of node_exporter
+    never reads a partial file.
+    """
+    outputs = []
+    if trace_path:
+        outputs.append((trace_path, json.dumps(get_trace(profile))))
+    if metrics_path:
+        outputs.append((metrics_path, get_metrics(profile, subcommand)))
+    for path, content in outputs:
+        with open(path + ".tmp", 'w') as file:
+            file.write(content)
+        os.replace(path + ".tmp", path)
+        print(f"Profile written to {path}")
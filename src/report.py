@@ -3,8 +3,30 @@ import re
 import json
 import subprocess
 from datetime import datetime
+from src.mutants import get_diff
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Outcome of every analyzed mutant, appended as the analysis goes (JSON Lines)
+RESULTS_FILE = "mutation_results.jsonl"
+LEGACY_REPORT_FILE = "diff_not_killed.json"
+NOT_KILLED_STATUSES = ("survived", "no_coverage")
+DATE_FORMAT = "%d/%m/%Y %H:%M:%S"
+
+# Commit of each repository, fetched once per run
+GIT_HASHES = {}
 
 def get_git_hash():
+    cwd = os.getcwd()
+    if cwd not in GIT_HASHES:
+        GIT_HASHES[cwd] = fetch_git_hash()
+    return GIT_HASHES[cwd]
+
+
+def fetch_git_hash():
     try:
         result = subprocess.run(['git', 'log', '--pretty=format:%h', '-n', '1'], 
                               capture_output=True,
@@ -18,15 +40,15 @@ def get_git_hash():
 
 def parse_diffs_to_json(diffs_list):
     result = {}
-    
+    commit = get_git_hash()
+
     for diff in diffs_list:
         match = re.search(r'@@ -(\d+),', diff)
         if match:
             line_num = str(int(match.group(1)) + 3)
             if line_num not in result:
                 result[line_num] = []
-            
-            commit = get_git_hash()
+
             result[line_num].append({
                 "id": len(result[line_num]) + 1,
                 "commit": commit if commit else "",
@@ -36,19 +58,10 @@ def parse_diffs_to_json(diffs_list):
     
     return result
 
-def generate_report(not_killed_mutants=[], folder="", original_file="", score=0, just_append=True):
-    # Skips creating a report file if mutation score is 100%
+def generate_report(not_killed_mutants=[], folder="", original_file="", score=0, diffs=None):
+    """Print the diffs of the surviving mutants. Returns the diffs."""
     if len(not_killed_mutants) == 0:
-        return
-
-    now = datetime.now()
-    # Define the JSON structure
-    report_data = {
-        "filename": original_file,
-        "mutation_score": score,
-        "date": now.strftime("%d/%m/%Y %H:%M:%S"),
-        "diffs": []
-    }
+        return []
 
     if "test/" in original_file and ".cpp" not in original_file:
         start_index = original_file.find("test/")
@@ -56,38 +69,170 @@ def generate_report(not_killed_mutants=[], folder="", original_file="", score=0,
 
     subprocess.run(['git', 'checkout', '--', original_file])
     print("Surviving mutants:")
+    not_killed_mutants = set(not_killed_mutants)
+    with open(original_file, 'r', encoding="utf8") as file:
+        original_content = file.read()
+    survivor_diffs = []
     # Iterate over all files in the directory
     for filename in os.listdir(folder):
         if filename in not_killed_mutants:
             modified_file = os.path.join(folder, filename)
+            with open(modified_file, 'r', encoding="utf8") as file:
+                survivor_diffs.append(get_diff(original_file, original_content, modified_file, file.read()))
+
+    # Diffs of mutants which are not files in the folder (e.g. schemata mutants)
+    survivor_diffs += diffs or []
+    for diff in survivor_diffs:
+        print(diff)
+        print("--------------")
+    return survivor_diffs
+
+
+def make_result(folder, file, mutant, status, operator=None, line=None, duration=None, command=None,
+                diff=None, **extra):
+    """Record of the outcome of a mutant, as stored in the results file."""
+    record = {"folder": folder, "file": file, "mutant": mutant, "operator": operator, "line": line,
+              "status": status, "duration": round(duration, 3) if duration is not None else None,
+              "command": command, **extra, "date": datetime.now().strftime(DATE_FORMAT)}
+    if diff is not None:
+        record["diff"] = diff
+    return record
+
+
+def make_start(folder, file):
+    """Record discarding the previous results of a folder, appended when its analysis starts over."""
+    return {"event": "start", "folder": folder, "file": file, "date": datetime.now().strftime(DATE_FORMAT)}
+
+
+def make_estimate(folder, file, estimate, confidence, analyzed, total):
+    """Record of the score estimated from a sample of the mutants of a folder."""
+    score, lower, upper = estimate
+    return {"event": "estimate", "folder": folder, "file": file, "score": score, "lower": lower, "upper": upper,
+            "confidence": confidence, "analyzed": analyzed, "total": total,
+            "date": datetime.now().strftime(DATE_FORMAT)}
+
+
+def append_results(records, results_path=RESULTS_FILE):
+    """
+    Append records to the results file, one JSON object per line.
+
+    The lines are written with a single write on a file opened in append mode (and under
+    an exclusive lock where available), so concurrent writers never interleave records.
+    """
+    data = "".join(json.dumps(record) + "\n" for record in records).encode()
+    fd = os.open(results_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        if fcntl:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        written = 0
+        while written < len(data):
+            written += os.write(fd, data[written:])
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def read_results(results_path=RESULTS_FILE):
+    """Stream the records of the results file."""
+    if not os.path.isfile(results_path):
+        return
+    with open(results_path, 'r', encoding="utf8") as file:
+        for line in file:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                # The last line might be incomplete if the process was killed while writing it
+                continue
+
+
+def get_latest_results(records):
+    """Get {(folder, mutant): record} with the latest outcome of each mutant."""
+    latest = {}
+    for record in records:
+        if record.get("event") == "estimate":
+            continue
+        if record.get("event") == "start":
+            latest = {key: value for key, value in latest.items() if key[0] != record["folder"]}
+        elif "mutant" in record:
+            latest.pop((record["folder"], record["mutant"]), None)
+            latest[(record["folder"], record["mutant"])] = record
+    return latest
+
+
+def aggregate_results(records):
+    """
+    Get the score of each mutated file: {file: {"killed", "survived", "no_coverage", "timeout",
+    "total", "score", "date", "diffs"}}.
+
+    Timeouts count as killed and mutants without coverage as survivors, discarded mutants
+    (stillborn or equivalent) are not counted. When only a sample of the mutants of a file was
+    analyzed, the summary also has the latest estimated score ("estimate").
+    """
+    records = list(records)
+    estimates = {}
+    for record in records:
+        if record.get("event") == "start":
+            estimates.pop(record["folder"], None)
+        elif record.get("event") == "estimate":
+            estimates[record["folder"]] = record
+    files = {}
+    for record in get_latest_results(records).values():
+        summary = files.setdefault(record["file"], {"killed": 0, "survived": 0, "no_coverage": 0, "timeout": 0,
+                                                    "total": 0, "score": 0, "date": record["date"], "diffs": []})
+        if record["status"] in summary:
+            summary[record["status"]] += 1
+            summary["total"] += 1
+        if record["status"] in NOT_KILLED_STATUSES and record.get("diff"):
+            summary["diffs"].append(record["diff"])
+        summary["date"] = record["date"]
+    for summary in files.values():
+        killed = summary["killed"] + summary["timeout"]
+        summary["score"] = killed / summary["total"] if summary["total"] else 0
+    for estimate in estimates.values():
+        if estimate["file"] in files:
+            files[estimate["file"]]["estimate"] = estimate
+    return files
+
+
+def write_legacy_report(records, json_file=LEGACY_REPORT_FILE):
+    """Write the surviving mutants of every file to `json_file` in the format of diff_not_killed.json."""
+    reports = []
+    for file, summary in aggregate_results(records).items():
+        # Files without surviving mutants are left out
+        if summary["survived"] + summary["no_coverage"] == 0:
+            continue
+        reports.append({"filename": file, "mutation_score": summary["score"], "date": summary["date"],
+                        "diffs": parse_diffs_to_json(summary["diffs"])})
+    with open(json_file + ".tmp", 'w') as file:
+        json.dump(reports, file, indent=4)
+    os.replace(json_file + ".tmp", json_file)
+    return reports
+
+
+def report_results(results_path=RESULTS_FILE, json_file=LEGACY_REPORT_FILE):
+    """
+    Print the mutation score of every file of the results file.
 
-            # Use git diff --no-index to compare the files and capture the output
-            result = subprocess.run(['git', 'diff', '--no-index',
-                                     original_file, modified_file],
-                                     capture_output=True, text=True)
-            print(result.stdout)
-            print("--------------")
-
-            # Append the diff output to the diffs list
-            report_data["diffs"].append(result.stdout)
-
-    report_data["diffs"] = parse_diffs_to_json(report_data["diffs"])
-
-    # Check if we should append to an existing file or create a new one
-    json_file = 'diff_not_killed.json' if just_append else f'diff_not_killed-{original_file.replace(".cpp", "").replace(".py", "").replace("/", "-")}.json'
-
-    if just_append and os.path.exists(json_file):
-        # Load existing data if the file exists
-        with open(json_file, 'r', errors='ignore') as file:
-            existing_data = json.load(file)
-        if isinstance(existing_data, list):
-            existing_data.append(report_data)
-        else:
-            existing_data = [existing_data, report_data]
-    else:
-        # Start with fresh data
-        existing_data = [report_data] if just_append else report_data
-
-    # Save to the JSON file
-    with open(json_file, 'w') as file:
-        json.dump(existing_data, file, indent=4)
+    Args:
+        results_path: Path to the results file
+        json_file: Path to write the surviving mutants to, as diff_not_killed.json (None to skip)
+    """
+    if not os.path.isfile(results_path):
+        raise Exception(f'No results found ({results_path}), run `mutation-core analyze` first')
+    summaries = aggregate_results(read_results(results_path))
+    for file, summary in sorted(summaries.items()):
+        print(f"{file}: {round(summary['score'] * 100, 2)}% ({summary['killed'] + summary['timeout']} killed, "
+              f"{summary['survived']} survived, {summary['no_coverage']} not covered, "
+              f"{summary['timeout']} timeouts)")
+        if "estimate" in summary:
+            estimate = summary["estimate"]
+            print(f"    estimated: {round(estimate['score'] * 100, 2)}% ({estimate['confidence']:.0%} confidence interval: "
+                  f"{round(estimate['lower'] * 100, 2)}%-{round(estimate['upper'] * 100, 2)}%, "
+                  f"{estimate['analyzed']} of {estimate['total']} mutants analyzed)")
+    killed = sum(summary["killed"] + summary["timeout"] for summary in summaries.values())
+    total = sum(summary["total"] for summary in summaries.values())
+    print(f"\nMUTATION SCORE: {round(killed / total * 100, 2) if total else 0}%")
+    if json_file:
+        write_legacy_report(read_results(results_path), json_file)
+        print(f"Surviving mutants written to {json_file}")
+    return summaries
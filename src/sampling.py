@@ -0,0 +1,108 @@
+import math
+import random
+from statistics import NormalDist
+
+# Lines of a region: mutants are stratified by operator and by region of the file
+REGION_LINES = 50
+# Mutants analyzed before the confidence interval is trusted
+MIN_SAMPLE = 30
+DEFAULT_CONFIDENCE = 0.95
+
+
+def get_stratum(operator, line, region_lines=REGION_LINES):
+    """Stratum of a mutant: its operator and the region of the file its line is in."""
+    return (operator or "", (line or 0) // region_lines)
+
+
+def stratified_order(strata, seed=None):
+    """
+    Random order of the mutants in which every prefix is a stratified sample.
+
+    Mutants are shuffled within their stratum and the strata are interleaved in proportion
+    to their sizes, so analyzing the first n mutants samples every stratum proportionally.
+
+    Args:
+        strata: {mutant: stratum}
+        seed: Seed of the random order (None for a different order on every run)
+    """
+    rng = random.Random(seed)
+    by_stratum = {}
+    for name, stratum in strata.items():
+        by_stratum.setdefault(stratum, []).append(name)
+    keys = {}
+    for names in by_stratum.values():
+        names.sort()
+        rng.shuffle(names)
+        offset = rng.random()
+        for i, name in enumerate(names):
+            keys[name] = (i + offset) / len(names)
+    return sorted(strata, key=lambda name: (keys[name], rng.random()))
+
+
+def get_variance(killed, analyzed, size):
+    """Variance of the kill rate of a stratum of `size` mutants estimated from `analyzed` of them."""
+    smoothed = (killed + 0.5) / (analyzed + 1)
+    return smoothed * (1 - smoothed) / analyzed * (size - analyzed) / max(size - 1, 1)
+
+
+def estimate_score(strata, results, confidence=DEFAULT_CONFIDENCE):
+    """
+    Stratified estimate of the mutation score with its confidence interval.
+
+    Each stratum is weighted by its share of the mutants, the ones not sampled yet are
+    estimated with the overall kill rate. The variance uses the finite population correction,
+    and a smoothed kill rate so strata where every analyzed mutant was killed (or survived)
+    still count as uncertain.
+
+    Args:
+        strata: {mutant: stratum} of every mutant
+        results: {mutant: True if it was killed} of the mutants analyzed so far (the ones
+                 missing from `strata` are ignored)
+        confidence: Confidence level of the interval (0.95 = 95%)
+
+    Returns:
+        (score, lower bound, upper bound), or None if no mutant was analyzed
+    """
+    results = {name: is_killed for name, is_killed in results.items() if name in strata}
+    if not results:
+        return None
+    sizes = {}
+    for stratum in strata.values():
+        sizes[stratum] = sizes.get(stratum, 0) + 1
+    analyzed = {}
+    killed = {}
+    for name, is_killed in results.items():
+        stratum = strata[name]
+        analyzed[stratum] = analyzed.get(stratum, 0) + 1
+        killed[stratum] = killed.get(stratum, 0) + is_killed
+    # Strata without any analyzed mutant are estimated with the overall kill rate
+    overall = sum(killed.values()) / len(results)
+    total = len(strata)
+    score = 0
+    variance = 0
+    # Strata with less than 2 analyzed mutants do not have a variance of their own:
+    # they are collapsed into a single stratum for the variance
+    rest = {"weight": 0, "size": 0, "analyzed": 0, "killed": 0}
+    for stratum, size in sizes.items():
+        weight = size / total
+        n = analyzed.get(stratum, 0)
+        score += weight * (killed[stratum] / n if n else overall)
+        if n < 2:
+            rest["weight"] += weight
+            rest["size"] += size
+            rest["analyzed"] += n
+            rest["killed"] += killed.get(stratum, 0)
+            continue
+        variance += weight ** 2 * get_variance(killed[stratum], n, size)
+    if rest["weight"]:
+        if rest["analyzed"]:
+            variance += rest["weight"] ** 2 * get_variance(rest["killed"], rest["analyzed"], rest["size"])
+        else:
+            variance += rest["weight"] ** 2 * get_variance(sum(killed.values()), len(results), total)
+    margin = NormalDist().inv_cdf((1 + confidence) / 2) * math.sqrt(variance)
+    return score, max(0, score - margin), min(1, score + margin)
+
+
+def is_precise(estimate, analyzed, width, min_sample=MIN_SAMPLE):
+    """Whether the confidence interval of `estimate` is at most `width` wide after enough mutants."""
+    return estimate is not None and analyzed >= min_sample and estimate[2] - estimate[1] <= width
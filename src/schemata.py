@@ -0,0 +1,110 @@
+import os
+import re
+import json
+
+SCHEMATA_FILE = "schemata.json"
+MUTANT_ID_ENV = "MUTATION_CORE_MUTANT_ID"
+
+# Reads the id of the mutant to activate (-1 = original code) once per process
+PREAMBLE = [
+    "#include <cstdlib>\n",
+    "static inline int mutation_core_mutant_id() { static const int id = [] { "
+    f"const char* id = std::getenv(\"{MUTANT_ID_ENV}\"); return id ? std::atoi(id) : -1; "
+    "}(); return id; }\n",
+    # Keep the line numbers of the original file in diagnostics
+    "#line 1\n",
+]
+
+# Lines starting with these words cannot be wrapped into an if/else block
+DO_NOT_GUARD = ("else", "case", "default", "do", "auto", "const", "static", "constexpr",
+                "using", "typedef", "template", "struct", "class", "enum", "namespace",
+                "friend", "extern", "public", "private", "protected", "goto")
+DO_NOT_GUARD_IF_CONTAIN = ["LOCK", "{", "}", "\"", "'", "//", "/*"]
+
+DECLARATION_REGEX = re.compile(r"^[\w:<>,\s\*&]+\s+[\*&]*\w+\s*(=|\{|;|\(|\[)")
+STATEMENT_END = (";", "{", "}", ")", ":")
+
+
+def can_guard(file_to_mutate, source_code, line_num):
+    """Whether the line at `line_num` is a complete statement which can be
+    replaced by `if (id == N) { mutated } else { original }`."""
+    if not file_to_mutate.endswith(".cpp"):
+        return False
+    line = source_code[line_num].strip()
+    if not line.endswith(";") or not re.match(r"[A-Za-z_]|\+\+|--", line):
+        return False
+    if re.match(r"\w*", line).group(0) in DO_NOT_GUARD:
+        return False
+    if any(word in line for word in DO_NOT_GUARD_IF_CONTAIN):
+        return False
+    if line.count("(") != line.count(")") or line.count("[") != line.count("]"):
+        return False
+    # Declarations would be scoped to the if/else block
+    if not line.startswith(("return ", "return;")) and DECLARATION_REGEX.match(line):
+        return False
+    # The line must not be the continuation of a previous statement
+    previous = ""
+    for previous_line in reversed(source_code[:line_num]):
+        previous = previous_line.strip()
+        if previous and not previous.startswith(("//", "#")):
+            break
+    return previous == "" or previous.endswith(STATEMENT_END)
+
+
+def guard_line(line, mutations):
+    """Replace `line` by a chain of if/else selecting the mutation by its id.
+
+    Everything is kept on a single line so the line numbers do not change.
+    """
+    indent = line[:len(line) - len(line.lstrip())]
+    guarded = indent
+    for mutant_id, line_mutated in mutations:
+        guarded += f"if (mutation_core_mutant_id() == {mutant_id}) {{ {line_mutated.strip()} }} else "
+    return guarded + f"{{ {line.strip()} }}\n"
+
+
+def instrument_source(source_code, mutants):
+    """Get the content of `source_code` (lines) with the lines of `mutants` guarded by their id."""
+    by_line = {}
+    for mutant in mutants:
+        by_line.setdefault(mutant["line"] - 1, []).append((mutant["id"], mutant["mutated"]))
+    lines = source_code.copy()
+    for line_num, line_mutations in by_line.items():
+        lines[line_num] = guard_line(source_code[line_num], line_mutations)
+    return "".join(PREAMBLE + lines)
+
+
+def write_schemata(folder_path, source_name, source_code, mutations):
+    """
+    Write one instrumented source file containing all mutations and its index.
+
+    Args:
+        folder_path: Path to mutants folder
+        source_name: Name of the instrumented source file
+        source_code: Lines of the original file
+        mutations: List of (line index, mutated line, operator id)
+    """
+    mutants = [{"id": mutant_id, "line": line_num + 1, "operator": operator,
+                "original": source_code[line_num], "mutated": line_mutated}
+               for mutant_id, (line_num, line_mutated, operator) in enumerate(mutations)]
+
+    with open(os.path.join(folder_path, source_name), 'w', encoding="utf8") as file:
+        file.write(instrument_source(source_code, mutants))
+    with open(os.path.join(folder_path, SCHEMATA_FILE), 'w') as file:
+        json.dump({"source": source_name, "mutants": mutants}, file, indent=4)
+
+
+def read_schemata(folder_path):
+    """Get (instrumented source, mutants) of a mutants folder, None if it has no schemata."""
+    schemata_path = os.path.join(folder_path, SCHEMATA_FILE)
+    if not os.path.isfile(schemata_path):
+        return None
+    with open(schemata_path, 'r') as file:
+        schemata = json.load(file)
+    with open(os.path.join(folder_path, schemata["source"]), 'r', encoding="utf8") as file:
+        source = file.read()
+    return source, schemata["mutants"]
+
+
+def get_mutant_name(mutant):
+    return f"schemata-{mutant['id']}"
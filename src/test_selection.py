@@ -0,0 +1,123 @@
+import os
+import re
+import ast
+import shlex
+import subprocess
+from src.cov import BASE_PATH, parse_coverage_file, normalize_path, get_file_coverage
+
+UNIT_TEST_COMMAND = "./build/src/test/test_bitcoin"
+FUNCTIONAL_TEST_COMMAND = "CI_FAILFAST_TEST_LEAVE_DANGLING=1 ./build/test/functional/test_runner.py -F"
+TEST_RUNNER = "test/functional/test_runner.py"
+
+# Kills within this distance of a mutated line rank a test before kills anywhere else in the file
+NEAR_LINES = 20
+
+
+def build_test_index(coverage_folder, root=BASE_PATH):
+    """
+    Build a {normalized source file: {line: set of tests}} index from per-test coverage files.
+
+    The folder must contain one lcov file per test, named after the test:
+    `<unit test suite>.info` (e.g. coinselector_tests.info) or
+    `<functional test>.py.info` (e.g. feature_addrman.py.info).
+    Source files inside `root` are relative to it, so they are looked up directly.
+    """
+    index = {}
+    for filename in sorted(os.listdir(coverage_folder)):
+        if not filename.endswith('.info'):
+            continue
+        test = filename[:-len('.info')]
+        coverage = parse_coverage_file(os.path.join(coverage_folder, filename))
+        for source_file, lines in coverage.items():
+            lines_index = index.setdefault(normalize_path(source_file, root), {})
+            for line in lines:
+                lines_index.setdefault(line, set()).add(test)
+    return index
+
+
+def get_tests_for_line(index, target_file_path, line):
+    """Tests covering `line` (1-based) of `target_file_path`."""
+    lines_index = get_file_coverage(index, target_file_path)
+    return sorted(lines_index.get(line, [])) if lines_index else []
+
+
+def is_functional_test(test):
+    """Functional tests are scripts, optionally with arguments (e.g. `wallet_basic.py --descriptors`)."""
+    return test.split()[0].endswith('.py')
+
+
+def get_command_for_tests(tests):
+    """Command running only `tests` (unit test suites and/or functional tests)."""
+    unit_tests = [test for test in tests if not is_functional_test(test)]
+    functional_tests = [test for test in tests if is_functional_test(test)]
+    commands = []
+    if unit_tests:
+        commands.append(f"{UNIT_TEST_COMMAND} --run_test={':'.join(unit_tests)}")
+    if functional_tests:
+        commands.append(f"{FUNCTIONAL_TEST_COMMAND} {' '.join(shlex.quote(test) for test in functional_tests)}")
+    return " && ".join(commands)
+
+
+def get_mutated_line(original_content, mutant_content):
+    """First line (1-based) where a mutant differs from the original file (None if equal)."""
+    original_lines = original_content.splitlines()
+    mutant_lines = mutant_content.splitlines()
+    for line, (original, mutated) in enumerate(zip(original_lines, mutant_lines), 1):
+        if original != mutated:
+            return line
+    if len(original_lines) != len(mutant_lines):
+        return min(len(original_lines), len(mutant_lines)) + 1
+    return None
+
+
+def parse_list_content(output):
+    """Enabled suites from the output of `test_bitcoin --list_content`."""
+    return re.findall(r"^(\w+)\*$", output, re.MULTILINE)
+
+
+def list_unit_tests(root=None):
+    """Unit test suites run by test_bitcoin ([] if it is not built)."""
+    try:
+        result = subprocess.run(f"{UNIT_TEST_COMMAND} --list_content", shell=True, cwd=root,
+                                stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, timeout=60)
+    except subprocess.TimeoutExpired:
+        return []
+    return parse_list_content(result.stdout)
+
+
+def list_functional_tests(root=None):
+    """
+    Functional tests run by default by test_runner.py (its BASE_SCRIPTS).
+
+    Each variant of a script is a test of its own, with its arguments (e.g. `wallet_basic.py --descriptors`),
+    test_runner.py accepts them as a single argument.
+    """
+    runner_path = os.path.join(root or "", TEST_RUNNER)
+    if not os.path.isfile(runner_path):
+        return []
+    with open(runner_path, 'r') as file:
+        tree = ast.parse(file.read())
+    for node in tree.body:
+        if (isinstance(node, ast.Assign) and len(node.targets) == 1 and
+                isinstance(node.targets[0], ast.Name) and node.targets[0].id == "BASE_SCRIPTS"):
+            return list(dict.fromkeys(ast.literal_eval(node.value)))
+    return []
+
+
+def order_tests(tests, kills, line):
+    """
+    Order tests by how often they killed mutants of the same file, nearest lines first.
+
+    Args:
+        tests: Test names
+        kills: List of (line, test) of earlier kills in the mutated file
+        line: Mutated line
+    """
+    near_kills = {}
+    file_kills = {}
+    for kill_line, test in kills:
+        file_kills[test] = file_kills.get(test, 0) + 1
+        if abs(kill_line - line) <= NEAR_LINES:
+            near_kills[test] = near_kills.get(test, 0) + 1
+    # sorted is stable: tests which never killed a mutant keep their order, last
+    return sorted(tests, key=lambda test: (-near_kills.get(test, 0), -file_kills.get(test, 0)))
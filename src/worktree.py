@@ -0,0 +1,34 @@
+import os
+import subprocess
+import pathlib
+
+BASE_PATH = str(pathlib.Path().resolve())
+WORKTREES_PATH = os.path.join(BASE_PATH, '.mutation-core', 'worktrees')
+
+
+def get_head_commit():
+    result = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True,
+                            text=True, check=True)
+    return result.stdout.strip()
+
+
+def setup_worktree(index, commit):
+    """Create (or reuse) a detached worktree for a worker, checked out at `commit`.
+
+    Worktrees are kept between runs so their build directories can be reused.
+    """
+    path = os.path.join(WORKTREES_PATH, f'worker-{index}')
+    if os.path.isdir(path):
+        subprocess.run(['git', '-C', path, 'checkout', '--force', '--detach', commit],
+                       capture_output=True, check=True)
+    else:
+        os.makedirs(WORKTREES_PATH, exist_ok=True)
+        subprocess.run(['git', 'worktree', 'add', '--force', '--detach', path, commit],
+                       capture_output=True, check=True)
+    return path
+
+
+def setup_worktrees(workers):
+    """Set up one worktree per worker at the current HEAD, each one with its own build folder."""
+    commit = get_head_commit()
+    return [setup_worktree(index, commit) for index in range(workers)]
@@ -1,10 +1,23 @@
 import unittest
 import os
+import shutil
+import signal
 import sys
+import tempfile
+import threading
+import time
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.analyze import get_command_to_kill
+from src.analyze import (
+    get_command_to_kill,
+    run_command,
+    run_test,
+    exceeds_survival_threshold,
+    analyze_mutants,
+    Analysis,
+    build_and_run
+)
 
 class TestAnalyze(unittest.TestCase):
     def test_get_command_to_kill(self):
@@ -16,6 +29,63 @@ class TestAnalyze(unittest.TestCase):
         for files, command in files_and_command.items():
             self.assertEqual(get_command_to_kill(files, jobs=0), command)
 
+    def test_run_command(self):
+        self.assertEqual(run_command("true"), "passed")
+        self.assertEqual(run_command("false"), "failed")
+        start = time.time()
+        # The background process must be killed with the shell
+        self.assertEqual(run_command("sleep 30 & sleep 30", timeout=0.5), "timeout")
+        self.assertLess(time.time() - start, 10)
+
+    def test_interrupt(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        checkouts = [os.path.join(root, f'checkout-{i}') for i in range(2)]
+        for checkout in checkouts:
+            os.makedirs(os.path.join(checkout, 'src'))
+            with open(os.path.join(checkout, 'src', 'a.cpp'), 'w') as file:
+                file.write('original\n')
+        results = []
+        # Ctrl-C while every worker is running its test command
+        threading.Timer(1, os.kill, (os.getpid(), signal.SIGINT)).start()
+        start = time.time()
+        with self.assertRaises(KeyboardInterrupt):
+            analyze_mutants(['a.mutant.0.cpp', 'a.mutant.1.cpp'], root, 'src/a.cpp',
+                            lambda checkout, name: run_test("sleep 30", cwd=checkout), checkouts,
+                            read_mutant=lambda name: 'mutant\n', on_result=lambda *args: results.append(args))
+        # The commands are killed, and the mutants they were testing are not recorded as killed
+        self.assertLess(time.time() - start, 10)
+        self.assertEqual(results, [])
+        for checkout in checkouts:
+            with open(os.path.join(checkout, 'src', 'a.cpp')) as file:
+                self.assertEqual(file.read(), 'original\n')
+        self.assertEqual(run_command("true"), "passed")
+
+    def test_build_and_run(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        os.makedirs(os.path.join(root, 'src'))
+        original = 'int f(int a, int b) {\n    return b - a;\n}\n'
+        with open(os.path.join(root, 'src', 'a.cpp'), 'w') as file:
+            file.write(original)
+        with open(os.path.join(root, 'a.mutant.0.cpp'), 'w') as file:
+            file.write(original.replace('b - a', 'b + a'))
+        analysis = Analysis(root, 'src/a.cpp', original, {}, command="grep -q 'b - a' src/a.cpp")
+        self.assertTrue(build_and_run(analysis, root, 'a.mutant.0.cpp'))
+        with open(os.path.join(root, 'src', 'a.cpp'), 'w') as file:
+            file.write(original.replace('b - a', 'b + a'))
+        self.assertFalse(build_and_run(analysis, root, 'a.mutant.0.cpp'))
+        # Not covered by any test according to per-test coverage: not run
+        analysis.test_index = {}
+        self.assertTrue(build_and_run(analysis, root, 'a.mutant.0.cpp'))
+        self.assertEqual(analysis.no_coverage, ['a.mutant.0.cpp'])
+
+    def test_exceeds_survival_threshold(self):
+        # Not decided on the first mutants alone
+        self.assertFalse(exceeds_survival_threshold(3, 3, 0.3))
+        self.assertTrue(exceeds_survival_threshold(4, 10, 0.3))
+        self.assertFalse(exceeds_survival_threshold(30, 100, 0.3))
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,93 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.api import Mutant, iter_mutants, run_mutants
+from src.analyze import TIMEOUT
+
+ORIGINAL = "int f(int a, int b) {\n    if (a > b) return a;\n    return b - a;\n}\n"
+
+
+class TestApi(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.root, 'src'))
+        for name in ('a.cpp', 'b.cpp'):
+            with open(os.path.join(self.root, 'src', name), 'w') as file:
+                file.write(ORIGINAL)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def read(self, name):
+        with open(os.path.join(self.root, 'src', name)) as file:
+            return file.read()
+
+    def test_iter_mutants(self):
+        mutants = iter_mutants(['src/a.cpp', 'src/b.cpp'], root=self.root)
+        first = next(mutants)
+        self.assertIsInstance(first, Mutant)
+        self.assertEqual((first.file, first.line, first.original), ('src/a.cpp', 2, "    if (a > b) return a;\n"))
+        self.assertEqual(first.apply(ORIGINAL).splitlines(keepends=True)[1], first.mutated)
+        rest = list(mutants)
+        self.assertEqual(len([mutant for mutant in rest if mutant.file == 'src/b.cpp']), (len(rest) + 1) // 2)
+        self.assertEqual(list(iter_mutants('src/a.cpp', root=self.root, lines=[3])),
+                         [mutant for mutant in [first] + rest if mutant.file == 'src/a.cpp' and mutant.line == 3])
+        self.assertEqual(list(iter_mutants('src/a.cpp', root=self.root, lines=[1])), [])
+        with self.assertRaises(ValueError):
+            next(iter_mutants(None, root=self.root))
+
+    def test_iter_mutants_base(self):
+        git = 'git -c user.name=a -c user.email=a@a'
+        subprocess.run(f'git init -q && {git} add -A && {git} commit -qm init', shell=True, check=True,
+                       cwd=self.root)
+        os.makedirs(os.path.join(self.root, 'doc'))
+        with open(os.path.join(self.root, 'doc', 'a.cpp'), 'w') as file:
+            file.write(ORIGINAL)
+        with open(os.path.join(self.root, 'src', 'b.cpp'), 'w') as file:
+            file.write(ORIGINAL.replace("b - a", "a - b"))
+        subprocess.run(f'{git} add -A && {git} commit -qm change', shell=True, check=True, cwd=self.root)
+        cwd = os.getcwd()
+        mutants = iter_mutants(None, root=self.root, base='HEAD~1..HEAD')
+        first = next(mutants)
+        # git runs in `root`, the current directory of the caller is left alone
+        self.assertEqual(os.getcwd(), cwd)
+        # Skipped files (e.g. docs) are not mutated, as with the command line
+        self.assertEqual({mutant.file for mutant in [first] + list(mutants)}, {'src/b.cpp'})
+
+    def test_run_mutants(self):
+        seen = []
+
+        def runner(mutant):
+            # The mutant is applied on disk, the other file is untouched
+            other = 'b.cpp' if mutant.file == 'src/a.cpp' else 'a.cpp'
+            self.assertEqual(self.read(os.path.basename(mutant.file)), mutant.apply(ORIGINAL))
+            self.assertEqual(self.read(other), ORIGINAL)
+            seen.append(mutant)
+            if "1==1" in mutant.mutated:
+                return TIMEOUT
+            return "b + a" in mutant.mutated
+
+        results = run_mutants(iter_mutants(['src/a.cpp', 'src/b.cpp'], root=self.root), runner, root=self.root)
+        self.assertEqual(results["total"], len(seen))
+        self.assertEqual(results["killed"] + results["timeout"] + results["survived"], results["total"])
+        self.assertEqual(results["timeout"], 2)
+        self.assertEqual(sorted(result.mutant for result in results["survivors"]),
+                         sorted(mutant for mutant in seen if mutant.line == 3))
+        self.assertEqual(self.read('a.cpp'), ORIGINAL)
+        self.assertEqual(self.read('b.cpp'), ORIGINAL)
+
+        # Without writing, the runner gets the mutants only
+        results = run_mutants(iter_mutants('src/a.cpp', root=self.root), lambda mutant: "killed", write=False)
+        self.assertEqual(results["score"], 1)
+        with self.assertRaisesRegex(ValueError, "killed, survived, timeout"):
+            run_mutants(iter_mutants('src/a.cpp', root=self.root), lambda mutant: "failed", write=False)
+
+
+if __name__ == '__main__':
+    unittest.main()
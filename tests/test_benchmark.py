@@ -0,0 +1,52 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import benchmark
+from src.benchmark import generate_source, generate_lcov, bench_generation, bench_analysis, compare_results
+from src.cov import parse_coverage_index
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_generate_source(self):
+        source = generate_source(100)
+        self.assertEqual(source, generate_source(100))
+        self.assertEqual(len(source.splitlines()), 100)
+        self.assertNotEqual(generate_source(100, ".py"), source)
+
+    def test_generate_lcov(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.info', delete=False) as file:
+            file.write(generate_lcov(['/root/src/a.cpp', '/root/src/b.cpp'], 100))
+        try:
+            coverage = parse_coverage_index(file.name, '/root')
+        finally:
+            os.remove(file.name)
+        self.assertEqual(sorted(coverage), ['src/a.cpp', 'src/b.cpp'])
+        self.assertTrue(50 < len(coverage['src/a.cpp']['lines']) < 90)
+        self.assertEqual(len(coverage['src/a.cpp']['functions']), 2)
+
+    def test_benchmarks(self):
+        cwd = os.getcwd()
+        generation = bench_generation("small", repeat=1)
+        self.assertGreater(generation["mutants"], 0)
+        self.assertGreater(generation["peak_memory"], 0)
+        analysis = bench_analysis("small")
+        self.assertEqual(analysis["mutants"], benchmark.ANALYZED_MUTANTS["small"])
+        self.assertEqual(os.getcwd(), cwd)
+
+    def test_compare_results(self):
+        baseline = [{"benchmark": "a", "seconds": 1.0, "peak_memory": 10 << 20},
+                    {"benchmark": "b", "seconds": 0.001, "peak_memory": 1000}]
+        self.assertEqual(compare_results(baseline, baseline), [])
+        # Slower, and too small to be measured reliably
+        results = [{"benchmark": "a", "seconds": 1.5, "peak_memory": 10 << 20},
+                   {"benchmark": "b", "seconds": 0.002, "peak_memory": 2000},
+                   {"benchmark": "c", "seconds": 10, "peak_memory": 0}]
+        self.assertEqual(len(compare_results(results, baseline)), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
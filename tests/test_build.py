@@ -0,0 +1,85 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.build import get_setup_command, get_configure_command, find_compile_command, get_link_command, rebuild
+from src.analyze import run
+
+
+class TestBuild(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.root, 'build', 'src', 'test'))
+        with open(os.path.join(self.root, 'build', 'src', 'test', 'test_bitcoin'), 'w'):
+            pass
+        with open(os.path.join(self.root, 'build', 'compile_commands.json'), 'w') as file:
+            json.dump([{"directory": os.path.join(self.root, 'build', 'src'),
+                        "command": "c++ -O2 -c ../../src/validation.cpp -o validation.cpp.o",
+                        "file": "../../src/validation.cpp"}], file)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_get_setup_command(self):
+        self.assertEqual(get_setup_command(jobs=4),
+                         'cmake -B build -DCMAKE_EXPORT_COMPILE_COMMANDS=ON && cmake --build build -j4')
+        self.assertTrue(get_setup_command(clean=True).startswith('rm -rf build && '))
+        self.assertIn('-DCMAKE_CXX_COMPILER_LAUNCHER=ccache', get_setup_command(ccache=True))
+
+    def test_find_compile_command(self):
+        command, directory = find_compile_command('src/validation.cpp', cwd=self.root)
+        self.assertEqual(command, 'c++ -O2 -c ../../src/validation.cpp -o validation.cpp.o')
+        self.assertEqual(directory, os.path.join(self.root, 'build', 'src'))
+        self.assertIsNone(find_compile_command('src/validation.h', cwd=self.root))
+
+    def test_find_compile_command_ninja(self):
+        # Ninja would compile an object built by hand again: it is built through Ninja
+        with open(os.path.join(self.root, 'build', 'build.ninja'), 'w'):
+            pass
+        command, directory = find_compile_command('src/validation.cpp', cwd=self.root)
+        self.assertEqual(command, 'cmake --build . --target src/validation.cpp.o')
+        self.assertEqual(directory, os.path.join(self.root, 'build'))
+
+    @unittest.skipUnless(shutil.which('cmake') and shutil.which('c++'), "cmake and a C++ compiler are needed")
+    def test_rebuild_compiles_once(self):
+        with open(os.path.join(self.root, 'CMakeLists.txt'), 'w') as file:
+            file.write("cmake_minimum_required(VERSION 3.16)\nproject(app CXX)\n"
+                       "add_executable(app src/main.cpp src/lib.cpp)\n")
+        os.makedirs(os.path.join(self.root, 'src'))
+        with open(os.path.join(self.root, 'src', 'main.cpp'), 'w') as file:
+            file.write("int f();\nint main() { return f(); }\n")
+        with open(os.path.join(self.root, 'src', 'lib.cpp'), 'w') as file:
+            file.write("int f() { return 0; }\n")
+        shutil.rmtree(os.path.join(self.root, 'build'))
+        self.assertTrue(run(f"{get_configure_command()} && cmake --build build", 120, cwd=self.root))
+
+        with open(os.path.join(self.root, 'src', 'lib.cpp'), 'w') as file:
+            file.write("int f() { return 1; }\n")
+        compile_command = find_compile_command('src/lib.cpp', cwd=self.root)
+        object_file = os.path.join(self.root, 'build', 'CMakeFiles', 'app.dir', 'src', 'lib.cpp.o')
+        compiled = []
+
+        def run_and_check(command, timeout, cwd=None):
+            success = run(command, timeout, cwd=cwd)
+            compiled.append(os.stat(object_file).st_mtime_ns)
+            return success
+
+        success, _, _ = rebuild(compile_command, "cmake --build build", run_and_check, 120, cwd=self.root)
+        self.assertTrue(success)
+        # The link step did not compile the object again
+        self.assertEqual(compiled[0], compiled[1])
+        self.assertFalse(run("./build/app", 10, cwd=self.root))
+
+    def test_get_link_command(self):
+        self.assertEqual(get_link_command('src/validation.cpp', jobs=2, cwd=self.root),
+                         'cmake --build build --target test_bitcoin -j2')
+        self.assertIsNone(get_link_command('test/functional/feature_addrman.py', cwd=self.root))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.cache import (
+    get_changed_lines,
+    get_mutant_key,
+    get_run_key,
+    get_cached_result,
+    get_cached_mutant_keys,
+    store_result,
+    store_kill,
+    get_kills
+)
+
+
+class TestCache(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.cache_path = os.path.join(self.folder, 'results.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_get_changed_lines(self):
+        self.assertEqual(get_changed_lines(['a', 'b', 'c'], ['a', 'x', 'c']), (1, ['b'], ['x']))
+        self.assertEqual(get_changed_lines(['a', 'b', 'c'], ['a', 'c']), (1, ['b'], []))
+
+    def test_get_mutant_key(self):
+        key = get_mutant_key('a\nb\nc\n', 'a\nx\nc\n')
+        self.assertEqual(key, get_mutant_key('a\nb\nc\n', 'a\nx\nc\n'))
+        self.assertNotEqual(key, get_mutant_key('a\nb\nc\n', 'a\ny\nc\n'))
+        self.assertNotEqual(key, get_mutant_key('a\nb\nd\n', 'a\nx\nd\n'))
+
+    def test_store_result(self):
+        mutant_key = get_mutant_key('a\nb\n', 'a\nx\n')
+        run_key = get_run_key(mutant_key, 'make check')
+        self.assertIsNone(get_cached_result(run_key, cache_path=self.cache_path))
+        store_result(run_key, mutant_key, 'killed', 1.5, cache_path=self.cache_path)
+        self.assertEqual(get_cached_result(run_key, cache_path=self.cache_path), ('killed', 1.5))
+        self.assertIsNone(get_cached_result(get_run_key(mutant_key, 'make test'), cache_path=self.cache_path))
+        self.assertEqual(get_cached_mutant_keys(cache_path=self.cache_path), {mutant_key})
+        survivor_key = get_mutant_key('a\nb\n', 'a\ny\n')
+        store_result(get_run_key(survivor_key, 'make check'), survivor_key, 'survived', 1.0,
+                     cache_path=self.cache_path)
+        self.assertEqual(get_cached_mutant_keys(cache_path=self.cache_path), {mutant_key, survivor_key})
+        self.assertEqual(get_cached_mutant_keys(statuses=('killed', 'timeout'), cache_path=self.cache_path),
+                         {mutant_key})
+
+    def test_store_kill(self):
+        self.assertEqual(get_kills('src/net.cpp', cache_path=self.cache_path), [])
+        store_kill('src/net.cpp', 10, 'net_tests', cache_path=self.cache_path)
+        store_kill('src/validation.cpp', 10, 'validation_tests', cache_path=self.cache_path)
+        self.assertEqual(get_kills('src/net.cpp', cache_path=self.cache_path), [(10, 'net_tests')])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,19 @@
 import os
+import shutil
+import tempfile
 import unittest
 import sys
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from src.cov import parse_coverage_file
+from src.cov import (
+    parse_coverage_file,
+    parse_coverage_index,
+    load_coverage,
+    get_covered_lines,
+    get_partial_branch_lines,
+    get_unexecuted_function_lines
+)
+from src.gen_mutations import get_mutations, BRANCH_OPERATORS
 
 
 class TestCoverage(unittest.TestCase):
@@ -18,6 +28,79 @@ class TestCoverage(unittest.TestCase):
         with self.assertRaises(FileNotFoundError):
             parse_coverage_file('total_coverage_fake.info')
 
+    def test_parse_coverage_index(self):
+        folder = tempfile.mkdtemp()
+        try:
+            coverage_path = os.path.join(folder, 'coverage.info')
+            with open(coverage_path, 'w') as file:
+                file.write("SF:/repo/src/net.cpp\nDA:3,1\nDA:1,2\nDA:2,0\nend_of_record\n"
+                           "SF:/other/src/validation.cpp\nDA:5,1,abcdef\nend_of_record\n"
+                           "SF:/repo/src/net.cpp\nDA:7,1\nend_of_record\n")
+            coverage = parse_coverage_index(coverage_path, root='/repo')
+            self.assertEqual(list(coverage['src/net.cpp']['lines']), [1, 3, 7])
+            self.assertEqual(get_covered_lines(coverage, 'src/net.cpp'), {1, 3, 7})
+            self.assertEqual(get_covered_lines(coverage, 'src/validation.cpp'), {5})
+            self.assertEqual(get_covered_lines(coverage, 'src/init.cpp'), set())
+
+            cache_folder = os.path.join(folder, 'cache')
+            self.assertEqual(load_coverage(coverage_path, root='/repo', cache_folder=cache_folder), coverage)
+            self.assertEqual(len(os.listdir(cache_folder)), 1)
+            # A new modification time with the same content reuses the cached index
+            os.utime(coverage_path, (0, 0))
+            self.assertEqual(load_coverage(coverage_path, root='/repo', cache_folder=cache_folder), coverage)
+            with open(coverage_path, 'a') as file:
+                file.write("SF:/repo/src/init.cpp\nDA:1,1\nend_of_record\n")
+            coverage = load_coverage(coverage_path, root='/repo', cache_folder=cache_folder)
+            self.assertEqual(get_covered_lines(coverage, 'src/init.cpp'), {1})
+        finally:
+            shutil.rmtree(folder)
+
+    def test_branches_and_functions(self):
+        folder = tempfile.mkdtemp()
+        try:
+            coverage_path = os.path.join(folder, 'coverage.info')
+            with open(coverage_path, 'w') as file:
+                file.write("SF:/repo/src/a.cpp\nFN:1,3,f(int, int)\nFN:5,g\nFN:9,h\n"
+                           "FNDA:2,f(int, int)\nFNDA:0,g\nFNDA:1,h\n"
+                           "DA:2,2\nDA:6,0\nDA:10,1\nDA:11,1\n"
+                           "BRDA:2,0,0,2\nBRDA:2,0,1,0\nBRDA:10,0,0,1\nBRDA:10,0,1,1\nBRDA:6,0,0,-\n"
+                           "end_of_record\n")
+            coverage = parse_coverage_index(coverage_path, root='/repo')
+            self.assertEqual(get_partial_branch_lines(coverage, 'src/a.cpp'), {2, 6})
+            self.assertEqual(get_unexecuted_function_lines(coverage, 'src/a.cpp'), {5, 6, 7, 8})
+
+            source_code = ["int f(int a, int b) {\n", "    if (a > b) return a - b;\n", "}\n", "\n",
+                           "int g() { return 0; }\n", "\n", "\n", "\n",
+                           "int h(int a) {\n", "    if (a > 1) return a - 1;\n", "    return 0;\n", "}\n"]
+            mutations = list(get_mutations(source_code, 'src/a.cpp', cov=coverage, branch_coverage=True))
+            # The condition of line 2 was always true: it is not mutated, the rest of the line is
+            operators = {operator for line, _, operator in mutations if line == 1}
+            self.assertTrue(operators)
+            self.assertFalse(operators & BRANCH_OPERATORS)
+            # Both branches of line 10 were taken
+            self.assertTrue({operator for line, _, operator in mutations if line == 9} & BRANCH_OPERATORS)
+        finally:
+            shutil.rmtree(folder)
+
+    def test_unexecuted_functions_overlapping(self):
+        folder = tempfile.mkdtemp()
+        try:
+            coverage_path = os.path.join(folder, 'coverage.info')
+            with open(coverage_path, 'w') as file:
+                # Two instantiations of a template with the same range, only one of them called
+                file.write("SF:/repo/src/a.cpp\nFN:10,20,_Z1fIiEvT_\nFN:10,20,_Z1fIlEvT_\nFN:30,32,g\n"
+                           "FNDA:5,_Z1fIiEvT_\nFNDA:0,_Z1fIlEvT_\nFNDA:0,g\n"
+                           "DA:11,5\nDA:31,0\nend_of_record\n"
+                           # lcov 1.x: no end lines, the uncalled lambda of line 42 runs to line 49
+                           "SF:/repo/src/b.cpp\nFN:40,f\nFN:42,_ZZ1fvENKUlvE_clEv\nFN:50,h\n"
+                           "FNDA:3,f\nFNDA:0,_ZZ1fvENKUlvE_clEv\nFNDA:0,h\n"
+                           "DA:41,3\nDA:42,3\nDA:43,0\nDA:45,3\nDA:46,3\nDA:50,0\nend_of_record\n")
+            coverage = parse_coverage_index(coverage_path, root='/repo')
+            self.assertEqual(get_unexecuted_function_lines(coverage, 'src/a.cpp'), {30, 31, 32})
+            self.assertEqual(get_unexecuted_function_lines(coverage, 'src/b.cpp'), {43, 44, 47, 48, 49, 50})
+        finally:
+            shutil.rmtree(folder)
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
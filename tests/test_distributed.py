@@ -0,0 +1,134 @@
+import os
+import json
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import distributed
+from src.distributed import Coordinator, make_server, work, restore_builds, restore_work_file, WORK_FOLDER
+from src.mutants import write_index
+from src.journal import read_journal, backup_original, BACKUP_FILE
+from src.report import read_results
+
+ORIGINAL = "int f(int a, int b) {\n    if (a > b) return a;\n    return b - a;\n}\n"
+
+
+class TestDistributed(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.root = tempfile.mkdtemp()
+        os.chdir(self.root)
+        os.makedirs('src')
+        with open('src/a.cpp', 'w') as file:
+            file.write(ORIGINAL)
+        subprocess.run('git init -q && git add -A && git -c user.name=a -c user.email=a@a commit -qm init',
+                       shell=True, check=True)
+        os.makedirs('muts-a-cpp')
+        with open('muts-a-cpp/original_file.txt', 'w') as file:
+            file.write('src/a.cpp')
+        lines = ORIGINAL.splitlines(keepends=True)
+        write_index('muts-a-cpp', 'src/a.cpp', [
+            {"name": "a.mutant.0.cpp", "line": 2, "operator": "regex.14",
+             "original": lines[1], "mutated": "    if (a < b) return a;\n"},
+            {"name": "a.mutant.1.cpp", "line": 3, "operator": "regex.28",
+             "original": lines[2], "mutated": "    return b + a;\n"},
+            {"name": "a.mutant.2.cpp", "line": 3, "operator": "regex.29",
+             "original": lines[2], "mutated": "    return b * a;\n"},
+        ])
+        self.checkouts = []
+        for i in range(2):
+            checkout = os.path.join(self.root, f'checkout-{i}')
+            os.makedirs(os.path.join(checkout, 'src'))
+            shutil.copy('src/a.cpp', os.path.join(checkout, 'src', 'a.cpp'))
+            self.checkouts.append(checkout)
+        self.poll_interval = distributed.POLL_INTERVAL
+        distributed.POLL_INTERVAL = 0.1
+
+    def tearDown(self):
+        distributed.POLL_INTERVAL = self.poll_interval
+        os.chdir(self.cwd)
+        shutil.rmtree(self.root)
+
+    def test_restore_builds(self):
+        commands = []
+
+        def run(command, timeout, cwd=None):
+            commands.append(command)
+            return True
+
+        build_steps = {"src/a.h": (None, "cmake --build build --target test_bitcoin bitcoind"),
+                       "src/b.cpp": (("c++ -c ../src/b.cpp", "build"), "cmake --build build --target test_bitcoin"),
+                       "test/functional/feature_a.py": (None, None)}
+        restore_builds({"src/a.h", "src/b.cpp", "test/functional/feature_a.py"}, build_steps, run)
+        # The objects including the header and the binaries are rebuilt, not only the object
+        self.assertEqual(commands, ["cmake --build build --target test_bitcoin bitcoind", "c++ -c ../src/b.cpp",
+                                    "cmake --build build --target test_bitcoin"])
+
+    def test_restore_work_file(self):
+        checkout = self.checkouts[0]
+        self.assertIsNone(restore_work_file(checkout))
+        # A worker was killed with a mutant applied
+        work_folder = os.path.join(checkout, WORK_FOLDER)
+        os.makedirs(work_folder)
+        with open(os.path.join(work_folder, 'original_file.txt'), 'w') as file:
+            file.write('src/a.cpp')
+        backup_original(work_folder, ORIGINAL)
+        with open(os.path.join(checkout, 'src', 'a.cpp'), 'w') as file:
+            file.write(ORIGINAL.replace('b - a', 'b + a'))
+        self.assertEqual(restore_work_file(checkout), 'src/a.cpp')
+        with open(os.path.join(checkout, 'src', 'a.cpp')) as file:
+            self.assertEqual(file.read(), ORIGINAL)
+        self.assertIsNone(restore_work_file(checkout))
+
+    def test_lease_timeout(self):
+        coordinator = Coordinator(['muts-a-cpp'], lease_timeout=-1)
+        first = coordinator.lease('worker-0')
+        # The lease of worker-0 expired, the mutant is given to worker-1
+        self.assertEqual(coordinator.lease('worker-1')["id"], first["id"])
+        coordinator.complete(first["id"], 'worker-0', 'killed')
+        self.assertNotEqual(coordinator.lease('worker-1')["id"], first["id"])
+
+    def test_workers(self):
+        coordinator = Coordinator(['muts-a-cpp'])
+        server = make_server(coordinator, port=0)
+        address = f"127.0.0.1:{server.server_address[1]}"
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            # Only the mutants of the last line are killed
+            workers = [threading.Thread(target=work, args=(address,),
+                                        kwargs={"command": "grep -q 'b - a' src/a.cpp", "root": checkout,
+                                                "worker": f"worker-{i}"})
+                       for i, checkout in enumerate(self.checkouts)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join(timeout=60)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        self.assertTrue(coordinator.finished.is_set())
+        self.assertEqual(read_journal('muts-a-cpp'), {"a.mutant.0.cpp": "survived", "a.mutant.1.cpp": "killed",
+                                                      "a.mutant.2.cpp": "killed"})
+        for checkout in self.checkouts:
+            with open(os.path.join(checkout, 'src', 'a.cpp')) as file:
+                self.assertEqual(file.read(), ORIGINAL)
+            self.assertFalse(os.path.exists(os.path.join(checkout, WORK_FOLDER, BACKUP_FILE)))
+        coordinator.report()
+        records = list(read_results())
+        self.assertEqual(sorted((record['mutant'], record['status']) for record in records if 'mutant' in record),
+                         [("a.mutant.0.cpp", "survived"), ("a.mutant.1.cpp", "killed"),
+                          ("a.mutant.2.cpp", "killed")])
+        self.assertTrue(all(record['duration'] is not None for record in records if 'mutant' in record))
+        # Workflows reading diff_not_killed.json after an analysis still find the survivors
+        with open('diff_not_killed.json') as file:
+            self.assertEqual([report['filename'] for report in json.load(file)], ['src/a.cpp'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.filters import get_check_arguments, check_syntax, find_stillborn_mutants, find_equivalent_mutants
+
+
+class TestFilters(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.root, 'src'))
+        with open(os.path.join(self.root, 'src', 'util.h'), 'w') as file:
+            file.write("int Double(int x);\n")
+        self.entry = {"directory": os.path.join(self.root, 'build'),
+                      "arguments": ["c++", "-O2", "-MD", "-MT", "util.o", "-MF", "util.o.d",
+                                    "-o", "util.o", "-c", "../src/util.cpp"],
+                      "file": "../src/util.cpp"}
+        os.makedirs(self.entry["directory"])
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_get_check_arguments(self):
+        source_dir = os.path.join(self.root, 'src')
+        self.assertEqual(get_check_arguments(self.entry, "/tmp/util.cpp"),
+                         ["c++", "-O2", "-iquote", source_dir, "-fsyntax-only", "/tmp/util.cpp"])
+        self.assertEqual(get_check_arguments(self.entry, "/tmp/m/util.cpp", "/tmp/m/util.o"),
+                         ["c++", "-O2", "-iquote", source_dir, "-g0", f"-ffile-prefix-map=/tmp/m={source_dir}",
+                          "-c", "/tmp/m/util.cpp", "-o", "/tmp/m/util.o"])
+
+    def test_check_syntax_python(self):
+        self.assertTrue(check_syntax("assert x == 1\n", "test/functional/feature_x.py"))
+        self.assertFalse(check_syntax("assert x ==\n", "test/functional/feature_x.py"))
+
+    @unittest.skipIf(shutil.which("c++") is None, "no C++ compiler")
+    def test_find_stillborn_mutants(self):
+        mutants = {"util.mutant.0.cpp": '#include "util.h"\nint Double(int x) { return x + x; }\n',
+                   "util.mutant.1.cpp": '#include "util.h"\nint Double(int x) { return x + ; }\n'}
+        stillborn = find_stillborn_mutants(list(mutants), mutants.get, "src/util.cpp", self.entry, jobs=2)
+        self.assertEqual(stillborn, ["util.mutant.1.cpp"])
+
+    @unittest.skipIf(shutil.which("c++") is None, "no C++ compiler")
+    def test_find_equivalent_mutants(self):
+        original = '#include "util.h"\nint Double(int x) { return x * 2; }\n'
+        mutants = {"util.mutant.0.cpp": '#include "util.h"\nint Double(int x) { return x + x; }\n',
+                   "util.mutant.1.cpp": '#include "util.h"\nint Double(int x) { return x * 3; }\n',
+                   "util.mutant.2.cpp": '#include "util.h"\nint Double(int x) { return x * 3 ; }\n',
+                   "util.mutant.3.cpp": '#include "util.h"\nint Double(int x) { return x * ; }\n'}
+        stillborn, equivalent = find_equivalent_mutants(list(mutants), mutants.get, "src/util.cpp",
+                                                        original, self.entry, jobs=2)
+        self.assertEqual(stillborn, ["util.mutant.3.cpp"])
+        self.assertEqual(equivalent, {"util.mutant.0.cpp": "original", "util.mutant.2.cpp": "util.mutant.1.cpp"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import functional
+from src.functional import is_functional_test, make_functional_runner
+
+
+class TestFunctional(unittest.TestCase):
+    def test_is_functional_test(self):
+        self.assertTrue(is_functional_test('test/functional/p2p_compactblocks.py'))
+        self.assertFalse(is_functional_test('test/functional/test_framework/util.py'))
+        self.assertFalse(is_functional_test('src/test/util_tests.cpp'))
+
+    @mock.patch.object(functional, 'has_capacity', return_value=True)
+    def test_make_functional_runner(self, has_capacity):
+        barrier = threading.Barrier(3, timeout=10)
+        runs = []
+
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        os.makedirs(os.path.join(root, 'test', 'functional', 'data'))
+
+        def run_test(command, timeout, cwd=None, env=None):
+            script_path = command.split()[1]
+            with open(script_path) as file:
+                runs.append((file.read(), command, os.path.dirname(script_path)))
+            # The 3 mutants run at the same time
+            barrier.wait()
+            return True
+
+        run_mutant = make_functional_runner('test/functional/feature_x.py', lambda name: f"# {name}\n", run_test,
+                                            3, lambda: 10)
+        threads = [threading.Thread(target=run_mutant, args=(root, f"feature_x.mutant.{i}.py")) for i in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(content for content, _, _ in runs),
+                         [f"# feature_x.mutant.{i}.py\n" for i in range(3)])
+        commands = [command for _, command, _ in runs]
+        self.assertEqual(sorted(command.split('--portseed=')[1].split()[0] for command in commands), ['0', '1', '2'])
+        self.assertEqual(len({command.split('--tmpdir=')[1].split()[0] for command in commands}), 3)
+        # Next to the test, so the files relative to it (e.g. data/) are found
+        self.assertEqual({folder for _, _, folder in runs}, {os.path.join(root, 'test', 'functional')})
+        self.assertEqual(len({command.split()[1] for command in commands}), 3)
+        # The copies are removed
+        self.assertEqual(os.listdir(os.path.join(root, 'test', 'functional')), ['data'])
+
+
+if __name__ == '__main__':
+    unittest.main()
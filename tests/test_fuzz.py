@@ -0,0 +1,72 @@
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.fuzz import list_fuzz_targets, get_reaching_targets, list_corpus, replay_corpus, record_fuzz_time
+
+FAKE_FUZZ = """#!/bin/sh
+[ "$FUZZ" = "target" ] || exit 2
+if grep -lq crash "$@"; then exit 1; fi
+if grep -lq hang "$@"; then sleep 30; fi
+exit 0
+"""
+
+
+class TestFuzz(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.root, 'src/test/fuzz'))
+        with open(os.path.join(self.root, 'src/test/fuzz/coins.cpp'), 'w') as file:
+            file.write('#include <wallet/coinselection.h>\n#include <test/fuzz/fuzz.h>\n\n'
+                       'FUZZ_TARGET(coinselection)\n{\n}\n\nFUZZ_TARGET(coin_grinder, .init = setup)\n{\n}\n')
+        with open(os.path.join(self.root, 'src/test/fuzz/addrman.cpp'), 'w') as file:
+            file.write('#include <addrman.h>\n\nFUZZ_TARGET(addrman)\n{\n}\n')
+        self.binary = os.path.join(self.root, 'fuzz')
+        with open(self.binary, 'w') as file:
+            file.write(FAKE_FUZZ)
+        os.chmod(self.binary, 0o755)
+        self.corpus = os.path.join(self.root, 'corpus')
+        os.makedirs(os.path.join(self.corpus, 'target'))
+        for i in range(50):
+            with open(os.path.join(self.corpus, 'target', f'input{i}'), 'w') as file:
+                file.write(str(i))
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_get_reaching_targets(self):
+        targets = list_fuzz_targets(self.root)
+        self.assertEqual(sorted(targets), ['addrman', 'coin_grinder', 'coinselection'])
+        self.assertEqual(get_reaching_targets('src/wallet/coinselection.cpp', targets), ['coin_grinder', 'coinselection'])
+        self.assertEqual(get_reaching_targets('src/test/fuzz/addrman.cpp', targets), ['addrman'])
+        self.assertEqual(get_reaching_targets('src/validation.cpp', targets), [])
+
+    def test_replay_corpus(self):
+        inputs = list_corpus(self.corpus, 'target')
+        self.assertEqual(len(inputs), 50)
+        self.assertTrue(all(os.path.isabs(path) for path in inputs))
+        self.assertEqual(list_corpus(self.corpus, 'other'), [])
+        self.assertEqual(replay_corpus(self.binary, 'target', inputs, jobs=4), "passed")
+        with open(os.path.join(self.corpus, 'target', 'input7'), 'w') as file:
+            file.write('crash')
+        self.assertEqual(replay_corpus(self.binary, 'target', inputs, jobs=4), "failed")
+        with open(os.path.join(self.corpus, 'target', 'input7'), 'w') as file:
+            file.write('hang')
+        start = time.time()
+        self.assertEqual(replay_corpus(self.binary, 'target', inputs, jobs=4, timeout=0.5), "timeout")
+        self.assertLess(time.time() - start, 10)
+
+    def test_record_fuzz_time(self):
+        fuzz_times = {}
+        record_fuzz_time(fuzz_times, 'target', 50, 1.5)
+        record_fuzz_time(fuzz_times, 'target', 50, 0.5)
+        self.assertEqual(fuzz_times, {'target': {'inputs': 50, 'runs': 2, 'seconds': 2.0, 'max_seconds': 1.5}})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.get_changes import get_diff_range, parse_diff, get_touched_lines
+
+DIFF = """diff --git a/src/net.cpp b/src/net.cpp
+index 1111111..2222222 100644
+--- a/src/net.cpp
++++ b/src/net.cpp
+@@ -10 +10 @@ void Connect()
+-    int a = 1;
++    int a = 2;
+@@ -20,0 +21,2 @@ void Connect()
+++++ b;
+++ c;
+@@ -30,2 +31,0 @@ void Connect()
+-    x();
+-    y();
+diff --git a/src/old.cpp b/src/new.cpp
+similarity index 90%
+rename from src/old.cpp
+rename to src/new.cpp
+--- a/src/old.cpp
++++ b/src/new.cpp
+@@ -5 +5 @@
+-    return 0;
++    return 1;
+diff --git a/src/removed.cpp b/src/removed.cpp
+deleted file mode 100644
+--- a/src/removed.cpp
++++ /dev/null
+@@ -1,2 +0,0 @@
+-int a;
+-int b;
+"""
+
+
+class TestGetChanges(unittest.TestCase):
+    def test_get_diff_range(self):
+        self.assertEqual(get_diff_range(), 'upstream/master...HEAD')
+        self.assertEqual(get_diff_range('origin/main'), 'origin/main...HEAD')
+        self.assertEqual(get_diff_range('HEAD~3..HEAD'), 'HEAD~3..HEAD')
+
+    def test_parse_diff(self):
+        self.assertEqual(parse_diff(DIFF.splitlines(keepends=True)),
+                         {'src/net.cpp': [10, 21, 22, 31, 32], 'src/new.cpp': [5]})
+
+    def test_get_touched_lines(self):
+        cwd = os.getcwd()
+        root = tempfile.mkdtemp()
+        try:
+            os.chdir(root)
+            git = 'git -c user.name=a -c user.email=a@a'
+            with open('a.cpp', 'w') as file:
+                file.write(''.join(f'int a{i};\n' for i in range(10)))
+            subprocess.run(f'git init -q && git add -A && {git} commit -qm init', shell=True, check=True)
+            with open('a.cpp', 'w') as file:
+                file.write(''.join(f'int a{i};\n' for i in range(10) if i != 5).replace('a2;', 'b2;'))
+            subprocess.run(f'git mv a.cpp b.cpp && {git} commit -qam change', shell=True, check=True)
+            self.assertEqual(get_touched_lines('HEAD~1..HEAD'), {'b.cpp': [3, 5, 6]})
+            with self.assertRaisesRegex(Exception, "upstream/master"):
+                get_touched_lines('upstream/master')
+        finally:
+            os.chdir(cwd)
+            shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    unittest.main()
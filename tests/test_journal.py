@@ -0,0 +1,56 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.journal import (
+    read_journal,
+    reset_journal,
+    append_result,
+    backup_original,
+    restore_original,
+    remove_backup,
+    JOURNAL_FILE
+)
+
+
+class TestJournal(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_read_journal(self):
+        append_result(self.folder, 'foo.mutant.0.cpp', 'killed')
+        append_result(self.folder, 'foo.mutant.1.cpp', 'survived')
+        # Simulate a process killed while writing the last entry
+        with open(os.path.join(self.folder, JOURNAL_FILE), 'a') as file:
+            file.write('{"mutant": "foo.mu')
+        self.assertEqual(read_journal(self.folder),
+                         {'foo.mutant.0.cpp': 'killed', 'foo.mutant.1.cpp': 'survived'})
+        # The next entry is not lost with the incomplete one
+        append_result(self.folder, 'foo.mutant.2.cpp', 'timeout')
+        self.assertEqual(read_journal(self.folder), {'foo.mutant.0.cpp': 'killed', 'foo.mutant.1.cpp': 'survived',
+                                                     'foo.mutant.2.cpp': 'timeout'})
+        reset_journal(self.folder)
+        self.assertEqual(read_journal(self.folder), {})
+
+    def test_restore_original(self):
+        target = os.path.join(self.folder, 'foo.cpp')
+        self.assertFalse(restore_original(self.folder, target))
+        backup_original(self.folder, 'original\n')
+        with open(target, 'w') as file:
+            file.write('mutated\n')
+        self.assertTrue(restore_original(self.folder, target))
+        with open(target, 'r') as file:
+            self.assertEqual(file.read(), 'original\n')
+        remove_backup(self.folder)
+        self.assertFalse(restore_original(self.folder, target))
+
+
+if __name__ == '__main__':
+    unittest.main()
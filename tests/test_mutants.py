@@ -0,0 +1,44 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.mutants import (
+    write_index,
+    read_index,
+    check_mutants,
+    apply_mutant,
+    get_mutant_diff
+)
+
+
+class TestMutants(unittest.TestCase):
+    original = "int f() {\n    return a > b;\n}\n"
+    mutant = {"name": "foo.mutant.0.cpp", "line": 2, "operator": "regex.14",
+              "original": "    return a > b;\n", "mutated": "    return a < b;\n"}
+
+    def test_index(self):
+        folder = tempfile.mkdtemp()
+        try:
+            self.assertEqual(read_index(folder), {})
+            write_index(folder, 'src/foo.cpp', [self.mutant])
+            self.assertEqual(read_index(folder), {"foo.mutant.0.cpp": self.mutant})
+        finally:
+            shutil.rmtree(folder)
+
+    def test_apply_mutant(self):
+        self.assertEqual(apply_mutant(self.original, self.mutant), "int f() {\n    return a < b;\n}\n")
+        self.assertTrue(check_mutants(self.original, [self.mutant]))
+        self.assertFalse(check_mutants(self.original.replace("a > b", "a > c"), [self.mutant]))
+
+    def test_get_mutant_diff(self):
+        diff = get_mutant_diff('src/foo.cpp', self.original, 'foo.mutant.0.cpp', self.mutant)
+        self.assertIn("@@ -1,3 +1,3 @@", diff)
+        self.assertIn("-    return a > b;\n+    return a < b;\n", diff)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import src.mutation_core as mutation_core
+
+
+class TestMutationCore(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        for path in ['src/init.cpp', 'src/wallet/init.cpp', 'src/wallet/init.h', 'src/bench/bench.cpp',
+                     'src/util/strencodings.cpp', 'src/CMakeLists.txt', 'src/README.md']:
+            os.makedirs(os.path.join(self.root, os.path.dirname(path)), exist_ok=True)
+            with open(os.path.join(self.root, path), 'w'):
+                pass
+        self.base_path = mutation_core.BASE_PATH
+        mutation_core.BASE_PATH = self.root
+
+    def tearDown(self):
+        mutation_core.BASE_PATH = self.base_path
+        shutil.rmtree(self.root)
+
+    def test_get_files_to_mutate(self):
+        self.assertEqual(mutation_core.get_files_to_mutate([os.path.join(self.root, 'src')]),
+                         ['src/init.cpp', 'src/wallet/init.cpp', 'src/wallet/init.h'])
+        self.assertEqual(mutation_core.get_files_to_mutate([os.path.join(self.root, 'src/**/*.h')]),
+                         ['src/wallet/init.h'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.operators import (
+    COMPILED_OPERATORS,
+    get_required_literal,
+    compile_words,
+    match_operators
+)
+
+
+class TestOperators(unittest.TestCase):
+    def test_get_required_literal(self):
+        self.assertEqual(get_required_literal(r"std::min"), "std::min")
+        self.assertEqual(get_required_literal(r"NodeClock::now\(\)"), "NodeClock::now()")
+        self.assertEqual(get_required_literal(r".*\berase\(.+"), "erase(")
+        self.assertEqual(get_required_literal(r"CAmount\s+(\w+)\s*=\s*([0-9]+)"), "CAmount")
+        self.assertEqual(get_required_literal(r"ab?c"), "a")
+        self.assertIsNone(get_required_literal(r"^(.*while\s*\(.*\)\s*\{.*)$"))
+        self.assertIsNone(get_required_literal(r"foo|bar"))
+
+    def test_operator_ids(self):
+        ids = [operator.id for operators in COMPILED_OPERATORS.values() for operator in operators]
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertEqual(COMPILED_OPERATORS["regex"][14].id, "regex.14")
+        self.assertEqual(COMPILED_OPERATORS["regex"][14].pattern, " > ")
+
+    def test_match_operators(self):
+        line = "    if (nTotal > nTargetValue) return std::min(a, b);\n"
+        matched = [operator.id for operator in match_operators(COMPILED_OPERATORS["regex"], line)]
+        expected = [operator.id for operator in COMPILED_OPERATORS["regex"] if operator.regex.search(line)]
+        self.assertEqual(matched, expected)
+        self.assertIn("regex.7", matched)
+
+    def test_compile_words(self):
+        regex = compile_words(["LogPrintf", "RPCArg::Type::"])
+        self.assertTrue(regex.search('    LogPrintf("%s", x);'))
+        self.assertFalse(regex.search('    return RPCArg::Optional;'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import profiling
+from src.profiling import phase, count, start_profiling, stop_profiling, get_trace, get_metrics, write_profile
+from src.gen_mutations import get_mutations
+
+
+class TestProfiling(unittest.TestCase):
+    def tearDown(self):
+        stop_profiling()
+
+    def test_disabled(self):
+        with phase("build", mutant="a") as args:
+            args["status"] = "killed"
+        count("mutants", status="killed")
+        self.assertIsNone(profiling.PROFILE)
+        self.assertIsNone(stop_profiling())
+
+    def test_phases_and_counts(self):
+        start_profiling()
+        with phase("mutant", mutant="a.mutant.0.cpp") as args:
+            with phase("build", mutant="a.mutant.0.cpp"):
+                pass
+            args["status"] = "killed"
+        count("mutants", status="killed")
+        count("mutants", 2, status="killed")
+        count("mutants_generated", 3)
+        profile = stop_profiling()
+
+        # Inner phases end first
+        self.assertEqual([recorded["name"] for recorded in profile["phases"]], ["build", "mutant"])
+        self.assertEqual(profile["phases"][1]["args"], {"mutant": "a.mutant.0.cpp", "status": "killed"})
+        self.assertGreater(profile["phases"][1]["memory"], 0)
+
+        trace = get_trace(profile)
+        events = [event for event in trace["traceEvents"] if event["ph"] == "X"]
+        self.assertEqual([event["name"] for event in events], ["mutant", "build"])
+        self.assertLessEqual(events[0]["ts"], events[1]["ts"])
+        self.assertEqual(trace["otherData"]["counts"], {"mutants,status=killed": 3, "mutants_generated": 3})
+        json.dumps(trace)
+
+        metrics = get_metrics(profile, "analyze").splitlines()
+        self.assertIn('mutation_core_phase_runs{subcommand="analyze",phase="build"} 1', metrics)
+        self.assertIn('mutation_core_mutants{subcommand="analyze",status="killed"} 3', metrics)
+        self.assertIn('mutation_core_mutants_generated{subcommand="analyze"} 3', metrics)
+        self.assertIn("# TYPE mutation_core_mutants gauge", metrics)
+
+    def test_peak_memory(self):
+        memory, _ = profiling.get_peak_memory()
+        # Between 1MB and 100GB: not off by a factor 1024
+        self.assertTrue(1 << 20 < memory < 100 << 30)
+
+    def test_write_profile(self):
+        folder = tempfile.mkdtemp()
+        try:
+            start_profiling()
+            with phase("generation", file='src/"a".cpp'):
+                pass
+            profile = stop_profiling()
+            trace_path = os.path.join(folder, "trace.json")
+            metrics_path = os.path.join(folder, "metrics.prom")
+            write_profile(profile, trace_path, metrics_path)
+            with open(trace_path) as file:
+                self.assertEqual(json.load(file)["traceEvents"][1]["args"], {"file": 'src/"a".cpp'})
+            with open(metrics_path) as file:
+                self.assertIn('mutation_core_phase_runs{phase="generation"} 1\n', file.read())
+            self.assertEqual(sorted(os.listdir(folder)), ["metrics.prom", "trace.json"])
+        finally:
+            shutil.rmtree(folder)
+
+    def test_skipped_lines(self):
+        source_code = ["int f() {\n", "    // a > b\n", "    return a > b;\n", "    return a < b;\n", "}\n"]
+        skipped = Counter()
+        mutants = list(get_mutations(source_code, "src/a.cpp", range_lines=(0, 2), skipped=skipped))
+        self.assertTrue(mutants)
+        self.assertEqual(skipped, {"do_not_mutate": 1, "range": 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
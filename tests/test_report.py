@@ -0,0 +1,85 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import report
+from src.report import (
+    generate_report,
+    make_result,
+    make_start,
+    append_results,
+    read_results,
+    aggregate_results,
+    write_legacy_report
+)
+
+
+class TestReport(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.root = tempfile.mkdtemp()
+        os.chdir(self.root)
+        os.makedirs('src')
+        os.makedirs('muts-a-cpp')
+        lines = [f'int a{i} = {i};\n' for i in range(10)]
+        with open('src/a.cpp', 'w') as file:
+            file.writelines(lines)
+        for i in range(3):
+            mutated = lines.copy()
+            mutated[5 + i] = f'int a{5 + i} = 0;\n'
+            with open(f'muts-a-cpp/a.mutant.{i}.cpp', 'w') as file:
+                file.writelines(mutated)
+        subprocess.run('git init -q && git add src && git -c user.name=a -c user.email=a@a commit -qm init',
+                       shell=True, check=True)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.root)
+        report.GIT_HASHES.clear()
+
+    def test_generate_report(self):
+        diffs = generate_report(['a.mutant.0.cpp', 'a.mutant.2.cpp'], 'muts-a-cpp', 'src/a.cpp', 0.33)
+        self.assertEqual(len(diffs), 2)
+        self.assertEqual(generate_report([], 'muts-a-cpp', 'src/a.cpp', 1), [])
+
+    def test_results(self):
+        diffs = generate_report(['a.mutant.0.cpp', 'a.mutant.1.cpp', 'a.mutant.2.cpp'], 'muts-a-cpp', 'src/a.cpp')
+        append_results([make_result('muts-a-cpp', 'src/a.cpp', 'a.mutant.9.cpp', 'survived', diff=diffs[0])])
+        # A new analysis of the folder discards the previous results
+        append_results([make_start('muts-a-cpp', 'src/a.cpp')])
+        append_results([make_result('muts-a-cpp', 'src/a.cpp', f'a.mutant.{i}.cpp', 'survived',
+                                    operator='regex.1', line=6 + i, duration=0.5, command='true', diff=diffs[i])
+                        for i in range(3)])
+        append_results([make_result('muts-a-cpp', 'src/a.cpp', 'a.mutant.1.cpp', 'timeout', line=7),
+                        make_result('muts-a-cpp', 'src/a.cpp', 'a.mutant.3.cpp', 'stillborn')])
+        # Interrupted while writing a record
+        with open(report.RESULTS_FILE, 'a') as file:
+            file.write('{"folder": "muts-a-cpp", "mut')
+
+        self.assertEqual(len(list(read_results())), 7)
+        summary = aggregate_results(read_results())['src/a.cpp']
+        self.assertEqual((summary['killed'], summary['timeout'], summary['survived'], summary['total']), (0, 1, 2, 3))
+        self.assertAlmostEqual(summary['score'], 1 / 3)
+
+        with mock.patch.object(report, 'fetch_git_hash', wraps=report.fetch_git_hash) as fetch_git_hash:
+            write_legacy_report(read_results())
+            write_legacy_report(read_results())
+        self.assertEqual(fetch_git_hash.call_count, 1)
+        with open('diff_not_killed.json') as file:
+            reports = json.load(file)
+        self.assertEqual(len(reports), 1)
+        self.assertEqual(sorted(reports[0]['diffs']), ['6', '8'])
+        entry = reports[0]['diffs']['6'][0]
+        self.assertTrue(entry['commit'])
+        self.assertEqual(entry['diff'], '@@ -3,7 +3,7 @@\n int a2 = 2;\n int a3 = 3;\n int a4 = 4;\n'
+                                        '-int a5 = 5;\n+int a5 = 0;\n int a6 = 6;\n int a7 = 7;\n int a8 = 8;\n')
+
+if __name__ == '__main__':
+    unittest.main()
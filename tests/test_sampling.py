@@ -0,0 +1,42 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.sampling import get_stratum, stratified_order, estimate_score, is_precise
+
+
+class TestSampling(unittest.TestCase):
+    def setUp(self):
+        # 3/4 of the mutants are in the first stratum, 1/4 in the second
+        self.strata = {f"m{i}": get_stratum("regex.1" if i < 300 else "regex.2", i % 100) for i in range(400)}
+
+    def test_stratified_order(self):
+        order = stratified_order(self.strata, seed=1)
+        self.assertEqual(sorted(order), sorted(self.strata))
+        self.assertEqual(order, stratified_order(self.strata, seed=1))
+        # Every prefix is a proportional sample
+        for n in (20, 100, 200):
+            first = sum(1 for name in order[:n] if self.strata[name][0] == "regex.1")
+            self.assertLessEqual(abs(first - n * 3 / 4), 1)
+
+    def test_estimate_score(self):
+        self.assertIsNone(estimate_score(self.strata, {}))
+        # Mutants of the first stratum are all killed, the ones of the second survive
+        killed = {name: stratum[0] == "regex.1" for name, stratum in self.strata.items()}
+        score, lower, upper = estimate_score(self.strata, killed)
+        self.assertAlmostEqual(score, 0.75)
+        self.assertAlmostEqual(lower, upper)
+
+        order = stratified_order(self.strata, seed=2)
+        small = estimate_score(self.strata, {name: killed[name] for name in order[:40]})
+        large = estimate_score(self.strata, {name: killed[name] for name in order[:200]})
+        self.assertTrue(small[1] <= 0.75 <= small[2])
+        self.assertLess(large[2] - large[1], small[2] - small[1])
+        self.assertFalse(is_precise(small, 10, 1))
+        self.assertTrue(is_precise(large, 200, 0.2))
+
+
+if __name__ == '__main__':
+    unittest.main()
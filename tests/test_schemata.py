@@ -0,0 +1,35 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.schemata import can_guard, guard_line
+
+
+class TestSchemata(unittest.TestCase):
+    source_code = ["int f(int a, int b) {\n",
+                   "    int r = a + b;\n",
+                   "    r = a + b;\n",
+                   "    if (a > b) {\n",
+                   "    return r > 0 ? r : -r;\n",
+                   "    Foo(a,\n",
+                   "        b + 1);\n",
+                   "}\n"]
+
+    def test_can_guard(self):
+        self.assertFalse(can_guard('src/foo.cpp', self.source_code, 1))
+        self.assertTrue(can_guard('src/foo.cpp', self.source_code, 2))
+        self.assertFalse(can_guard('src/foo.cpp', self.source_code, 3))
+        self.assertTrue(can_guard('src/foo.cpp', self.source_code, 4))
+        self.assertFalse(can_guard('src/foo.cpp', self.source_code, 6))
+        self.assertFalse(can_guard('src/foo.h', self.source_code, 2))
+
+    def test_guard_line(self):
+        self.assertEqual(guard_line("    r = a + b;\n", [(3, "    r = a - b;\n"), (4, "    r = a * b;\n")]),
+                         "    if (mutation_core_mutant_id() == 3) { r = a - b; } else "
+                         "if (mutation_core_mutant_id() == 4) { r = a * b; } else { r = a + b; }\n")
+
+
+if __name__ == '__main__':
+    unittest.main()
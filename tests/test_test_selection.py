@@ -0,0 +1,85 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.test_selection import (
+    build_test_index,
+    get_tests_for_line,
+    get_command_for_tests,
+    get_mutated_line,
+    parse_list_content,
+    list_functional_tests,
+    order_tests
+)
+
+
+class TestTestSelection(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        coverage = {
+            'coinselector_tests.info': 'SF:/home/user/bitcoin/src/validation.cpp\nDA:10,1\nDA:11,0\nend_of_record\n',
+            'feature_addrman.py.info': 'SF:/home/user/bitcoin/src/validation.cpp\nDA:10,3\nDA:12,1\nend_of_record\n',
+        }
+        for filename, content in coverage.items():
+            with open(os.path.join(self.folder, filename), 'w') as file:
+                file.write(content)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_get_tests_for_line(self):
+        index = build_test_index(self.folder)
+        self.assertEqual(get_tests_for_line(index, 'src/validation.cpp', 10),
+                         ['coinselector_tests', 'feature_addrman.py'])
+        self.assertEqual(get_tests_for_line(index, 'src/validation.cpp', 12), ['feature_addrman.py'])
+        self.assertEqual(get_tests_for_line(index, 'src/validation.cpp', 11), [])
+        self.assertEqual(get_tests_for_line(index, 'src/net.cpp', 10), [])
+
+    def test_get_tests_for_line_other_file(self):
+        with open(os.path.join(self.folder, 'net_tests.info'), 'w') as file:
+            file.write('SF:/repo/x/mysrc/init.cpp\nDA:5,1\nend_of_record\n'
+                       'SF:/repo/src/net.cpp\nDA:5,1\nend_of_record\n')
+        index = build_test_index(self.folder, root='/repo')
+        self.assertIn('src/net.cpp', index)
+        self.assertEqual(get_tests_for_line(index, 'src/net.cpp', 5), ['net_tests'])
+        # Only whole path components match
+        self.assertEqual(get_tests_for_line(index, 'src/init.cpp', 5), [])
+        self.assertEqual(get_tests_for_line(index, 'mysrc/init.cpp', 5), ['net_tests'])
+
+    def test_get_command_for_tests(self):
+        self.assertEqual(get_command_for_tests(['coinselector_tests', 'txvalidation_tests', 'feature_addrman.py']),
+                         './build/src/test/test_bitcoin --run_test=coinselector_tests:txvalidation_tests && '
+                         'CI_FAILFAST_TEST_LEAVE_DANGLING=1 ./build/test/functional/test_runner.py -F feature_addrman.py')
+
+    def test_get_mutated_line(self):
+        self.assertEqual(get_mutated_line('a\nb\nc\n', 'a\nx\nc\n'), 2)
+        self.assertEqual(get_mutated_line('a\nb\nc\n', 'a\nb\nc\n'), None)
+
+    def test_parse_list_content(self):
+        output = "addrman_tests*\n    addrman_simple*\nbench_tests\n    bench_a*\nnet_tests*\n"
+        self.assertEqual(parse_list_content(output), ['addrman_tests', 'net_tests'])
+
+    def test_list_functional_tests(self):
+        os.makedirs(os.path.join(self.folder, 'test', 'functional'))
+        with open(os.path.join(self.folder, 'test', 'functional', 'test_runner.py'), 'w') as file:
+            file.write("BASE_SCRIPTS = [\n    # Slowest first\n    'wallet_basic.py --descriptors',\n"
+                       "    'wallet_basic.py --legacy-wallet',\n    'feature_addrman.py',\n]\n")
+        tests = list_functional_tests(self.folder)
+        self.assertEqual(tests, ['wallet_basic.py --descriptors', 'wallet_basic.py --legacy-wallet',
+                                 'feature_addrman.py'])
+        self.assertEqual(get_command_for_tests(tests[:1]),
+                         "CI_FAILFAST_TEST_LEAVE_DANGLING=1 ./build/test/functional/test_runner.py -F "
+                         "'wallet_basic.py --descriptors'")
+
+    def test_order_tests(self):
+        kills = [(100, 'net_tests'), (100, 'net_tests'), (12, 'addrman_tests'), (500, 'feature_addrman.py')]
+        self.assertEqual(order_tests(['a_tests', 'feature_addrman.py', 'net_tests', 'addrman_tests'], kills, 10),
+                         ['addrman_tests', 'net_tests', 'feature_addrman.py', 'a_tests'])
+
+
+if __name__ == '__main__':
+    unittest.main()